@@ -10,6 +10,10 @@ can be switched.
 Possible arguments:
 * "agent=name;command" or "a=name;command" specifies one agent
 with the given name, that can be run by the given command.
+"a=name;command;transport" also chooses how the agent is connected to
+the engine: "tcp", the default, "unix" for a Unix domain socket, or
+"stdio" for the agent's stdin and stdout. Agents connect through
+agents/connector.py, which follows the engine's choice.
 * "-verbose" or "-v" prints the progress of the game in real time.
 Use this argument to visualise the match.
 * "-print_protocol" or "-p" prints the protocol messages. It will
@@ -18,11 +22,34 @@ this argument to understand the protocol.
 * "board_size=n" or "b=n" creates a custom square board of size
 nxn. Use this argument in conjunction with "-p" for more human-
 readable protocol messages.
-* "-log" or "-l" saves the match to a csv file under src/logs.
+* "-log" or "-l" saves the match to a csv file under logs, named
+after the time, e.g. log-20240131-120000-4242-1a2b3c4d.csv.
 It will record all moves and the end state of the game. Check
 the documentation pdf for more details.
 * "-switch" or "-s" will invert the order of agents playing. Use
 this argument to quickly test your agent as Blue instead of Red.
+* "-bitboard" or "-bb" makes the engine keep the board as bitmasks
+instead of a grid of tiles. Use this argument for large boards.
+* "port=n" makes the engine listen on port n instead of a free port
+chosen by the OS. Agents are told the port in the HEX_PORT environment
+variable; use "port=1234" for old agents that ignore it.
+* "-local" plays the game in-process, calling Python agents directly
+instead of over sockets. Agents are then given as "path/to/file.py:Class",
+e.g. "agents/DefaultAgents/NaiveAgent.py:LocalNaiveAgent". Only use this
+argument with trusted agents.
+* "-binary" offers the agents a compact binary protocol without board
+snapshots. Agents that do not ask for it keep the text protocol.
+* "-shm" mirrors the board in shared memory, named in the
+HEX_SHARED_BOARD environment variable, and leaves it out of the
+messages. Use it on large boards, with agents that read it (see
+agents/shared_board.py) or keep their own board.
+* "-latency" adds the 50th, 90th and 99th percentiles and maximum of
+the move times of each agent, and of the engine's own time per move,
+to the log. Use it with "-log".
+* "-trace" writes the timeline of the match to trace.json, and
+"trace=path" to the given file, as trace events that can be opened in
+chrome://tracing or https://ui.perfetto.dev. Agents can add their own
+spans to it; see src/Tracer.py.
 """
 import shlex
 import subprocess
@@ -42,7 +69,9 @@ def extract_agents(arguments):
     for argument in arguments:
         if "a=" in argument or "-agent" in argument:
             try:
-                _, _ = argument.split("=")[1].split(";")
+                fields = argument.split("=")[1].split(";")
+                if len(fields) not in (2, 3):
+                    raise Exception("Agent argument not valid.")
                 agents.append(f'"{argument}"')
             except Exception:
                 print(f"Agent '{argument}' is not in correct format.")
@@ -1,13 +1,14 @@
-import socket
+from os.path import realpath, sep
+from sys import path
 from time import sleep
 
+path.insert(0, sep.join(realpath(__file__).split(sep)[:-2]))
+
+from connector import connect
 
-def main():
-    HOST = "127.0.0.1"
-    PORT = 1234
 
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.connect((HOST, PORT))
+def main():
+    with connect() as s:
         s.sendall(bytes("This is an illegal message.\n", "utf-8"))
         sleep(1)
 
@@ -5,7 +5,9 @@ import java.io.*;
 
 class NaiveAgent{
     public static String HOST = "127.0.0.1";
-    public static int PORT = 1234;
+    // the engine passes its port in HEX_PORT; older engines always use 1234
+    public static int PORT = System.getenv("HEX_PORT") != null
+        ? Integer.parseInt(System.getenv("HEX_PORT")) : 1234;
 
     private Socket s;
     private PrintWriter out;
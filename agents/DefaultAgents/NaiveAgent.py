@@ -1,46 +1,83 @@
-import socket
+import struct
+from os import environ
+from os.path import realpath, sep
 from random import choice
+from sys import path
 from time import sleep
 
+path.insert(0, sep.join(realpath(__file__).split(sep)[:-2]))
+
+from connector import connect
+
 
 class NaiveAgent:
     """This class describes the default Hex agent. It will randomly send a
     valid move at each turn, and it will choose to swap with a 50% chance.
+
+    If the engine sets HEX_PERSISTENT=1, the agent stays connected after
+    a game ends, answers END with READY, and plays the next one when a
+    new START arrives.
+
+    If the engine sets HEX_BINARY=1, the agent asks for the binary
+    protocol, where messages are fixed-size records without the board.
+
+    It connects over the transport the engine chose (see
+    agents/connector.py).
     """
 
-    HOST = "127.0.0.1"
-    PORT = 1234
+    PERSISTENT = environ.get("HEX_PERSISTENT") == "1"
+    BINARY = environ.get("HEX_BINARY") == "1"
+    # binary records: type, colour, x, y (see src/BinaryMessage.py)
+    RECORD = struct.Struct("!BBhh")
 
     def run(self):
         """A finite-state machine that cycles through waiting for input
         and sending moves.
         """
 
+        self._reset()
+
+        states = self._get_states()
+
+        res = states[1]()
+        while res != 0:
+            res = states[res]()
+
+    def _get_states(self):
+        """Returns the states of the machine by number. Each state
+        returns the number of the next one, or 0 to stop.
+        """
+
+        return {
+            1: self._connect,
+            2: self._wait_start,
+            3: self._make_move,
+            4: self._wait_message,
+            5: self._close,
+            6: self._end_game,
+        }
+
+    def _reset(self):
+        """Clears the state of the previous game."""
+
         self._board_size = 0
         self._board = []
         self._colour = ""
         self._turn_count = 1
         self._choices = []
 
-        states = {
-            1: NaiveAgent._connect,
-            2: NaiveAgent._wait_start,
-            3: NaiveAgent._make_move,
-            4: NaiveAgent._wait_message,
-            5: NaiveAgent._close,
-        }
-
-        res = states[1](self)
-        while res != 0:
-            res = states[res](self)
-
     def _connect(self):
-        """Connects to the socket and jumps to waiting for the start
+        """Connects to the engine and jumps to waiting for the start
         message.
         """
 
-        self._s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self._s.connect((NaiveAgent.HOST, NaiveAgent.PORT))
+        self._s = connect()
+        self._messages = self._s.makefile("rb")
+
+        self._binary = False
+        if NaiveAgent.BINARY:
+            self._s.sendall(b"BINARY\n")
+            self._binary = self._messages.readline() == b"BINARY\n"
 
         return 2
 
@@ -49,8 +86,15 @@ class NaiveAgent:
         answers if it is Red or waits if it is Blue.
         """
 
-        data = self._s.recv(1024).decode("utf-8").strip().split(";")
-        if data[0] == "START":
+        data = self._receive().strip().split(";")
+        if data[0] == "" and NaiveAgent.PERSISTENT:
+            # the engine closed the connection instead of starting a new game
+            return 5
+        elif data[0] == "END":
+            # the end of the previous game
+            self._acknowledge_end()
+            return 2
+        elif data[0] == "START":
             self._board_size = int(data[1])
             for i in range(self._board_size):
                 for j in range(self._board_size):
@@ -77,7 +121,7 @@ class NaiveAgent:
             move = choice(self._choices)
             msg = f"{move[0]},{move[1]}\n"
 
-        self._s.sendall(bytes(msg, "utf-8"))
+        self._send(msg)
 
         return 4
 
@@ -86,9 +130,12 @@ class NaiveAgent:
 
         self._turn_count += 1
 
-        data = self._s.recv(1024).decode("utf-8").strip().split(";")
-        if data[0] == "END" or data[-1] == "END":
-            return 5
+        data = self._receive().strip().split(";")
+        if data[0] == "END":
+            self._acknowledge_end()
+            return 6
+        elif data[-1] == "END":
+            return 6
         else:
 
             if data[1] == "SWAP":
@@ -102,9 +149,68 @@ class NaiveAgent:
 
         return 4
 
+    def _receive(self):
+        """Returns the next message from the engine. Messages end with a
+        newline, so reading a line returns exactly one of them even if it
+        arrived split or together with others. Returns "" once the engine
+        has closed the connection.
+        """
+
+        if self._binary:
+            return self._decode(self._messages.read(NaiveAgent.RECORD.size))
+
+        return self._messages.readline().decode("utf-8")
+
+    def _send(self, msg):
+        """Sends a message to the engine."""
+
+        if self._binary:
+            move = msg.strip()
+            x, y = (-1, -1) if move == "SWAP" else move.split(",")
+            self._s.sendall(NaiveAgent.RECORD.pack(ord("M"), 0, int(x), int(y)))
+        else:
+            self._s.sendall(bytes(msg, "utf-8"))
+
+    def _decode(self, record):
+        """Returns the text form of a binary record, with an empty board,
+        so that the states can handle both protocols alike.
+        """
+
+        if len(record) < NaiveAgent.RECORD.size:
+            return ""
+
+        message_type, colour, x, y = NaiveAgent.RECORD.unpack(record)
+        if message_type == ord("S"):
+            return f"START;{x};{chr(colour)}\n"
+        elif message_type == ord("C"):
+            move = "SWAP" if x == -1 else f"{x},{y}"
+            next_player = chr(colour) if colour != 0 else "END"
+            return f"CHANGE;{move};;{next_player}\n"
+        else:
+            winner = chr(colour) if colour != 0 else "None"
+            return f"END;{winner}\n"
+
+    def _acknowledge_end(self):
+        """Tells the engine it can be reused, in persistent mode."""
+
+        if NaiveAgent.PERSISTENT:
+            self._s.sendall(b"READY\n")
+
+    def _end_game(self):
+        """Waits for the next game if the engine asked to reuse the agent,
+        closes the socket otherwise.
+        """
+
+        if NaiveAgent.PERSISTENT:
+            self._reset()
+            return 2
+
+        return 5
+
     def _close(self):
         """Closes the socket."""
 
+        self._messages.close()
         self._s.close()
         return 0
 
@@ -121,6 +227,54 @@ class NaiveAgent:
             return "None"
 
 
+class LocalNaiveAgent(NaiveAgent):
+    """NaiveAgent for in-process games (see src/LocalProtocol.py). The
+    engine hands it each message through receive, which runs the same
+    state machine until it needs the next message and returns the move
+    it sent, if any. It is always ready for another game.
+    """
+
+    # states that wait for a message from the engine
+    WAITING_STATES = [2, 4]
+
+    def __init__(self):
+        self._reset()
+        self._state = 2
+        self._message = None
+        self._reply = None
+
+    def receive(self, message):
+        """Handles one protocol message and returns the reply."""
+
+        self._message = message
+        self._reply = None
+
+        states = self._get_states()
+        self._state = states[self._state]()
+        while self._state not in LocalNaiveAgent.WAITING_STATES:
+            if self._state == 0:
+                # stopped on an unexpected message; wait for a new game
+                self._reset()
+                self._state = 2
+                break
+            self._state = states[self._state]()
+
+        return self._reply
+
+    def _receive(self):
+        return self._message
+
+    def _send(self, msg):
+        self._reply = msg
+
+    def _acknowledge_end(self):
+        pass
+
+    def _end_game(self):
+        self._reset()
+        return 2
+
+
 if __name__ == "__main__":
     agent = NaiveAgent()
     agent.run()
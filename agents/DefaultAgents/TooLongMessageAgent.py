@@ -1,16 +1,16 @@
-import socket
+from os.path import realpath, sep
+from sys import path
 from time import sleep
 
+path.insert(0, sep.join(realpath(__file__).split(sep)[:-2]))
 
-def main():
-    HOST = "127.0.0.1"
-    PORT = 1234
+from connector import connect
 
-    MAX_SIZE_MESSAGE_B = 1024
 
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.connect((HOST, PORT))
+def main():
+    MAX_SIZE_MESSAGE_B = 1024
 
+    with connect() as s:
         too_long_message = bytes(
             "".join(["X" for i in range(MAX_SIZE_MESSAGE_B * 2)]), "utf-8"
         )
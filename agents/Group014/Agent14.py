@@ -1,20 +1,37 @@
-import socket
-
 from copy import deepcopy
+from os import environ
+from os.path import realpath, sep
+from sys import path
 
 from Node import ExternalNodes, Node
 from helper_functions import *
 from dijkstra import *
 from minimax import *
+from tracing import name_process, span
+
+path.insert(0, sep.join(realpath(__file__).split(sep)[:-2]))
+from connector import connect
 
 from time import time_ns
 from random import choice, shuffle
 
 class Agent14:
-    """Represents the agent for Group14."""
+    """Represents the agent for Group14.
+
+    If the engine sets HEX_PERSISTENT=1, the agent stays connected after a
+    game ends, answers END with READY, and resets itself when the next START
+    message arrives.
+
+    It connects over the transport the engine chose (see
+    agents/connector.py).
+
+    If the engine shares the board (HEX_SHARED_BOARD is set), the agent
+    maps it into NumPy (see agents/shared_board.py) and takes the tiles
+    filled since its last move from it instead of the messages.
+    """
 
-    HOST = "127.0.0.1"
-    PORT = 1234
+    PERSISTENT = environ.get("HEX_PERSISTENT") == "1"
+    SHARED_BOARD = environ.get("HEX_SHARED_BOARD") is not None
 
     EXTERNAL_NODES = None
     TIME_BUDGET = 295 * 1000 * 1000 * 1000
@@ -34,19 +51,40 @@ class Agent14:
     MOVES_MADE = []
 
     def __init__(self, board_size=11):
-        self.s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.s.connect((self.HOST, self.PORT))
+        self.s = connect()
+        name_process("Agent14")
+        # messages are newline-framed; the file buffers partial and
+        # coalesced reads
+        self.messages = self.s.makefile("rb")
 
         self.board_size = board_size
+        self.shared_board = None
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the state of the previous game. The move lists are copied
+        from the class so that the moves made in one game do not leak into
+        the next.
+        """
         self.board = []
         self.colour = ""
         self.turn_count = 0
+        self.TIME_BUDGET = Agent14.TIME_BUDGET
+        self.STARTING_MOVES = list(Agent14.STARTING_MOVES)
+        self.PREDETERMINED_MOVES = []
+        self.MOVES_MADE = []
 
     def run(self):
-        """Reads data until it receives an END message or the socket closes."""
+        """
+        Reads data until it receives an END message or the socket closes. In
+        persistent mode, only the socket closing stops the agent.
+        """
         while True:
-            data = self.s.recv(1024)
-            if not data or self.interpret_data(data):
+            data = self.messages.readline()
+            if not data:
+                break
+            if self.interpret_data(data) and not self.PERSISTENT:
                 break
 
     def interpret_data(self, data):
@@ -56,9 +94,10 @@ class Agent14:
         :param data: The binary data string received from the game engine.
         :returns: True if the game ended, False otherwise.
         """
-        message = data.decode("utf-8").strip().split("\n")[0].split(";")
+        message = data.decode("utf-8").strip().split(";")
 
         if message[0] == "START":
+            self.reset()
             if int(message[1]) <= 0:
                 print(f"Invalid board size provided: {message[1]}")
                 return True
@@ -69,10 +108,14 @@ class Agent14:
             self.colour = message[2]
 
             self.board = self.initialise_board()
+            if self.SHARED_BOARD:
+                self.open_shared_board()
             if self.colour == "R":
                 self.make_move(self.board)
 
         elif message[0] == "END":
+            if self.PERSISTENT:
+                self.send_message("READY\n")
             return True
 
         elif message[0] == "CHANGE":
@@ -86,14 +129,43 @@ class Agent14:
 
             elif message[3] == self.colour:
                 opp_move = [int(x) for x in message[1].split(",")]
-                self.board[opp_move[0]][opp_move[1]].occupy(
-                    get_opposing_colour(self.colour)
-                )
+                if self.shared_board is not None:
+                    self.sync_board()
+                else:
+                    self.board[opp_move[0]][opp_move[1]].occupy(
+                        get_opposing_colour(self.colour)
+                    )
                 self.MOVES_MADE.append(opp_move)
                 self.make_move(self.board, opp_move)
 
         return False
 
+    def open_shared_board(self):
+        """
+        Maps the engine's shared board for the game that starts, keeping the
+        mapping of the previous game if the board size is the same.
+        """
+        import numpy as np
+        from shared_board import EMPTY, open_board
+
+        self.shared_board = open_board(self.board_size, self.shared_board)
+        # the game may be under way already, but it started empty
+        self.shared_tiles = np.full_like(self.shared_board.tiles, EMPTY)
+
+    def sync_board(self):
+        """
+        Occupies the nodes of the tiles the engine's shared board filled since
+        the last call. The agent's own moves are already on its board.
+        """
+        from shared_board import RED
+
+        tiles, _ = self.shared_board.read()
+        for x, y in zip(*(tiles != self.shared_tiles).nonzero()):
+            node = self.board[x][y]
+            if not node.colour:
+                node.occupy("R" if tiles[x, y] == RED else "B")
+        self.shared_tiles = tiles
+
     def make_move(self, board, opp_move=None):
         """
         Gets all available moves from the current state of the board and randomly
@@ -111,7 +183,7 @@ class Agent14:
         if self.colour == "B" and self.turn_count == 0 and opp_move in self.STARTING_MOVES:
             self.TIME_BUDGET -= time_ns() - current_time
             self.turn_count += 1
-            self.s.sendall(bytes("SWAP\n", "utf-8"))
+            self.send_message("SWAP\n")
             return
 
         if self.turn_count < 5:
@@ -177,13 +249,15 @@ class Agent14:
         else:
             if self.TIME_BUDGET > self.SWITCH_TO_DIJKSTRA:
                 # Minimax
-                move = self.minimax_wrap(board)
+                with span("minimax", turn=self.turn_count):
+                    move = self.minimax_wrap(board)
             else:
                 # Dijkstra
-                if self.colour == "R":
-                    path = dijkstra(board, self.EXTERNAL_NODES.external_up, self.EXTERNAL_NODES.external_down)
-                else:
-                    path = dijkstra(board, self.EXTERNAL_NODES.external_left, self.EXTERNAL_NODES.external_right)
+                with span("dijkstra", turn=self.turn_count):
+                    if self.colour == "R":
+                        path = dijkstra(board, self.EXTERNAL_NODES.external_up, self.EXTERNAL_NODES.external_down)
+                    else:
+                        path = dijkstra(board, self.EXTERNAL_NODES.external_left, self.EXTERNAL_NODES.external_right)
                 
                 if not path:
                     raise Exception("No path provided")
@@ -196,7 +270,15 @@ class Agent14:
 
         self.TIME_BUDGET -= time_ns() - current_time
         self.turn_count += 1
-        self.s.sendall(bytes(f"{x},{y}\n", "utf-8"))
+        self.send_message(f"{x},{y}\n")
+
+    def send_message(self, message):
+        """
+        Sends a message to the game engine.
+
+        :param message: The message to send, including the trailing newline.
+        """
+        self.s.sendall(bytes(message, "utf-8"))
 
     def minimax_wrap(self, board):
         val = float("-inf") if self.colour == "R" else float("inf")
@@ -262,6 +344,34 @@ class Agent14:
         return board
 
 
+class LocalAgent14(Agent14):
+    """
+    Agent14 for in-process games (see src/LocalProtocol.py). It does not
+    connect to the engine; the engine hands it each message through
+    `receive` instead.
+    """
+
+    def __init__(self, board_size=11):
+        self.board_size = board_size
+        self.shared_board = None
+        self.reset()
+        self.reply = None
+
+    def receive(self, message):
+        """
+        Handles one protocol message and returns the reply.
+
+        :param message: The message from the game engine.
+        :returns: The move made in response, or None if it is not the agent's turn.
+        """
+        self.reply = None
+        self.interpret_data(bytes(message, "utf-8"))
+        return self.reply
+
+    def send_message(self, message):
+        self.reply = message
+
+
 if __name__ == "__main__":
     agent = Agent14()
     agent.run()
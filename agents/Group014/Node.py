@@ -1,5 +1,11 @@
+from os.path import realpath, sep
+from sys import path
+
 from helper_functions import *
 
+path.insert(0, sep.join(realpath(__file__).split(sep)[:-2]))
+from topology import Topology
+
 
 class Node:
     """Represents a slot on the board"""
@@ -39,56 +45,50 @@ class Node:
         else:
             return self.coordinates[0] ** 5 + 7 + self.coordinates[1] ** 3
 
+    def __deepcopy__(self, memo):
+        """
+        Copies the node for a copy of the board. All of its attributes are
+        immutable, its neighbours and bridges being tuples, so they are
+        shared with the copy instead of being copied again.
+        """
+        node = Node.__new__(Node)
+        node.__dict__.update(self.__dict__)
+        return node
+
     def _get_neighbours(self):
         """
-        Get the coordinates current nodes neighbouring nodes.
+        Get the coordinates current nodes neighbouring nodes, from the shared
+        topology of the board size, with those of the external nodes it
+        touches. External nodes get theirs from ExternalNodes.
 
-        :returns: A list of neighbouring node coordinates.
+        :returns: A tuple of neighbouring node coordinates.
         """
+        if self.is_external():
+            return ()
+        topology = Topology.get(self.board_size)
         (x, y) = self.coordinates
-        neighbours_list = []
-        for position in [
-            (x - 1, y),
-            (x - 1, y + 1),
-            (x, y - 1),
-            (x, y + 1),
-            (x + 1, y - 1),
-            (x + 1, y),
-        ]:
-            if is_position_valid(position, self.board_size) or self.is_external():
-                neighbours_list.append(position)
-
-        # Add the external nodes as neighbours to each edge node
-        if y == 0:
-            neighbours_list.append((0, -1))
-        if y == self.board_size - 1:
-            neighbours_list.append((0, self.board_size))
-        if x == 0:
-            neighbours_list.append((-1, 0))
-        if x == self.board_size - 1:
-            neighbours_list.append((self.board_size, 0))
-
-        return neighbours_list
+        index = x * self.board_size + y
+        return tuple(
+            topology.positions[i]
+            for i in topology.neighbours[index]
+            + topology.blue_edges[index]
+            + topology.red_edges[index]
+        )
 
     def _get_bridges(self):
         """
-        Get the current nodes bridging nodes.
+        Get the current nodes bridging nodes, from the shared topology of the
+        board size.
 
-        :returns: A list of bridging nodes.
+        :returns: A tuple of bridging node coordinates.
         """
+        if self.is_external():
+            return ()
+        topology = Topology.get(self.board_size)
         (x, y) = self.coordinates
-        bridge_list = []
-        for position in [
-            (x + 2, y - 1),
-            (x + 1, y - 2),
-            (x + 1, y + 1),
-            (x - 1, y - 1),
-            (x - 1, y + 2),
-            (x - 2, y + 1),
-        ]:
-            if is_position_valid(position, self.board_size):
-                bridge_list.append(position)
-        return bridge_list
+        return tuple(
+            topology.positions[i] for i in topology.bridges[x * self.board_size + y]
+        )
 
     def is_neighbour(self, position):
         """
@@ -170,17 +170,13 @@ class ExternalNodes:
         self.external_left.neighbours = self._get_neighbours(self.LEFT)
 
     def _get_neighbours(self, direction):
-        neighbours = []
-        if direction == self.UP:
-            for x in range(self.board_size):
-                neighbours.append((0, x))
-        elif direction == self.RIGHT:
-            for x in range(self.board_size):
-                neighbours.append((x, self.board_size - 1))
-        elif direction == self.DOWN:
-            for x in range(self.board_size):
-                neighbours.append((self.board_size - 1, x))
-        elif direction == self.LEFT:
-            for x in range(self.board_size):
-                neighbours.append((x, 0))
-        return neighbours
+        topology = Topology.get(self.board_size)
+        edge = {
+            self.UP: topology.top,
+            self.RIGHT: topology.right,
+            self.DOWN: topology.bottom,
+            self.LEFT: topology.left,
+        }.get(direction)
+        if edge is None:
+            return ()
+        return tuple(topology.positions[i] for i in topology.edge_tiles[edge])
@@ -0,0 +1,55 @@
+import json
+from contextlib import contextmanager
+from os import environ, getpid
+from time import time_ns
+
+# the side file the engine merges into its trace, if the match is traced
+TRACE_PATH = environ.get("HEX_TRACE")
+
+
+@contextmanager
+def span(name, **args):
+    """
+    Records the time spent in a with block as a span of the engine's trace.
+    Does nothing unless the engine was started with tracing enabled.
+
+    :param name: The name shown for the span.
+    :param args: Extra values shown with the span.
+    """
+    if TRACE_PATH is None:
+        yield
+        return
+
+    start = time_ns()
+    try:
+        yield
+    finally:
+        end = time_ns()
+        event = {
+            "name": name,
+            "cat": "agent",
+            "ph": "X",
+            "ts": start / 10 ** 3,
+            "dur": (end - start) / 10 ** 3,
+            "pid": getpid(),
+            "tid": 0,
+        }
+        if args:
+            event["args"] = args
+        # one short line per event, so concurrent appends do not interleave
+        with open(TRACE_PATH, "a") as f:
+            f.write(json.dumps(event) + "\n")
+
+
+def name_process(name):
+    """
+    Names the agent's process in the trace.
+
+    :param name: The name shown for the process.
+    """
+    if TRACE_PATH is None:
+        return
+
+    event = {"name": "process_name", "ph": "M", "pid": getpid(), "args": {"name": name}}
+    with open(TRACE_PATH, "a") as f:
+        f.write(json.dumps(event) + "\n")
@@ -0,0 +1,53 @@
+"""Connects an agent to the engine over the transport the engine chose.
+
+Agents call connect() instead of opening a TCP socket themselves, and
+talk to the engine through the socket it returns, whatever the
+transport. The engine passes the transport in HEX_TRANSPORT:
+* "tcp", the default, connects to 127.0.0.1 on the port in HEX_PORT, or
+1234 for older engines, with Nagle's algorithm disabled.
+* "unix" connects to the Unix domain socket at the path in HEX_SOCKET.
+* "stdio" talks over stdin and stdout, which the engine set up as a
+socket, and tells the engine it is ready by sending READY. Anything the
+agent prints afterwards goes to stderr, so it is not taken for a move.
+
+Agents in a directory of agents import it after adding this directory to
+their path, e.g.:
+    path.insert(0, sep.join(realpath(__file__).split(sep)[:-2]))
+    from connector import connect
+"""
+import os
+import socket
+from os import environ
+
+HOST = "127.0.0.1"
+LEGACY_PORT = 1234
+
+
+def connect():
+    """Returns a socket connected to the engine. Agents should call it
+    once they are ready to play, e.g. after loading what they need, as
+    the engine does not count the time until then as theirs.
+    """
+
+    transport = environ.get("HEX_TRANSPORT", "tcp")
+
+    if transport == "stdio":
+        s = socket.socket(fileno=os.dup(0))
+        # stdin and stdout are now only used through the socket: reading
+        # input gets nothing and printing goes to stderr
+        null = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(null, 0)
+        os.close(null)
+        os.dup2(2, 1)
+        s.sendall(b"READY\n")
+        return s
+
+    if transport == "unix":
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.connect(environ["HEX_SOCKET"])
+        return s
+
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    s.connect((HOST, int(environ.get("HEX_PORT", LEGACY_PORT))))
+    return s
@@ -0,0 +1,99 @@
+"""Reads the board the engine mirrors in shared memory.
+
+When the engine is run with "-shm", it keeps the board of each game in a
+shared-memory segment named in HEX_SHARED_BOARD, laid out as described
+in src/SharedBoard.py, and sends CHANGE messages without the board.
+SharedBoardReader maps that segment into NumPy arrays without copying
+it, and reads consistent snapshots of it.
+
+The segment is made again when the board size changes, so agents open it
+on START, as open_board does. Agents in a directory of agents import it
+as they import the connector (see agents/connector.py).
+"""
+import struct
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from os import environ
+
+import numpy as np
+
+HEADER = struct.Struct("=QQI4x")
+
+EMPTY = 0
+RED = 1
+BLUE = 2
+# the tile values by colour char, as agents name colours
+TILES = {"R": RED, "B": BLUE}
+
+
+class SharedBoardReader:
+    """A mapping of the engine's shared board. tiles is a board_size x
+    board_size array of EMPTY, RED and BLUE that is the segment itself,
+    so it changes as the engine writes; read takes a consistent copy.
+    """
+
+    def __init__(self, name):
+        try:
+            self._memory = SharedMemory(name, track=False)
+        except TypeError:
+            # before Python 3.13, every process that maps a segment
+            # removes it when it exits, unless told otherwise
+            self._memory = SharedMemory(name)
+            resource_tracker.unregister(self._memory._name, "shared_memory")
+
+        self.board_size = HEADER.unpack_from(self._memory.buf)[2]
+        # sequence and moves
+        self._header = self._memory.buf[:16].cast("Q")
+        self.tiles = np.ndarray(
+            (self.board_size, self.board_size),
+            dtype=np.uint8,
+            buffer=self._memory.buf,
+            offset=HEADER.size,
+        )
+
+    def get_moves(self):
+        """Returns the number of moves played, swaps included."""
+
+        return self._header[1]
+
+    def read(self, out=None):
+        """Copies the tiles into out, a new array by default, while the
+        engine is not writing them. Returns the copy and the number of
+        moves it holds.
+        """
+
+        if out is None:
+            out = np.empty_like(self.tiles)
+        header = self._header
+        while True:
+            sequence = header[0]
+            if sequence % 2 == 1:
+                continue
+            out[...] = self.tiles
+            moves = header[1]
+            if header[0] == sequence:
+                return (out, moves)
+
+    def close(self):
+        """Unmaps the segment. The arrays cannot be used afterwards."""
+
+        self._header.release()
+        del self.tiles
+        self._memory.close()
+
+
+def open_board(board_size, reader=None):
+    """Returns a reader of the shared board of a game of the given size,
+    or None if the engine does not share the board. reader, the one used
+    for the previous game, is kept if the board size has not changed and
+    closed otherwise.
+    """
+
+    name = environ.get("HEX_SHARED_BOARD")
+    if name is None:
+        return None
+    if reader is not None:
+        if reader.board_size == board_size:
+            return reader
+        reader.close()
+    return SharedBoardReader(name)
@@ -0,0 +1,113 @@
+"""The geometry of a Hex board, for agents.
+
+It is laid out as the engine's src/Topology.py, which agents do not
+import: tiles are flat indices, x * board_size + y, followed by four
+virtual edge nodes, and every tile has tuples of the indices of its
+neighbours and bridges on the board and of the edge nodes it touches.
+It is computed once per board size and process, by Topology.get, and
+shared by everything that needs it.
+
+Agents that keep coordinates rather than indices can turn an index into
+a position with positions, where each edge node is just off the first
+tile of its edge. Agents in a directory of agents import it as they
+import the connector (see agents/connector.py).
+"""
+
+# the displacements of the neighbours of a tile, as in src/Tile.py
+DISPLACEMENTS = [(-1, 0), (-1, 1), (0, 1), (1, 0), (1, -1), (0, -1)]
+
+
+class Topology:
+    """The neighbours and bridges of every tile of a board of one size, and
+    the virtual edge nodes it touches, as tuples of flat tile indices.
+    top, bottom, left and right are the indices of the edge nodes.
+    """
+
+    # indices of the displacements that precede a tile in row-major order,
+    # i.e. top left, top right and left
+    PRECEDING_NEIGHBOURS = (0, 1, 5)
+
+    # displacements of the tiles two steps away that two neighbours of a
+    # tile both touch, i.e. the other ends of its bridges
+    BRIDGE_DISPLACEMENTS = [(-2, 1), (-1, 2), (1, 1), (2, -1), (1, -2), (-1, -1)]
+
+    _topologies = {}
+
+    def __init__(self, board_size):
+        self.board_size = board_size
+        self.tile_count = board_size * board_size
+
+        # virtual edge nodes, after the tiles
+        self.top = self.tile_count
+        self.bottom = self.tile_count + 1
+        self.left = self.tile_count + 2
+        self.right = self.tile_count + 3
+
+        self.coordinates = tuple(
+            (x, y) for x in range(board_size) for y in range(board_size)
+        )
+        # the coordinates of the tiles, then the positions of the edge nodes
+        self.positions = self.coordinates + (
+            (-1, 0),
+            (board_size, 0),
+            (0, -1),
+            (0, board_size),
+        )
+        self.neighbours = tuple(
+            self._get_tiles(x, y, DISPLACEMENTS) for x, y in self.coordinates
+        )
+        self.preceding_neighbours = tuple(
+            self._get_tiles(
+                x, y, [DISPLACEMENTS[i] for i in Topology.PRECEDING_NEIGHBOURS]
+            )
+            for x, y in self.coordinates
+        )
+        self.bridges = tuple(
+            self._get_tiles(x, y, Topology.BRIDGE_DISPLACEMENTS)
+            for x, y in self.coordinates
+        )
+
+        # the edge nodes each colour joins a tile to: Red connects top to
+        # bottom and Blue left to right
+        self.red_edges = tuple(
+            ((self.top,) if x == 0 else ())
+            + ((self.bottom,) if x == board_size - 1 else ())
+            for x, y in self.coordinates
+        )
+        self.blue_edges = tuple(
+            ((self.left,) if y == 0 else ())
+            + ((self.right,) if y == board_size - 1 else ())
+            for x, y in self.coordinates
+        )
+
+        # the tiles along each edge
+        self.edge_tiles = {
+            self.top: tuple(range(board_size)),
+            self.bottom: tuple(range(self.tile_count - board_size, self.tile_count)),
+            self.left: tuple(range(0, self.tile_count, board_size)),
+            self.right: tuple(range(board_size - 1, self.tile_count, board_size)),
+        }
+
+    def _get_tiles(self, x, y, displacements):
+        """Returns the indices of the tiles at the given displacements from
+        x,y that are on the board.
+        """
+
+        n = self.board_size
+        return tuple(
+            (x + dx) * n + y + dy
+            for dx, dy in displacements
+            if 0 <= x + dx < n and 0 <= y + dy < n
+        )
+
+    @staticmethod
+    def get(board_size):
+        """Returns the topology of the given board size, computing it on
+        the first call.
+        """
+
+        topology = Topology._topologies.get(board_size)
+        if topology is None:
+            topology = Topology(board_size)
+            Topology._topologies[board_size] = topology
+        return topology
@@ -0,0 +1,69 @@
+"""Microbenchmarks for the engine and agent hot paths.
+
+Run them with "python -m benchmarks" from the root of the repository;
+see benchmarks/__main__.py for the arguments. Each benchmark is timed
+over board sizes and fill levels (the percentage of occupied tiles),
+and the results are written as JSON so that runs on different commits
+can be compared.
+
+A benchmark is a Benchmark with a setup function, that builds the state
+for a board size, fill level and random generator, and a run function,
+that performs the timed operation on that state and returns the number
+of operations it did. Benchmarks that change their state get a new one
+for every run; the others reuse it.
+
+has_ended.py, protocol.py, batch_board.py and transport.py are
+standalone comparisons, run as scripts.
+"""
+import os
+from contextlib import contextmanager
+from os.path import realpath, sep
+from sys import path
+
+ROOT = sep.join(realpath(__file__).split(sep)[:-2])
+for directory in [f"{ROOT}{sep}src", f"{ROOT}{sep}agents{sep}Group014"]:
+    if directory not in path:
+        path.insert(0, directory)
+
+
+class Benchmark:
+    """A timed operation, as described in the package docstring.
+
+    max_size is the largest board size the benchmark runs on by default,
+    for operations too slow to time on large boards. Benchmarks with
+    filled=False do not depend on the fill level; they run once per size,
+    with the fill level None.
+    """
+
+    def __init__(self, name, setup, run, mutates=False, max_size=None, filled=True):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.mutates = mutates
+        self.max_size = max_size
+        self.filled = filled
+
+
+@contextmanager
+def silenced_stderr():
+    """Sends what is written to stderr to devnull, including writes made
+    through references to sys.stderr taken at import time.
+    """
+
+    saved = os.dup(2)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 2)
+    try:
+        yield
+    finally:
+        os.dup2(saved, 2)
+        os.close(devnull)
+        os.close(saved)
+
+
+def get_benchmarks():
+    """Returns all benchmarks, by name."""
+
+    from benchmarks import engine, group014
+
+    return {b.name: b for b in engine.BENCHMARKS + group014.BENCHMARKS}
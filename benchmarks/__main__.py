@@ -0,0 +1,207 @@
+"""This script runs the microbenchmarks.
+
+It prints one CSV line per benchmark, board size and fill level, with
+the best and median time per operation in nanoseconds over the
+repeats.
+
+Possible arguments:
+* Benchmark names, or prefixes of them (e.g. "board" or
+"group014.dijkstra"), run only those benchmarks. All run by default.
+* "sizes=a,b,..." sets the board sizes. Defaults to 5,11,19,27.
+* "fills=a,b,..." sets the fill levels, as percentages of occupied
+tiles. Defaults to 0,25,50,75,100.
+* "repeat=n" times every case n times. Defaults to 3.
+* "min_time=s" makes every repeat last at least s seconds, by running
+fast operations many times. Defaults to 0.05.
+* "-full" also runs benchmarks on sizes above their default limit.
+* "output=path" saves the results as JSON, with the commit they were
+measured on.
+* "compare=path" compares the results with those saved in a JSON file
+and exits with status 1 if a case got slower by more than the
+threshold.
+* "threshold=n" sets that threshold, in percent. Defaults to 10.
+"""
+import json
+import platform
+import random
+import subprocess
+from datetime import datetime
+from statistics import median
+from sys import argv, exit
+from time import perf_counter_ns
+
+from benchmarks import ROOT, get_benchmarks
+
+
+def measure(b, size, fill, number):
+    """Runs a benchmark number times and returns (operations, time in
+    ns). Only the run function is timed.
+    """
+
+    seed = size * 1000 + (fill or 0)
+    rng = random.Random(seed)
+    # the agents and minimax use the random module directly
+    random.seed(seed)
+
+    ops, elapsed = 0, 0
+    if b.mutates:
+        for _ in range(number):
+            state = b.setup(size, fill, rng)
+            start = perf_counter_ns()
+            ops += b.run(state)
+            elapsed += perf_counter_ns() - start
+    else:
+        state = b.setup(size, fill, rng)
+        start = perf_counter_ns()
+        for _ in range(number):
+            ops += b.run(state)
+        elapsed = perf_counter_ns() - start
+
+    return (ops, elapsed)
+
+
+def time_case(b, size, fill, repeat, min_time):
+    """Returns the time per operation of each repeat of a case, in ns."""
+
+    # find how many runs make a repeat last min_time
+    number = 1
+    while True:
+        ops, elapsed = measure(b, size, fill, number)
+        if elapsed >= min_time or number >= 10 ** 6:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    times = [elapsed / ops]
+    for _ in range(repeat - 1):
+        ops, elapsed = measure(b, size, fill, number)
+        times.append(elapsed / ops)
+    return times
+
+
+def get_commit():
+    """Returns the commit the tree is at, or None outside of git."""
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results, path, threshold):
+    """Prints the change of every case also found in the results saved
+    at path. Returns True if none got slower by more than threshold%.
+    """
+
+    with open(path) as f:
+        baseline = json.load(f)
+    old = {(r["name"], r["size"], r["fill"]): r for r in baseline["results"]}
+
+    print(f"Compared with {baseline['commit']} ({path}):")
+    print("name,size,fill,old_ns_per_op,new_ns_per_op,change_percent")
+    passed = True
+    for r in results:
+        key = (r["name"], r["size"], r["fill"])
+        if key not in old:
+            continue
+        change = (r["ns_per_op"] / old[key]["ns_per_op"] - 1) * 100
+        line = (
+            f"{r['name']},{r['size']},{r['fill']},{old[key]['ns_per_op']:.0f},"
+            + f"{r['ns_per_op']:.0f},{change:+.1f}"
+        )
+        if change > threshold:
+            line += ",SLOWER"
+            passed = False
+        print(line)
+    return passed
+
+
+def main():
+    names = []
+    sizes = [5, 11, 19, 27]
+    fills = [0, 25, 50, 75, 100]
+    repeat = 3
+    min_time = 0.05
+    full = False
+    output_path = None
+    compare_path = None
+    threshold = 10
+
+    try:
+        for argument in argv[1:]:
+            if argument.startswith("sizes="):
+                sizes = [int(s) for s in argument.split("=")[1].split(",")]
+            elif argument.startswith("fills="):
+                fills = [int(f) for f in argument.split("=")[1].split(",")]
+            elif argument.startswith("repeat="):
+                repeat = int(argument.split("=")[1])
+            elif argument.startswith("min_time="):
+                min_time = float(argument.split("=")[1])
+            elif argument == "-full":
+                full = True
+            elif argument.startswith("output="):
+                output_path = argument.split("=")[1]
+            elif argument.startswith("compare="):
+                compare_path = argument.split("=")[1]
+            elif argument.startswith("threshold="):
+                threshold = float(argument.split("=")[1])
+            else:
+                names.append(argument)
+    except Exception:
+        print("ERROR: Arguments not valid. Aborted.")
+        return
+
+    benchmarks = [
+        b
+        for name, b in get_benchmarks().items()
+        if len(names) == 0 or any(name.startswith(n) for n in names)
+    ]
+
+    results = []
+    print("name,size,fill,repeats,ns_per_op,median_ns_per_op")
+    for b in benchmarks:
+        for size in sizes:
+            if not full and b.max_size is not None and size > b.max_size:
+                continue
+            for fill in fills if b.filled else [None]:
+                times = time_case(b, size, fill, repeat, min_time * 10 ** 9)
+                result = {
+                    "name": b.name,
+                    "size": size,
+                    "fill": fill,
+                    "ns_per_op": min(times),
+                    "median_ns_per_op": median(times),
+                }
+                results.append(result)
+                print(
+                    f"{b.name},{size},{fill},{len(times)},"
+                    + f"{result['ns_per_op']:.0f},{result['median_ns_per_op']:.0f}",
+                    flush=True,
+                )
+
+    if output_path is not None:
+        with open(output_path, "w") as f:
+            json.dump(
+                {
+                    "commit": get_commit(),
+                    "date": datetime.now().isoformat(),
+                    "python": platform.python_version(),
+                    "machine": platform.platform(),
+                    "results": results,
+                },
+                f,
+                indent=1,
+            )
+        print(f"Saved results to {output_path}")
+
+    if compare_path is not None and not compare(results, compare_path, threshold):
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
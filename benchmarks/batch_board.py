@@ -0,0 +1,107 @@
+"""This script benchmarks BatchBoard against one Board per game.
+
+For each batch size, from 1 to 65536 boards, it plays random games on
+all boards of a BatchBoard at once, one move per board per step, until
+every board has a winner, and reports the boards and moves per second.
+The same games are then played one at a time on Board objects, on up to
+1024 boards, and their winners are compared with the batch's.
+
+Possible arguments:
+* "board_size=n" or "b=n" plays on boards of size nxn. Defaults to 11.
+* "max_batch=n" sets the largest batch size. Defaults to 65536.
+"""
+from sys import argv, path
+from time import perf_counter_ns
+from os.path import realpath, sep
+
+import numpy as np
+
+path.insert(0, sep.join(realpath(__file__).split(sep)[:-2]) + f"{sep}src")
+
+from BatchBoard import BatchBoard
+from Board import Board
+from Colour import Colour
+from Move import Move
+
+
+# the largest number of games played on Board objects per batch size
+MAX_BOARD_GAMES = 1024
+
+
+def play_batch(size, orders):
+    """Plays the games on a BatchBoard. Returns the winners, the number of
+    moves and the time in ns.
+    """
+
+    b = BatchBoard(len(orders), size)
+    xs_all, ys_all = orders // size, orders % size
+    moves = 0
+
+    start = perf_counter_ns()
+    for turn in range(size * size):
+        playing = ~b.has_ended()
+        if not playing.any():
+            break
+        colour = BatchBoard.RED if turn % 2 == 0 else BatchBoard.BLUE
+        xs = np.where(playing, xs_all[:, turn], -1)
+        ys = np.where(playing, ys_all[:, turn], -1)
+        moves += int(np.count_nonzero(b.move(xs, ys, colour)))
+    elapsed = perf_counter_ns() - start
+
+    return (b.get_winners().copy(), moves, elapsed)
+
+
+def play_boards(size, orders):
+    """Plays the same games on one Board each."""
+
+    winners, moves = [], 0
+    start = perf_counter_ns()
+    for order in orders.tolist():
+        b = Board(size)
+        colour = Colour.RED
+        for tile in order:
+            Move(colour, tile // size, tile % size).move(b)
+            moves += 1
+            if b.has_ended():
+                break
+            colour = colour.opposite()
+        winners.append(BatchBoard.COLOURS[b.get_winner()])
+    elapsed = perf_counter_ns() - start
+
+    return (np.array(winners, dtype=np.int8), moves, elapsed)
+
+
+def main():
+    size = 11
+    max_batch = 65536
+    for argument in argv[1:]:
+        if "board_size=" in argument or "b=" in argument:
+            size = int(argument.split("=")[1])
+        elif "max_batch=" in argument:
+            max_batch = int(argument.split("=")[1])
+
+    rng = np.random.default_rng(size)
+    print("size,method,boards,moves,total_ms,boards_per_s,moves_per_s")
+    batch_size = 1
+    while batch_size <= max_batch:
+        # a random order of the tiles per game
+        orders = np.argsort(rng.random((batch_size, size * size)), axis=1)
+
+        results = [("batch", play_batch(size, orders))]
+        if batch_size <= MAX_BOARD_GAMES:
+            results.append(("board", play_boards(size, orders)))
+
+        for method, (winners, moves, elapsed) in results:
+            print(
+                f"{size},{method},{batch_size},{moves},{elapsed / 10 ** 6:.1f},"
+                + f"{batch_size * 10 ** 9 / elapsed:.0f},"
+                + f"{moves * 10 ** 9 / elapsed:.0f}"
+            )
+
+        if len(results) > 1 and (results[0][1][0] != results[1][1][0]).any():
+            print(f"ERROR: Winners differ for {batch_size} boards.")
+        batch_size *= 4
+
+
+if __name__ == "__main__":
+    main()
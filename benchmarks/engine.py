@@ -0,0 +1,140 @@
+"""Benchmarks of the engine: Board, Move and the Game loop."""
+from os.path import sep
+
+from benchmarks import ROOT, Benchmark, silenced_stderr
+
+from Board import Board
+from Colour import Colour
+from Game import Game
+from LocalProtocol import LocalProtocol
+from Move import Move
+
+NAIVE_AGENT = f"{ROOT}{sep}agents{sep}DefaultAgents{sep}NaiveAgent.py:LocalNaiveAgent"
+
+
+def fill_board(size, fill, rng):
+    """Returns a Board with fill% of its tiles occupied by alternating
+    random moves, and the list of tiles left empty.
+    """
+
+    b = Board(size)
+    cells = [(x, y) for x in range(size) for y in range(size)]
+    rng.shuffle(cells)
+    occupied = len(cells) * fill // 100
+
+    colour = Colour.RED
+    for x, y in cells[:occupied]:
+        Move(colour, x, y).move(b)
+        colour = colour.opposite()
+
+    return (b, cells[occupied:])
+
+
+class Position:
+    """The part of Game that Move.is_valid_move reads."""
+
+    def __init__(self, b, colour, turn):
+        self._board = b
+        self._colour = colour
+        self._turn = turn
+
+    def get_board(self):
+        return self._board
+
+    def get_player(self):
+        return self._colour
+
+    def get_turn(self):
+        return self._turn
+
+
+def setup_board(size, fill, rng):
+    return fill_board(size, fill, rng)[0]
+
+
+def run_has_ended(b):
+    b.has_ended()
+    return 1
+
+
+def run_print_board(b):
+    b.print_board()
+    return 1
+
+
+def run_print_board_human(b):
+    b.print_board(bnf=False)
+    return 1
+
+
+def setup_from_string(size, fill, rng):
+    return (fill_board(size, fill, rng)[0].print_board(), size)
+
+
+def run_from_string(state):
+    string, size = state
+    Board.from_string(string, board_size=size)
+    return 1
+
+
+def setup_moves(size, fill, rng):
+    """Returns a position and one move per tile: the legal moves on the
+    empty tiles and illegal ones on the occupied tiles.
+    """
+
+    b, _ = fill_board(size, fill, rng)
+    moves = [Move(Colour.RED, x, y) for x in range(size) for y in range(size)]
+    return (Position(b, Colour.RED, 3), moves)
+
+
+def run_is_valid_move(state):
+    position, moves = state
+    for m in moves:
+        m.is_valid_move(position)
+    return len(moves)
+
+
+def setup_move(size, fill, rng):
+    b, empty = fill_board(size, fill, rng)
+    return (b, [Move(Colour.RED, x, y) for x, y in empty])
+
+
+def run_move(state):
+    b, moves = state
+    for m in moves:
+        m.move(b)
+    return max(len(moves), 1)
+
+
+def setup_game(size, fill, rng):
+    # the agents are created here, so that only the game is timed
+    protocol = LocalProtocol()
+    for name in ["Red", "Blue"]:
+        protocol.accept_connection(NAIVE_AGENT, name)
+    return Game(
+        board_size=size,
+        player1={"name": "Red", "run string": NAIVE_AGENT},
+        player2={"name": "Blue", "run string": NAIVE_AGENT},
+        log=False,
+        protocol=protocol,
+    )
+
+
+def run_game(g):
+    # Game prints its short results to stderr
+    with silenced_stderr():
+        result = g.run()
+    return max(result["turns"], 1)
+
+
+BENCHMARKS = [
+    Benchmark("board.has_ended", setup_board, run_has_ended),
+    Benchmark("board.print_board", setup_board, run_print_board),
+    Benchmark("board.print_board_human", setup_board, run_print_board_human),
+    Benchmark("board.from_string", setup_from_string, run_from_string),
+    Benchmark("move.is_valid_move", setup_moves, run_is_valid_move),
+    # plays every empty tile, so 100% fill has nothing to time
+    Benchmark("move.move", setup_move, run_move, mutates=True),
+    # a whole game between in-process NaiveAgents, timed per move
+    Benchmark("game.move_loop", setup_game, run_game, mutates=True, filled=False),
+]
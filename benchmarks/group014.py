@@ -0,0 +1,55 @@
+"""Benchmarks of the search of agents/Group014: dijkstra, the static
+evaluation and minimax.
+"""
+from benchmarks import Benchmark
+
+from Agent14 import LocalAgent14
+from dijkstra import dijkstra
+from minimax import get_static_evaluation, minimax
+
+
+def setup_agent_board(size, fill, rng):
+    """Returns an Agent14 board with fill% of its nodes occupied by
+    alternating random moves, and its external nodes.
+    """
+
+    agent = LocalAgent14(board_size=size)
+    agent.board_size = size
+    board = agent.initialise_board()
+
+    nodes = [node for row in board for node in row]
+    rng.shuffle(nodes)
+    colours = ["R", "B"]
+    for idx, node in enumerate(nodes[: len(nodes) * fill // 100]):
+        node.occupy(colours[idx % 2])
+
+    return (board, agent.EXTERNAL_NODES)
+
+
+def run_dijkstra(state):
+    board, external_nodes = state
+    dijkstra(board, external_nodes.external_up, external_nodes.external_down)
+    return 1
+
+
+def run_get_static_evaluation(state):
+    board, external_nodes = state
+    get_static_evaluation(board, external_nodes)
+    return 1
+
+
+def run_minimax(state):
+    # one level, as Agent14.minimax_wrap searches from each of its moves
+    board, external_nodes = state
+    minimax(board, 1, float("-inf"), float("inf"), True, external_nodes)
+    return 1
+
+
+BENCHMARKS = [
+    Benchmark("group014.dijkstra", setup_agent_board, run_dijkstra),
+    Benchmark(
+        "group014.get_static_evaluation", setup_agent_board, run_get_static_evaluation
+    ),
+    # evaluates every free node, so it grows with the fourth power of the size
+    Benchmark("group014.minimax", setup_agent_board, run_minimax, max_size=11),
+]
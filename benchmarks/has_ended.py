@@ -0,0 +1,126 @@
+"""This script benchmarks the win detection of the Board.
+
+It plays random games on 11x11, 19x19 and 27x27 boards and times the
+moves and win checks the engine makes per turn: with the full-board
+search the engine used before, with the incremental union-find kept
+by Board and with the bitmask flood fill kept by BitBoard. The
+winners of all three are compared on every game.
+
+Possible arguments:
+* "games=n" or "g=n" sets the number of games per board size.
+"""
+from random import Random
+from sys import argv, path
+from time import perf_counter_ns
+from os.path import realpath, sep
+
+path.insert(0, sep.join(realpath(__file__).split(sep)[:-2]) + f"{sep}src")
+
+from Board import Board
+from BitBoard import BitBoard
+from Colour import Colour
+from Move import Move
+from Tile import Tile
+
+
+BOARD_SIZES = [11, 19, 27]
+METHODS = ["full_search", "union_find", "bitboard"]
+
+
+def full_search_winner(b):
+    """Reference win check: searches from every top and left edge tile
+    over the whole board, as Board.has_ended used to.
+    """
+
+    size = b.get_size()
+    tiles = b.get_tiles()
+    for colour, starts in [
+        (Colour.RED, [(0, idx) for idx in range(size)]),
+        (Colour.BLUE, [(idx, 0) for idx in range(size)]),
+    ]:
+        visited = set()
+        stack = [s for s in starts if tiles[s[0]][s[1]].get_colour() == colour]
+        while stack:
+            x, y = stack.pop()
+            if (x, y) in visited:
+                continue
+            visited.add((x, y))
+            if (colour == Colour.RED and x == size - 1) or (
+                colour == Colour.BLUE and y == size - 1
+            ):
+                return colour
+            for idx in range(Tile.NEIGHBOUR_COUNT):
+                x_n = x + Tile.I_DISPLACEMENTS[idx]
+                y_n = y + Tile.J_DISPLACEMENTS[idx]
+                if (
+                    0 <= x_n < size
+                    and 0 <= y_n < size
+                    and tiles[x_n][y_n].get_colour() == colour
+                ):
+                    stack.append((x_n, y_n))
+    return None
+
+
+def play(size, rng, method):
+    """Plays one random game and returns (winner, turns, time in ns)."""
+
+    full_search = method == "full_search"
+    if method == "bitboard":
+        b = BitBoard(size)
+    else:
+        b = Board(size)
+    cells = [(x, y) for x in range(size) for y in range(size)]
+    rng.shuffle(cells)
+    colour = Colour.RED
+
+    start = perf_counter_ns()
+    turns = 0
+    for x, y in cells:
+        Move(colour, x, y).move(b)
+        turns += 1
+        # the engine checks for a winner twice per move
+        if full_search:
+            ended = full_search_winner(b) is not None
+            ended = full_search_winner(b) is not None
+        else:
+            ended = b.has_ended()
+            ended = b.has_ended()
+        if ended:
+            break
+        colour = colour.opposite()
+    elapsed = perf_counter_ns() - start
+
+    winner = full_search_winner(b) if full_search else b.get_winner()
+    return (winner, turns, elapsed)
+
+
+def main():
+    games = 20
+    for argument in argv[1:]:
+        if "games=" in argument or "g=" in argument:
+            games = int(argument.split("=")[1])
+
+    print("size,method,games,moves,total_ms,us_per_move")
+    for size in BOARD_SIZES:
+        results = []
+        for method in METHODS:
+            rng = Random(size)
+            winners, moves, elapsed = [], 0, 0
+            for _ in range(games):
+                winner, turns, t = play(size, rng, method)
+                winners.append(winner)
+                moves += turns
+                elapsed += t
+            results.append(winners)
+
+            print(
+                f"{size},{method},{games},{moves},"
+                + f"{elapsed / 10 ** 6:.1f},{elapsed / moves / 10 ** 3:.2f}"
+            )
+
+        if any(winners != results[0] for winners in results):
+            print(f"ERROR: Winners differ on {size}x{size}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""This script compares the text protocol with the binary protocol and
+with the text protocol over a shared board.
+
+For each board size it fills a board with random moves and, for every
+move, sends the CHANGE message the engine would send to an agent thread
+over a socket pair, then waits for the agent's reply. It reports the
+bytes per message, the time the engine takes to encode it, the time the
+agent takes to parse it, the round-trip time and the number of moves per
+second. The text agent parses the board into rows, as agents that read
+it do; the binary agent only unpacks the record. The shared agent gets
+no board in the message and copies it from the shared board the engine
+writes the move to (see SharedBoard), as a NumPy array.
+
+Possible arguments:
+* "moves=n" or "m=n" sets the maximum number of moves per board size.
+"""
+import socket
+import threading
+from multiprocessing import resource_tracker
+from random import Random
+from sys import argv, path
+from time import perf_counter_ns
+from os.path import realpath, sep
+
+ROOT = sep.join(realpath(__file__).split(sep)[:-2])
+path.insert(0, f"{ROOT}{sep}src")
+path.insert(0, f"{ROOT}{sep}agents")
+
+from BinaryMessage import BinaryMessage
+from Board import Board
+from Colour import Colour
+from MessageReader import MessageReader
+from Move import Move
+from SharedBoard import SharedBoard
+from shared_board import SharedBoardReader
+
+
+BOARD_SIZES = [11, 19, 27, 51]
+PROTOCOLS = ["text", "binary", "shared"]
+
+
+def run_agent(sock, protocol, moves, parse_times, shared=None):
+    """Answers every message with a move, recording the parse times."""
+
+    messages = sock.makefile("rb")
+    reply = BinaryMessage.RECORD.pack(BinaryMessage.MOVE, 0, 0, 0)
+    binary = protocol == "binary"
+    if protocol == "shared":
+        board = SharedBoardReader(shared)
+        tiles = board.tiles.copy()
+    for _ in range(moves):
+        if protocol == "shared":
+            data = messages.readline()
+            start = perf_counter_ns()
+            fields = data.decode("utf-8").strip().split(";")
+            x, y = fields[1].split(",")
+            board.read(tiles)
+            colour = fields[3]
+            reply = bytes(f"{x},{y}\n", "utf-8")
+        elif binary:
+            data = messages.read(BinaryMessage.SIZE)
+            start = perf_counter_ns()
+            _, colour, x, y = BinaryMessage.RECORD.unpack(data)
+        else:
+            data = messages.readline()
+            start = perf_counter_ns()
+            fields = data.decode("utf-8").strip().split(";")
+            x, y = fields[1].split(",")
+            board = fields[2].split(",")
+            colour = fields[3]
+            reply = bytes(f"{x},{y}\n", "utf-8")
+        parse_times.append(perf_counter_ns() - start)
+        sock.sendall(reply)
+    if protocol == "shared":
+        del tiles
+        board.close()
+
+
+def play(size, protocol, moves, rng):
+    """Plays up to moves random moves through the given protocol and
+    returns (moves, bytes, encode time, parse time, total time) with
+    times in ns.
+    """
+
+    cells = [(x, y) for x in range(size) for y in range(size)]
+    rng.shuffle(cells)
+    cells = cells[:moves]
+
+    binary = protocol == "binary"
+    shared = None
+    if protocol == "shared":
+        shared = SharedBoard(f"hex_benchmark_{size}", size)
+    engine, agent = socket.socketpair()
+    parse_times = []
+    t = threading.Thread(
+        target=run_agent,
+        args=(agent, protocol, len(cells), parse_times, shared and shared.name),
+    )
+    t.start()
+
+    b = Board(size)
+    reader = MessageReader(engine)
+    colour = Colour.RED
+    sent, encode_time = 0, 0
+    start = perf_counter_ns()
+    for x, y in cells:
+        Move(colour, x, y).move(b)
+        colour = colour.opposite()
+
+        encode_start = perf_counter_ns()
+        if shared is not None:
+            shared.play(x, y, colour.opposite())
+            data = bytes(f"CHANGE;{x},{y};;{colour.get_char()}\n", "utf-8")
+        elif binary:
+            data = BinaryMessage.encode(f"CHANGE;{x},{y};;{colour.get_char()}\n")
+        else:
+            message = f"CHANGE;{x},{y};{b.print_board()};{colour.get_char()}\n"
+            data = bytes(message, "utf-8")
+        encode_time += perf_counter_ns() - encode_start
+
+        engine.sendall(data)
+        sent += len(data)
+        if binary:
+            reader.read_record(BinaryMessage.SIZE)
+        else:
+            reader.read_message()
+    elapsed = perf_counter_ns() - start
+
+    t.join()
+    engine.close()
+    agent.close()
+    if shared is not None:
+        # the reader of the agent thread stopped this process from tracking
+        # the segment, which close expects
+        resource_tracker.register(f"/{shared.name}", "shared_memory")
+        shared.close()
+    return (len(cells), sent, encode_time, sum(parse_times), elapsed)
+
+
+def main():
+    moves = 10 ** 4
+    for argument in argv[1:]:
+        if "moves=" in argument or "m=" in argument:
+            moves = int(argument.split("=")[1])
+
+    print(
+        "size,protocol,moves,bytes_per_move,"
+        + "encode_us,parse_us,round_trip_us,moves_per_s"
+    )
+    for size in BOARD_SIZES:
+        for protocol in PROTOCOLS:
+            n, sent, encode_time, parse_time, elapsed = play(
+                size, protocol, moves, Random(size)
+            )
+            print(
+                f"{size},{protocol},{n},{sent / n:.0f},"
+                + f"{encode_time / n / 10 ** 3:.2f},"
+                + f"{parse_time / n / 10 ** 3:.2f},"
+                + f"{elapsed / n / 10 ** 3:.2f},"
+                + f"{n * 10 ** 9 / elapsed:.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
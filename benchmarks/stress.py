@@ -0,0 +1,283 @@
+"""This script plays many back-to-back games through Game and Protocol,
+with real agent processes, to measure sustained throughput and find
+leaks.
+
+Every game is NaiveAgent against the next agent of a list that holds
+NaiveAgent and the fault agents of agents/DefaultAgents, with colours
+alternating. Every few games it prints the games per second since the
+previous line, and the engine's open file descriptors, child processes
+(alive and zombie) and resident memory. At the end it prints the time
+spent in each phase of the games and how much the resources grew.
+
+Run it with "python -m benchmarks.stress" from the root of the
+repository. Resources are read from /proc, so they are only reported
+on Linux.
+
+Possible arguments:
+* "games=n" or "g=n" plays n games. Defaults to 1000.
+* "agents=a,b,..." sets the opponents of NaiveAgent, by file name in
+agents/DefaultAgents. Defaults to all of them.
+* "board_size=n" or "b=n" plays on a board of size nxn. Defaults to 11.
+* "max_time=s" sets Game.MAXIMUM_TIME to s seconds, which is also how
+long the engine waits for agents that time out or never connect.
+Defaults to 5.
+* "interval=n" prints a line every n games. Defaults to 50.
+* "-warm" takes the agents from an AgentPool, which starts the agents
+of the next game between games. Their startup overlaps the next game,
+so it takes time from the agents that think unless a core is free.
+* "-shell" starts every agent through a shell that stays alive, so the
+agents are grandchildren of the engine, as with wrapper scripts. Only
+on Linux.
+
+Besides the engine's own children, it counts the agent processes left
+running on the host after their games, and the processes that Protocol
+reported as leaked when it could not stop them (see AgentProcess).
+"""
+import os
+import resource
+from collections import Counter
+from os.path import sep
+from sys import argv, executable
+from time import time_ns as time
+
+from benchmarks import ROOT, silenced_stderr
+
+from AgentPool import AgentPool
+from AgentProcess import AgentProcess
+from Colour import Colour
+from EndState import EndState
+from Game import Game
+from Tracer import Tracer
+
+
+AGENTS = [
+    "NaiveAgent",
+    "TimeoutAgent",
+    "DisconnectingAgent",
+    "IllegalMessageAgent",
+    "TooLongMessageAgent",
+    "NoConnectionAgent",
+]
+
+
+def get_agent(name, shell=False):
+    path = f"{ROOT}{sep}agents{sep}DefaultAgents{sep}{name}.py"
+    run_s = f"{executable} {path}"
+    if shell:
+        # the shell does not exec the agent as it has more to run
+        run_s = f'sh -c "{run_s}; exit"'
+    return {"name": name, "run string": run_s}
+
+
+def count_fds():
+    """Returns the number of open file descriptors, or None."""
+
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def count_children():
+    """Returns the number of (alive, zombie) child processes, or
+    (None, None).
+    """
+
+    pid = os.getpid()
+    alive, zombies = 0, 0
+    try:
+        pids = [p for p in os.listdir("/proc") if p.isdigit()]
+    except OSError:
+        return (None, None)
+
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # the name is in parentheses and can contain spaces
+        fields = stat[stat.rfind(")") + 2 :].split()
+        if int(fields[1]) != pid:
+            continue
+        if fields[0] == "Z":
+            zombies += 1
+        else:
+            alive += 1
+    return (alive, zombies)
+
+
+def count_orphans():
+    """Returns the number of agent processes alive on the host, other
+    than the engine's children, or None. They are the agents of finished
+    games that were not stopped.
+    """
+
+    try:
+        pids = [p for p in os.listdir("/proc") if p.isdigit()]
+    except OSError:
+        return None
+
+    pid = os.getpid()
+    agents = f"{ROOT}{sep}agents{sep}"
+    orphans = 0
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/cmdline", "rb") as f:
+                cmdline = f.read().decode(errors="replace")
+            with open(f"/proc/{p}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        fields = stat[stat.rfind(")") + 2 :].split()
+        if agents in cmdline and fields[0] != "Z" and int(fields[1]) != pid:
+            orphans += 1
+    return orphans
+
+
+def get_rss():
+    """Returns the resident memory of the engine in MB. Falls back on the
+    peak resident memory where /proc is not available.
+    """
+
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def sample():
+    alive, zombies = count_children()
+    return {
+        "fds": count_fds(),
+        "alive": alive,
+        "zombies": zombies,
+        "orphans": count_orphans(),
+        "leaked": len(AgentProcess.leaked),
+        "rss": get_rss(),
+    }
+
+
+def print_sample(games, elapsed, rate, s):
+    print(
+        f"{games},{elapsed / 10 ** 9:.1f},{rate:.2f},"
+        + f"{s['fds']},{s['alive']},{s['zombies']},{s['orphans']},"
+        + f"{s['leaked']},{s['rss']:.1f}",
+        flush=True,
+    )
+
+
+def main():
+    games = 1000
+    agents = AGENTS
+    board_size = 11
+    max_time = 5.0
+    interval = 50
+    shell = "-shell" in argv
+    warm = "-warm" in argv
+
+    try:
+        for argument in argv[1:]:
+            if "games=" in argument or "g=" in argument:
+                games = int(argument.split("=")[1])
+            elif "agents=" in argument:
+                agents = argument.split("=")[1].split(",")
+            elif "board_size=" in argument or "b=" in argument:
+                board_size = int(argument.split("=")[1])
+            elif "max_time=" in argument:
+                max_time = float(argument.split("=")[1])
+            elif "interval=" in argument:
+                interval = int(argument.split("=")[1])
+    except Exception:
+        print("ERROR: Arguments not valid. Aborted.")
+        return
+
+    Game.MAXIMUM_TIME = int(max_time * 10 ** 9)
+    naive = get_agent("NaiveAgent", shell)
+    opponents = [get_agent(name, shell) for name in agents]
+
+    pool = AgentPool() if warm else None
+    end_states = Counter()
+    startup = 0
+    phases = {}
+    first = sample()
+    print("games,elapsed_s,games_per_s,fds,children,zombies,orphans,leaked,rss_mb")
+    print_sample(0, 0, 0, first)
+
+    start_time = time()
+    window_start = start_time
+    for idx in range(games):
+        opponent = opponents[idx % len(opponents)]
+        red, blue = naive, opponent
+        if (idx // len(opponents)) % 2 == 1:
+            red, blue = blue, red
+        if red["name"] == blue["name"]:
+            blue = {"name": f"{blue['name']}2", "run string": blue["run string"]}
+
+        tracer = Tracer()
+        g = Game(
+            board_size=board_size,
+            player1=red,
+            player2=blue,
+            log=False,
+            kill_bots=True,
+            silent_bots=True,
+            tracer=tracer,
+            pool=pool,
+        )
+        # Game prints its short results to stderr
+        with silenced_stderr():
+            result = g.run()
+        if pool is not None and idx + 1 < games:
+            pool.refill()
+        end_states[EndState.get_text(result["end state"])] += 1
+        startup += result[Colour.RED]["startup"] + result[Colour.BLUE]["startup"]
+        for name, (total, count) in tracer.get_durations().items():
+            old_total, old_count = phases.get(name, (0, 0))
+            phases[name] = (old_total + total, old_count + count)
+
+        if (idx + 1) % interval == 0 or idx + 1 == games:
+            now = time()
+            games_in_window = (idx % interval) + 1
+            print_sample(
+                idx + 1,
+                now - start_time,
+                games_in_window * 10 ** 9 / (now - window_start),
+                sample(),
+            )
+            window_start = now
+    total_time = time() - start_time
+    if pool is not None:
+        pool.close()
+    last = sample()
+
+    print(
+        f"Played {games} games in {Game.ns_to_s(total_time)}s "
+        + f"({games * 10 ** 9 / total_time:.2f} games/s). "
+        + f"End states: {dict(end_states)}"
+    )
+    print(f"Mean agent startup: {startup / (2 * games) / 10 ** 6:.1f}ms")
+    print("phase,count,total_s,mean_ms")
+    for name, (total, count) in sorted(phases.items(), key=lambda x: -x[1][0]):
+        print(f"{name},{count},{total / 10 ** 9:.2f},{total / count / 10 ** 6:.3f}")
+
+    for key, label in [
+        ("fds", "file descriptors"),
+        ("alive", "child processes"),
+        ("zombies", "zombie processes"),
+        ("orphans", "orphaned agent processes"),
+        ("leaked", "leaked processes"),
+        ("rss", "resident memory (MB)"),
+    ]:
+        if first[key] is None:
+            continue
+        growth = last[key] - first[key]
+        print(f"{label}: {first[key]:.0f} -> {last[key]:.0f} ({growth:+.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""This script measures the round-trip time of a move over each transport
+an agent can be connected by: TCP, a Unix domain socket and stdin/stdout.
+
+For each transport, Protocol starts two echo agents, that connect
+through agents/connector.py as real agents do and answer every message
+with a move. The engine then sends CHANGE messages to each agent in
+turn, as in a game, and waits for the reply. It reports the median,
+99th percentile and mean time per round trip in µs, i.e. the overhead
+the transport adds to every move, and how long the agents took to
+start and connect.
+
+Run it with "python -m benchmarks.transport" from the root of the
+repository. Only TCP is available on Windows.
+
+Possible arguments:
+* "moves=n" or "m=n" sets the number of round trips per transport.
+Defaults to 10000.
+* "board_size=n" or "b=n" sizes the CHANGE messages for a board of
+size nxn. Defaults to 11.
+* "transports=a,b,..." sets the transports to measure. Defaults to all
+of them.
+"""
+from os.path import sep
+from statistics import mean
+from sys import argv, executable, path, platform
+from time import perf_counter_ns
+
+from benchmarks import ROOT
+
+from Colour import Colour
+from Protocol import Protocol
+
+
+def run_echo():
+    """Answers every message from the engine with a move until the
+    engine closes the connection.
+    """
+
+    path.insert(0, f"{ROOT}{sep}agents")
+    from connector import connect
+
+    with connect() as s:
+        messages = s.makefile("rb")
+        for line in messages:
+            if line.startswith(b"END"):
+                break
+            s.sendall(b"1,1\n")
+
+
+def measure(transport, moves, board_size):
+    """Returns the round-trip times in ns of moves messages over the given
+    transport, and the startup time of the agents in ns.
+    """
+
+    protocol = Protocol()
+    run_s = f"{executable} -m benchmarks.transport -echo"
+    for colour in Colour:
+        if not protocol.accept_connection(
+            run_s, colour.name, 10 * 10 ** 9, transport=transport
+        ):
+            protocol.close()
+            raise RuntimeError(f"The echo agent did not connect over {transport}")
+    startup = mean(protocol.get_startup(colour) for colour in Colour)
+
+    board = ",".join(["0" * board_size] * board_size)
+    message = f"CHANGE;5,5;{board}\n"
+    times = []
+    colour = Colour.RED
+    for _ in range(moves):
+        start = perf_counter_ns()
+        protocol.send_message(colour, message)
+        data, _ = protocol.get_message(colour)
+        times.append(perf_counter_ns() - start)
+        if data == "NO MESSAGE":
+            protocol.close()
+            raise RuntimeError(f"The echo agent failed over {transport}")
+        colour = colour.opposite()
+
+    for colour in Colour:
+        protocol.send_message(colour, "END;\n")
+    protocol.close()
+    return times, startup
+
+
+def main():
+    if "-echo" in argv:
+        run_echo()
+        return
+
+    moves = 10000
+    board_size = 11
+    transports = Protocol.TRANSPORTS
+    if platform == "win32":
+        transports = [Protocol.TCP]
+
+    for argument in argv[1:]:
+        if "moves=" in argument or "m=" in argument:
+            moves = int(argument.split("=")[1])
+        elif "board_size=" in argument or "b=" in argument:
+            board_size = int(argument.split("=")[1])
+        elif "transports=" in argument:
+            transports = argument.split("=")[1].split(",")
+
+    print(
+        f"{'transport':>9} {'p50 µs':>8} {'p99 µs':>8} {'mean µs':>8}"
+        + f" {'moves/s':>9} {'startup ms':>10}"
+    )
+    for transport in transports:
+        times, startup = measure(transport, moves, board_size)
+        times.sort()
+        p50 = times[len(times) // 2] / 10 ** 3
+        p99 = times[min(len(times) * 99 // 100, len(times) - 1)] / 10 ** 3
+        average = mean(times) / 10 ** 3
+        print(
+            f"{transport:>9} {p50:>8.1f} {p99:>8.1f} {average:>8.1f}"
+            + f" {10 ** 6 / average:>9.0f} {startup / 10 ** 6:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import select
+from collections import deque
+from time import time_ns
+
+from AgentProcess import AgentProcess
+from Protocol import Protocol
+
+
+class AgentPool:
+    """Class that keeps agent processes started ahead of the games that
+    will use them, so their interpreter startup, imports and
+    initialisation overlap with the game before instead of delaying the
+    next one. It is meant for agents that play one game per process.
+
+    Spare agents are kept by run string, environment and transport,
+    size of each at first. If a spare is taken before it has connected,
+    e.g. when both agents of a game have the same run string, one more is
+    kept for that run string, up to max_size. Every spare that connects
+    gets its own listening socket, passed in HEX_PORT or HEX_SOCKET, so
+    its connection cannot be taken by another agent. Protocol takes a
+    spare with take, and the spare's connection is accepted when the game
+    starts, usually without waiting as the agent connected long before.
+
+    Spares are not replaced as they are taken: the owner of the pool calls
+    refill between games, after END and before the next START, so no
+    agent is started while the agents of a game are thinking. A spare
+    still starts up during the next game, so a pool only speeds games up
+    if there is a core left for it; with as many games as cores at once,
+    its agents take their startup time from the agents that think.
+
+    The agents are started as AgentProcess, and close stops the spares
+    that were not used.
+    """
+
+    def __init__(self, size=1, max_size=4):
+        self.size = size
+        self.max_size = max_size
+        self._spares = {}
+        # the number of spares to keep, by run string
+        self._sizes = {}
+
+    def take(self, run_s, variables={}, silent=True, transport=Protocol.TCP):
+        """Returns a spare agent started with the run string, the
+        environment variables, the output setting and the transport given,
+        as a tuple (process, listening socket, connection). Agents that
+        connect get a listening socket and no connection yet; STDIO agents
+        come connected. A new agent is started if there is no spare that
+        is still running. The next refill starts another in its place.
+        """
+
+        key = (run_s, tuple(sorted(variables.items())), silent, transport)
+        known = key in self._spares
+        spares = self._spares.setdefault(key, deque())
+        size = self._sizes.setdefault(key, self.size)
+        taken = None
+        while taken is None and len(spares) > 0:
+            taken = spares.popleft()
+            if taken[0].poll() is not None:
+                # the spare exited while it waited
+                AgentPool._discard(taken)
+                taken = None
+        if taken is None:
+            taken = AgentPool._spawn(run_s, variables, silent, transport)
+
+        # the spares of a run string used before did not have time to
+        # start, so more are kept
+        if known and not AgentPool._is_ready(taken):
+            self._sizes[key] = min(size + 1, self.max_size)
+        return taken
+
+    def refill(self):
+        """Starts spares in place of those that were taken, for every run
+        string taken before. It is called between games.
+        """
+
+        for key, spares in self._spares.items():
+            run_s, variables, silent, transport = key
+            while len(spares) < self._sizes[key]:
+                spares.append(
+                    AgentPool._spawn(run_s, dict(variables), silent, transport)
+                )
+
+    @staticmethod
+    def _spawn(run_s, variables, silent, transport):
+        """Starts an agent that connects to a listening socket of its own,
+        or over its stdin and stdout. Returns the process, the socket and
+        the connection, as take does.
+        """
+
+        listener = None
+        variables = dict(variables)
+        if transport != Protocol.STDIO:
+            listener, where = Protocol.listen(transport)
+            variables.update(where)
+        t, conn = Protocol.spawn(run_s, variables, silent, transport)
+        return (t, listener, conn)
+
+    @staticmethod
+    def _is_ready(spare):
+        """Returns True if a spare agent has connected, or for agents
+        started on their stdin and stdout, if it has sent READY.
+        """
+
+        t, listener, conn = spare
+        ready, _, _ = select.select([conn if listener is None else listener], [], [], 0)
+        return len(ready) > 0
+
+    @staticmethod
+    def _discard(spare):
+        """Stops a spare agent and closes its sockets."""
+
+        t, listener, conn = spare
+        t.stop()
+        AgentPool._close_sockets(listener, conn)
+
+    @staticmethod
+    def _close_sockets(listener, conn):
+        if listener is not None:
+            Protocol.close_listener(listener)
+        if conn is not None:
+            conn.close()
+
+    def get_spares(self):
+        """Returns the number of spare agents, running or not."""
+
+        return sum(len(spares) for spares in self._spares.values())
+
+    def close(self):
+        """Stops all spare agents."""
+
+        spares = [spare for key in self._spares for spare in self._spares[key]]
+        self._spares = {}
+        for t, _, _ in spares:
+            t.terminate()
+        deadline = time_ns() + AgentProcess.TERMINATE_TIMEOUT
+        for t, listener, conn in spares:
+            t.wait_stopped(deadline)
+            AgentPool._close_sockets(listener, conn)
+
+
+if __name__ == "__main__":
+    from time import sleep
+
+    pool = AgentPool()
+    run_s = "python3 agents/DefaultAgents/NaiveAgent.py"
+    pool.take(run_s)[0].stop()
+    pool.refill()
+    sleep(0.5)
+    start = time_ns()
+    t, listener, _ = pool.take(run_s)
+    conn, addr = listener.accept()
+    elapsed = (time_ns() - start) / 10 ** 6
+    print(f"Took an agent connected from {addr} in {elapsed:.1f}ms")
+    conn.close()
+    Protocol.close_listener(listener)
+    t.stop()
+    pool.close()
@@ -0,0 +1,161 @@
+import os
+import select
+import signal
+import subprocess
+from sys import platform
+from time import sleep, time_ns
+
+from ProcessGroup import ProcessGroup
+
+
+class AgentProcess(subprocess.Popen):
+    """Class that describes the process of an agent. It is a Popen that
+    starts the agent in a new session, so the agent and every process it
+    starts, e.g. through a shell or a wrapper script, form one process
+    group that is stopped as a whole.
+
+    stop ends the group: it sends SIGTERM to every process of the group,
+    and to those the agent started that left it, waits for them until a
+    deadline, then sends SIGKILL to those left. The agent itself is then
+    reaped with wait, so it does not stay a zombie. Processes still alive
+    after SIGKILL are leaked: they are returned by stop and added to
+    AgentProcess.leaked. Callers that stop several agents send SIGTERM to
+    all of them with terminate, then call wait_stopped on each.
+
+    The processes are tracked by a ProcessGroup. While they are waited
+    for, the agent is waited on through a pidfd where there is one. On
+    Windows, the agent is started in a new process group and only the
+    agent itself is stopped.
+    """
+
+    # how long agents have to exit after SIGTERM before they are killed
+    TERMINATE_TIMEOUT = 5 * 10 ** 8
+    # how long killed processes have to disappear before they are leaked
+    KILL_TIMEOUT = 10 ** 8
+    # how often the processes are checked while waiting for them
+    POLL_INTERVAL = 5 * 10 ** 6
+
+    # the pids of the processes that outlived stop, over all agents
+    leaked = []
+
+    def __init__(self, args, **kwargs):
+        if platform == "win32":
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["start_new_session"] = True
+        super().__init__(args, **kwargs)
+
+        # the agent leads its group, so the group id is its pid
+        self.pgid = self.pid
+        self._group = None
+        if platform != "win32":
+            self._group = ProcessGroup(self.pid)
+
+    def terminate(self):
+        """Asks the agent and all of its processes to exit."""
+
+        self._signal(signal.SIGTERM)
+
+    def kill(self):
+        """Kills the agent and all of its processes."""
+
+        self._signal(signal.SIGKILL if platform != "win32" else signal.SIGTERM)
+
+    def _signal(self, sig):
+        """Sends sig to the group of the agent and to the processes it
+        started that left the group.
+        """
+
+        if self._group is None:
+            if self.poll() is None:
+                super().send_signal(sig)
+            return
+        self._group.signal(sig)
+
+    def stop(self, deadline=None):
+        """Stops the agent and all of its processes, reaps the agent and
+        returns the pids of the processes that could not be stopped.
+        The agent has until deadline, a time_ns, to exit on SIGTERM
+        before it is killed; by default TERMINATE_TIMEOUT from now.
+        """
+
+        self.terminate()
+        return self.wait_stopped(deadline)
+
+    def wait_stopped(self, deadline=None):
+        """Waits until deadline for the agent and its processes to exit
+        after terminate, then does what stop does: kills those left, reaps
+        the agent and returns the pids of the processes that could not be
+        stopped. It sends no SIGTERM of its own.
+        """
+
+        if deadline is None:
+            deadline = time_ns() + AgentProcess.TERMINATE_TIMEOUT
+        if not self._wait_all(deadline):
+            self.kill()
+            self._wait_all(time_ns() + AgentProcess.KILL_TIMEOUT)
+
+        # the agent is normally gone by now; this only blocks if it could
+        # not be killed at all
+        if self.poll() is None:
+            self.wait(AgentProcess.KILL_TIMEOUT / 10 ** 9)
+
+        leaked = self.get_processes()
+        AgentProcess.leaked += leaked
+        return leaked
+
+    def _wait_all(self, deadline):
+        """Waits until the agent and its processes have exited or until
+        deadline. Returns True if they have.
+        """
+
+        self._wait_agent(deadline)
+        while True:
+            # poll reaps the agent as soon as it has exited
+            if self.poll() is not None and (
+                self._group is None or not self._group.is_running()
+            ):
+                return True
+            if time_ns() >= deadline:
+                return False
+            sleep(AgentProcess.POLL_INTERVAL / 10 ** 9)
+
+    def _wait_agent(self, deadline):
+        """Waits until the agent itself has exited or until deadline,
+        without reaping it.
+        """
+
+        if self.poll() is not None:
+            return
+        timeout = max(deadline - time_ns(), 0) / 10 ** 9
+        try:
+            fd = os.pidfd_open(self.pid)
+        except (AttributeError, OSError):
+            try:
+                self.wait(timeout)
+            except subprocess.TimeoutExpired:
+                pass
+            return
+        try:
+            select.select([fd], [], [], timeout)
+        finally:
+            os.close(fd)
+
+    def get_processes(self):
+        """Returns the pids of the processes that are alive in the group of
+        the agent, or that the agent started, including the agent itself
+        until it has been reaped. Zombies are left out: they are not
+        running, and the agent's own are reaped by stop.
+        """
+
+        if self._group is None:
+            return [self.pid] if self.poll() is None else []
+        return self._group.get_processes()
+
+
+if __name__ == "__main__":
+    # a shell that leaves a process behind
+    p = AgentProcess(["sh", "-c", "sleep 30 & sleep 30"])
+    sleep(0.1)
+    print(f"Agent {p.pid} runs {p.get_processes()}")
+    print(f"Leaked {p.stop()}, exit code {p.returncode}")
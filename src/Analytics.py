@@ -0,0 +1,361 @@
+"""This script prints statistics on the games of a log directory or a
+GameArchive.
+
+Possible arguments:
+* The first argument that is not one of the following is the log
+directory or the archive. Defaults to the logs directory at the root of
+the repository.
+* "board_size=n" or "b=n" sets the board size of the first move
+statistics. Defaults to the most common board size.
+* "top=n" prints the n most common first moves. Defaults to 10.
+"""
+from os.path import exists
+from sys import argv
+
+import numpy as np
+
+from EndState import EndState
+from Game import Game
+from GameArchive import GameArchive
+
+
+class Analytics:
+    """Computes statistics on all games of a GameArchive at once, with
+    NumPy operations over its tables instead of loops over games or
+    moves.
+
+    Agents are referred to by their index in get_names(), and colours by
+    0 for red and 1 for blue. Unless stated otherwise, the colour of an
+    agent is the one it had at the end of the game, after a possible
+    swap, and a game is decided if it has a winner.
+    """
+
+    PERCENTILES = [50, 90, 99]
+
+    def __init__(self, archive):
+        self._archive = archive
+        self._games = archive.get_games()
+        self._moves = archive.get_moves()
+
+        games = self._games
+        self._decided = games["winner"] >= 0
+        # the colour the winner had at the end, 0 for red
+        self._winning_colour = games["winner"] ^ games["swapped"]
+
+    @staticmethod
+    def load(path):
+        """Returns the Analytics of an archive or a log directory, loaded
+        with GameArchive.load.
+        """
+
+        return Analytics(GameArchive.load(path))
+
+    def get_names(self):
+        return self._archive.get_names()
+
+    def get_count(self):
+        """Returns the number of games."""
+
+        return len(self._games)
+
+    def get_colour_win_rates(self):
+        """Returns the number of decided games and the share of them won
+        by red and by blue, as a dictionary. It has the same keys for the
+        colours the agents started with, under "started red" and "started
+        blue".
+        """
+
+        decided = self._decided
+        count = int(np.count_nonzero(decided))
+        if count == 0:
+            return {
+                "decided": 0,
+                "red": 0,
+                "blue": 0,
+                "started red": 0,
+                "started blue": 0,
+            }
+
+        red = np.count_nonzero(self._winning_colour[decided] == 0) / count
+        started_red = np.count_nonzero(self._games["winner"][decided] == 0) / count
+        return {
+            "decided": count,
+            "red": red,
+            "blue": 1 - red,
+            "started red": started_red,
+            "started blue": 1 - started_red,
+        }
+
+    def get_swap_win_rates(self):
+        """Returns the results of the games by swap decision, as a
+        dictionary with the keys False and True. Each value holds the
+        number of games and of decided games, and the share of decided
+        games won by the agent that made the decision, i.e. the one that
+        started as blue.
+        """
+
+        rates = {}
+        for swapped in [False, True]:
+            games = self._games["swapped"] == swapped
+            decided = games & self._decided
+            count = int(np.count_nonzero(decided))
+            won = np.count_nonzero(self._games["winner"][decided] == 1)
+            rates[swapped] = {
+                "games": int(np.count_nonzero(games)),
+                "decided": count,
+                "second player": won / count if count > 0 else 0,
+            }
+        return rates
+
+    def get_agent_results(self):
+        """Returns, for every agent, its number of games, of wins and of
+        losses by timeout and by illegal move, by starting colour, as
+        arrays of shape (agents, 2).
+        """
+
+        agents = len(self.get_names())
+        games = self._games
+        ended = {
+            "timeouts": games["end_state"] == Analytics._code(EndState.TIMEOUT),
+            "illegal moves": games["end_state"] == Analytics._code(EndState.BAD_MOVE),
+        }
+        results = {
+            key: np.zeros((agents, 2), dtype=np.int64)
+            for key in ["games", "wins"] + list(ended)
+        }
+        for colour, key in enumerate(["red", "blue"]):
+            # agents missing from incomplete logs are -1
+            known = games[key] >= 0
+            won = known & (games["winner"] == colour)
+            lost = known & (games["winner"] == 1 - colour)
+            for result, mask in [("games", known), ("wins", won)] + [
+                (result, lost & mask) for result, mask in ended.items()
+            ]:
+                results[result][:, colour] = np.bincount(
+                    games[key][mask], minlength=agents
+                )
+        return results
+
+    def get_end_state_rates(self):
+        """Returns the share of games that ended with each end state, as a
+        dictionary by end state text, "Unknown error" being the games
+        with no end state.
+        """
+
+        counts = np.bincount(
+            self._games["end_state"], minlength=len(GameArchive.END_STATES)
+        )
+        total = max(len(self._games), 1)
+        rates = {}
+        for code, state in enumerate(GameArchive.END_STATES):
+            name = "Unknown error" if state is None else EndState.get_text(state)
+            rates[name] = counts[code] / total
+        return rates
+
+    def get_move_time_distributions(self):
+        """Returns the distribution of the move times of every agent, as
+        Game.get_distribution does, as a list by agent. Timeouts are left
+        out.
+        """
+
+        times = np.ascontiguousarray(self._moves["time"])
+        plies = self._archive.get_plies()
+        move_games = self._archive.get_move_games()
+        # the agent that started as red plays the odd moves
+        move_agents = np.where(
+            plies % 2 == 1,
+            self._games["red"][move_games],
+            self._games["blue"][move_games],
+        )
+        move_agents[times < 0] = -1
+
+        return [
+            Analytics.get_distribution(times[move_agents == agent])
+            for agent in range(len(self.get_names()))
+        ]
+
+    @staticmethod
+    def get_distribution(times):
+        """Returns the same dictionary as Game.get_distribution for an
+        array of times. Percentiles are found by partitioning the array,
+        which is faster than sorting it.
+        """
+
+        count = len(times)
+        if count == 0:
+            return Game.get_distribution([])
+
+        # nearest ranks, as in Game.get_distribution, then the maximum
+        ranks = [max(-(-p * count // 100), 1) - 1 for p in Analytics.PERCENTILES]
+        values = np.partition(times, ranks + [count - 1])
+        total = int(times.sum())
+        d = {"count": count, "total": total, "mean": total // count}
+        for p, rank in zip(Analytics.PERCENTILES, ranks):
+            d[f"p{p}"] = int(values[rank])
+        d["max"] = int(values[count - 1])
+        return d
+
+    def get_length_histogram(self, bin_size=1):
+        """Returns the number of games by number of moves, in bins of
+        bin_size moves: the value at index i counts the games with i *
+        bin_size to (i + 1) * bin_size - 1 moves.
+        """
+
+        return np.bincount(self._games["moves"] // bin_size)
+
+    def get_board_sizes(self):
+        """Returns the board sizes and their numbers of games, from the
+        most to the least common.
+        """
+
+        sizes, counts = np.unique(self._games["board_size"], return_counts=True)
+        order = np.argsort(-counts, kind="stable")
+        return sizes[order], counts[order]
+
+    def get_first_moves(self, board_size):
+        """Returns statistics on the first moves of the games on a board
+        of the given size, as arrays of shape (board_size, board_size)
+        indexed by [x, y]: the number of games opened on each tile, the
+        share of them where the opening was swapped and the share of the
+        decided ones won by the agent that made it.
+        """
+
+        games = self._games
+        opened = (games["board_size"] == board_size) & (games["moves"] > 0)
+        first = self._moves[games["first_move"][opened]]
+        valid = (first["x"] >= 0) & (first["x"] < board_size)
+        valid &= (first["y"] >= 0) & (first["y"] < board_size)
+        tiles = (first["x"] * board_size + first["y"]).astype(np.int64)[valid]
+
+        second = games["first_move"][opened][valid] + 1
+        has_second = games["moves"][opened][valid] > 1
+        swapped = np.zeros(len(tiles), dtype=bool)
+        swapped[has_second] = self._moves["x"][second[has_second]] == -1
+        winner = games["winner"][opened][valid]
+
+        cells = board_size * board_size
+        counts = np.bincount(tiles, minlength=cells)
+        swaps = np.bincount(tiles, weights=swapped, minlength=cells)
+        decided = np.bincount(tiles, weights=winner >= 0, minlength=cells)
+        wins = np.bincount(tiles, weights=winner == 0, minlength=cells)
+
+        shape = (board_size, board_size)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            swap_rates = np.where(counts > 0, swaps / counts, 0)
+            win_rates = np.where(decided > 0, wins / decided, 0)
+        return {
+            "games": counts.reshape(shape),
+            "swap rate": swap_rates.reshape(shape),
+            "win rate": win_rates.reshape(shape),
+        }
+
+    @staticmethod
+    def _code(state):
+        return GameArchive.END_STATES.index(state)
+
+
+def print_report(analytics, board_size=None, top=10):
+    """Prints all statistics of an Analytics."""
+
+    names = analytics.get_names()
+    print(f"{analytics.get_count()} games between {len(names)} agents.")
+    if analytics.get_count() == 0:
+        return
+
+    rates = analytics.get_colour_win_rates()
+    print(
+        f"Decided games: {rates['decided']}. Red won {rates['red']:.1%}, "
+        + f"blue {rates['blue']:.1%}. The agent that started as red won "
+        + f"{rates['started red']:.1%}."
+    )
+    for swapped, r in analytics.get_swap_win_rates().items():
+        print(
+            f"{'Swapped' if swapped else 'Not swapped'}: {r['games']} games, "
+            + f"the second player won {r['second player']:.1%} of {r['decided']}."
+        )
+    print(
+        "End states: "
+        + ", ".join(
+            f"{name} {rate:.1%}"
+            for name, rate in analytics.get_end_state_rates().items()
+        )
+    )
+
+    print()
+    print(
+        "Agent,Games,Wins,Wins starting red,Wins starting blue,"
+        + "Timeouts,Illegal moves"
+    )
+    results = analytics.get_agent_results()
+    for agent, name in enumerate(names):
+        games = results["games"][agent]
+        wins = results["wins"][agent]
+        print(
+            f"{name},{games.sum()},{wins.sum()},"
+            + f"{wins[0]}/{games[0]},{wins[1]}/{games[1]},"
+            + f"{results['timeouts'][agent].sum()},"
+            + f"{results['illegal moves'][agent].sum()}"
+        )
+
+    print()
+    print("Agent,Moves,Mean,p50,p90,p99,Max")
+    for name, d in zip(names, analytics.get_move_time_distributions()):
+        print(
+            f"{name},{d['count']},"
+            + ",".join(
+                str(Game.ns_to_s(d[key]))
+                for key in ["mean", "p50", "p90", "p99", "max"]
+            )
+        )
+
+    print()
+    print("Moves,Games")
+    bin_size = 10
+    for index, count in enumerate(analytics.get_length_histogram(bin_size)):
+        if count > 0:
+            print(f"{index * bin_size}-{(index + 1) * bin_size - 1},{count}")
+
+    sizes, counts = analytics.get_board_sizes()
+    if board_size is None:
+        board_size = int(sizes[0])
+    first_moves = analytics.get_first_moves(board_size)
+    games = first_moves["games"].ravel()
+    print()
+    print(f"First moves on {board_size}x{board_size},Games,Swapped,Won")
+    for tile in np.argsort(-games, kind="stable")[:top]:
+        if games[tile] == 0:
+            break
+        x, y = divmod(int(tile), board_size)
+        print(
+            f"{x},{y},{games[tile]},"
+            + f"{first_moves['swap rate'][x, y]:.1%},"
+            + f"{first_moves['win rate'][x, y]:.1%}"
+        )
+
+
+def main():
+    path = Game.get_log_directory()
+    board_size = None
+    top = 10
+
+    try:
+        for argument in argv[1:]:
+            if "board_size=" in argument or "b=" in argument:
+                board_size = int(argument.split("=")[1])
+            elif "top=" in argument:
+                top = int(argument.split("=")[1])
+            else:
+                path = argument
+    except Exception:
+        print("ERROR: Arguments not valid. Aborted.")
+        return
+
+    if not exists(path):
+        print(f"ERROR: No games in {path}. Aborted.")
+        return
+
+    print_report(Analytics.load(path), board_size, top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""This script runs many games of Hex at once in one process.
+
+Every game is an AsyncGame, and all of them share one asyncio event
+loop, so hundreds of matches between cheap agents can be hosted
+without a thread or a process per game. This is meant for load tests;
+use Hex.py to watch a single match.
+
+Possible arguments:
+* "agent=name;command" or "a=name;command" specifies one agent, as
+in Hex.py. Missing agents are replaced with the default agent.
+* "games=n" or "g=n" plays n games at once. Defaults to 100.
+* "board_size=n" or "b=n" creates a custom square board of size
+nxn.
+
+It prints the number of games per second, then the agent and engine
+time per move of the worst game.
+"""
+import asyncio
+from sys import argv, platform
+from os.path import realpath, sep
+from time import time_ns as time
+
+from AsyncProtocol import AsyncProtocol
+from Colour import Colour
+from EndState import EndState
+from Game import Game
+
+
+class AsyncGame(Game):
+    """This class describes a game of Hex played on an asyncio event
+    loop. The rules, time accounting, logging and results are those of
+    Game; only waiting for the agents is asynchronous. Each move is
+    given the time its agent has left of Game.MAXIMUM_TIME.
+    """
+
+    def __init__(self, *args, port=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._protocol = AsyncProtocol(port)
+
+    async def run(self):
+        """Runs the match and returns its result, as described in
+        get_result.
+        """
+        try:
+            await self._play()
+        except BaseException as e:
+            self._end_game(None)
+            print(f"Exception raised: {e}")
+
+        await self._protocol.wait_closed()
+        return self._result
+
+    async def _play(self):
+        """Main method for a match. See Game._play."""
+
+        # connect to the agents
+        await self._start_protocol(
+            self._players[Colour.RED]["run string"],
+            self._players[Colour.RED]["name"],
+            self._players[Colour.BLUE]["run string"],
+            self._players[Colour.BLUE]["name"],
+        )
+        self._record_startup()
+        # test the connection
+        if not self._has_connected:
+            self._end_game(EndState.TIMEOUT)
+            return
+
+        self._start_game()
+        end_state = None
+        while end_state is None:
+            # get a move from the agents
+            m, move_time = await self._get_move()
+            end_state = self._play_move(m, move_time)
+
+        self._end_game(end_state)
+
+    async def _get_move(self):
+        """Receives a move from the currently playing agent. See
+        Game._get_move.
+        """
+
+        time_left = Game.MAXIMUM_TIME - self._players[self._player]["time"]
+        time_left = max(time_left, 0)
+
+        answer, move_time = await self._protocol.get_message(
+            self._player, time_left, self._print_protocol
+        )
+        # an answer read after the time left, e.g. one sent just before
+        # it ran out, is a timeout all the same
+        if move_time > time_left:
+            answer, move_time = ("NO MESSAGE", -1)
+        if self._has_opponent_failed():
+            return (None, -1)
+
+        return self._parse_move(answer, move_time)
+
+    async def _start_protocol(self, s1, name1, s2, name2):
+        """Sets up the TCP server, then starts the agents and
+        connects to them. If either connection fails, the game
+        will not start.
+        """
+        await self._protocol.start()
+
+        self._has_connected = await self._protocol.accept_connection(
+            s1, name1, Game.MAXIMUM_TIME, self._silent_bots, self._print_protocol
+        )
+        if not self._has_connected:
+            self._players[Colour.RED]["time"] = Game.MAXIMUM_TIME
+            return
+
+        self._has_connected = await self._protocol.accept_connection(
+            s2, name2, Game.MAXIMUM_TIME, self._silent_bots, self._print_protocol
+        )
+        if not self._has_connected:
+            self._players[Colour.BLUE]["time"] = Game.MAXIMUM_TIME
+            self._player = self._player.opposite()
+
+
+async def run_games(games):
+    """Runs the given AsyncGames concurrently and returns their results
+    in the same order.
+    """
+
+    return await asyncio.gather(*[g.run() for g in games])
+
+
+def main():
+    games = 100
+    board_size = 11
+    agents = []
+
+    for argument in argv[1:]:
+        if "agent=" in argument or "a=" in argument:
+            agents.append(
+                {
+                    "name": argument.split(";")[0].split("=")[1],
+                    "run string": argument.split(";")[1],
+                }
+            )
+        elif "games=" in argument or "g=" in argument:
+            games = int(argument.split("=")[1])
+        elif "board_size=" in argument or "b=" in argument:
+            board_size = int(argument.split("=")[1])
+
+    cmd_ending = "3"
+    if platform == "win32":
+        cmd_ending = ""
+    agent_path = sep.join(realpath(__file__).split(sep)[:-2])
+    agent_path += f"{sep}agents{sep}DefaultAgents{sep}NaiveAgent.py"
+    for idx in range(2 - len(agents)):
+        agents.append(
+            {
+                "name": f"DefaultAgent{idx+1}",
+                "run string": f"python{cmd_ending} {agent_path}",
+            }
+        )
+
+    g = [
+        AsyncGame(
+            board_size=board_size,
+            player1=agents[0],
+            player2=agents[1],
+            log=False,
+        )
+        for _ in range(games)
+    ]
+
+    start_time = time()
+    results = asyncio.run(run_games(g))
+    total_time = time() - start_time
+
+    end_states = {}
+    move_times, overheads = [], []
+    for result in results:
+        text = EndState.get_text(result["end state"])
+        end_states[text] = end_states.get(text, 0) + 1
+        for colour in Colour:
+            move_times.append(result[colour]["latency"])
+        overheads.append(result["engine overhead"])
+    print(
+        f"Played {games} games in {Game.ns_to_s(total_time)}s "
+        + f"({games * 10 ** 9 / total_time:.1f} games/s). "
+        + f"End states: {end_states}"
+    )
+
+    # under load, the tail of the per-game distributions shows the slow
+    # games; the worst game is reported for each
+    for label, distributions in [("Agent", move_times), ("Engine", overheads)]:
+        print(
+            f"{label} time per move: "
+            + f"p50 {Game.ns_to_s(max(d['p50'] for d in distributions))}s, "
+            + f"p99 {Game.ns_to_s(max(d['p99'] for d in distributions))}s, "
+            + f"max {Game.ns_to_s(max(d['max'] for d in distributions))}s "
+            + "(worst game)"
+        )
+
+
+if __name__ == "__main__":
+    main()
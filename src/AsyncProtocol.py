@@ -0,0 +1,340 @@
+import asyncio
+import os
+import shlex
+import signal
+import subprocess
+from sys import platform, stderr, stdout
+from time import time_ns
+
+from AgentProcess import AgentProcess
+from Colour import Colour
+from ProcessGroup import ProcessGroup
+from Protocol import Protocol
+
+
+class AsyncProtocol:
+    """Class that handles protocol communication between the engine and
+    the agents of one game on an asyncio event loop. It mirrors Protocol,
+    but waiting for agents to start, connect and move never blocks the
+    loop, so one thread can serve many games at once.
+
+    Sending is buffered and does not wait, so send_message, swap and
+    close can be called from Game as they are; accept_connection,
+    get_message and wait_closed are coroutines.
+
+    Messages are newline-framed and cut off at max_message_size bytes,
+    as with Protocol.
+
+    As with Protocol, an agent that exits before it connects, or while
+    the other agent is thinking, or that closes its connection on its
+    turn, is noticed at once instead of after its time runs out.
+    """
+
+    def __init__(self, port=0, max_message_size=Protocol.MAX_MESSAGE_SIZE):
+        self.port = port
+        self.max_message_size = max_message_size
+        self.server = None
+        self.sockets = {Colour.RED: {}, Colour.BLUE: {}}
+        self._connections = None
+        # the colour of the agent found dead by the last get_message
+        self._failed = None
+
+    async def start(self):
+        """Sets up a TCP server on the running event loop."""
+
+        self._connections = asyncio.Queue()
+        self.server = await asyncio.start_server(
+            self._on_connection,
+            Protocol.HOST,
+            self.port,
+            reuse_address=True,
+            limit=self.max_message_size,
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def _on_connection(self, reader, writer):
+        await self._connections.put((reader, writer))
+
+    async def accept_connection(
+        self, run_s, name, timeout_ns=30 * 10 ** 9, silent=True, verbose=False
+    ):
+        """Starts a subprocess with the specified string then waits for the
+        new process to connect to the server. Returns True if the connection
+        was made, False otherwise.
+        """
+
+        start = time_ns()
+
+        # determine the colour of the new agent
+        if len(self.sockets[Colour.RED].keys()) == 0:
+            colour = Colour.RED
+        elif len(self.sockets[Colour.BLUE].keys()) == 0:
+            colour = Colour.BLUE
+        else:
+            raise ValueError("Too many agents specified.")
+
+        output = stdout
+        if silent:
+            output = subprocess.DEVNULL
+
+        # start the agent, telling it which port to connect to
+        env = dict(os.environ)
+        env[Protocol.PORT_VARIABLE] = str(self.port)
+        t = await asyncio.create_subprocess_exec(
+            *shlex.split(run_s, posix=platform != "win32"),
+            stdout=output,
+            stderr=output,
+            env=env,
+            start_new_session=platform != "win32",
+        )
+
+        # wait for a connection, or for the agent to exit without one
+        connection = asyncio.ensure_future(self._connections.get())
+        exited = asyncio.ensure_future(t.wait())
+        await asyncio.wait(
+            [connection, exited],
+            timeout=timeout_ns / 10 ** 9,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        exited.cancel()
+        if connection.done():
+            reader, writer = connection.result()
+            addr = writer.get_extra_info("peername")
+            if verbose:
+                print(f"Connected {name} at {addr}")
+        else:
+            connection.cancel()
+            reader, writer, addr = None, None, None
+            if verbose:
+                print(f"{name} never connected.")
+
+        # set up associated arguments
+        self.sockets[colour]["name"] = name
+        self.sockets[colour]["thread"] = t
+        # the agent leads its own group, as in AgentProcess
+        self.sockets[colour]["group"] = (
+            ProcessGroup(t.pid) if platform != "win32" else None
+        )
+        self.sockets[colour]["terminated"] = False
+        self.sockets[colour]["reader"] = reader
+        self.sockets[colour]["conn"] = writer
+        self.sockets[colour]["addr"] = addr
+        self.sockets[colour]["startup"] = time_ns() - start
+
+        return writer is not None
+
+    async def get_message(self, colour, timeout_ns=30 * 10 ** 9, verbose=False):
+        """Waits for a message from the given colour agent for the specified
+        length of time. Returns the text and the associated wait time.
+
+        If the agent closes its connection, or the other agent exits,
+        first, it returns ("NO MESSAGE", -1) at once, as for a timeout,
+        and get_failed tells which agent it was.
+        """
+
+        self._failed = None
+        reader = self.sockets[colour]["reader"]
+        other = colour.opposite()
+        try:
+            move_time = time_ns()
+            read = asyncio.ensure_future(self._read_message(reader))
+            exited = asyncio.ensure_future(self.sockets[other]["thread"].wait())
+            done, _ = await asyncio.wait(
+                [read, exited],
+                timeout=timeout_ns / 10 ** 9,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            exited.cancel()
+            if read not in done:
+                read.cancel()
+                if exited in done:
+                    self._failed = other
+                    if verbose:
+                        print(f"{self.sockets[other]['name']} disconnected early.")
+                    return ("NO MESSAGE", -1)
+                raise asyncio.TimeoutError()
+            data = read.result()
+            move_time = time_ns() - move_time
+
+        except asyncio.TimeoutError:
+            if verbose:
+                print(f"{self.sockets[colour]['name']} timed out. Nothing received.")
+            return ("NO MESSAGE", -1)
+        except ConnectionResetError:
+            self._failed = colour
+            if verbose:
+                print(f"{self.sockets[colour]['name']} disconnected early.")
+            return ("NO MESSAGE", -1)
+        except Exception:
+            if verbose:
+                print(f"{self.sockets[colour]['name']} socket ended unexpectedly.")
+            return ("NO MESSAGE", -1)
+
+        if len(data) == 0 and reader.at_eof():
+            self._failed = colour
+            if verbose:
+                print(f"{self.sockets[colour]['name']} disconnected early.")
+            return ("NO MESSAGE", -1)
+
+        if verbose:
+            print(
+                f"Received {data.decode('utf-8').strip()} from "
+                + f"{self.sockets[colour]['name']} in "
+                + f"~{int(move_time/10**4)/10**5}s."
+            )
+
+        return (data.decode("utf-8"), move_time)
+
+    async def _read_message(self, reader):
+        """Returns the next message from reader, without its newline. A
+        message longer than the limit is cut off at the limit, and one
+        that ends with the connection is returned as it is.
+        """
+
+        try:
+            data = await reader.readuntil(b"\n")
+            return data[:-1]
+        except asyncio.LimitOverrunError:
+            return await reader.readexactly(self.max_message_size)
+        except asyncio.IncompleteReadError as e:
+            return e.partial
+
+    def get_startup(self, colour):
+        """Returns how long, in ns, the engine waited for the given colour
+        agent to start and connect, as in Protocol.
+        """
+
+        return self.sockets[colour].get("startup", 0)
+
+    def get_failed(self):
+        """Returns the colour of the agent the last get_message found to
+        have exited or closed its connection, or None, as in Protocol.
+        """
+
+        return self._failed
+
+    def send_message(self, colour, message, verbose=False):
+        """Queues the specified message for the specified colour agent."""
+
+        try:
+            self.sockets[colour]["conn"].write(bytes(message, "utf-8"))
+            if verbose:
+                print("Sent", message, end="")
+
+        except Exception:
+            if verbose:
+                print(
+                    f"Failed to send {message.strip()} to "
+                    + f"{self.sockets[colour]['name']}."
+                )
+
+    def get_shared_board(self, board_size):
+        """Returns None: the board is not shared."""
+
+        return None
+
+    def wants_board(self):
+        """Returns True: agents always get the board with every move."""
+
+        return True
+
+    def swap(self):
+        """Switches the colours of the two agents."""
+
+        self.sockets[Colour.RED], self.sockets[Colour.BLUE] = (
+            self.sockets[Colour.BLUE],
+            self.sockets[Colour.RED],
+        )
+
+    def close(self, kill_children=True, verbose=False):
+        """Closes the connections. If kill_children=True, it will also ask
+        the agents and the processes they started to exit, as each agent is
+        started in its own process group. Either way, wait_closed has to be
+        awaited afterwards to stop and reap the agents.
+        """
+
+        for colour in Colour:
+            x = self.sockets[colour]
+            if len(x.keys()) == 0:
+                continue
+
+            if kill_children:
+                self._signal(x, signal.SIGTERM)
+                x["terminated"] = True
+
+            try:
+                x["conn"].close()
+                if verbose:
+                    print(f"Closed {x['name']} at {x['addr']}")
+            except Exception:
+                if verbose:
+                    print(f"{x['name']} connection was already closed.")
+
+        if self.server is not None:
+            self.server.close()
+
+    def _signal(self, x, sig):
+        """Sends sig to the agent x and to the processes it started."""
+
+        if x["group"] is not None:
+            x["group"].signal(sig)
+        elif x["thread"].returncode is None:
+            try:
+                x["thread"].terminate()
+            except ProcessLookupError:
+                pass
+
+    async def _wait_stopped(self, x, deadline):
+        """Waits until deadline for the agent x and its processes to exit.
+        Returns True if they have.
+        """
+
+        try:
+            await asyncio.wait_for(
+                x["thread"].wait(), max(deadline - time_ns(), 0) / 10 ** 9
+            )
+        except asyncio.TimeoutError:
+            return False
+        while x["group"] is not None and x["group"].is_running():
+            if time_ns() >= deadline:
+                return False
+            await asyncio.sleep(AgentProcess.POLL_INTERVAL / 10 ** 9)
+        return True
+
+    async def wait_closed(self):
+        """Waits for the agents to exit and for the server to close. As in
+        Protocol.close, agents and processes still running after
+        AgentProcess.TERMINATE_TIMEOUT are killed, and those that outlive
+        that are reported and added to AgentProcess.leaked.
+        """
+
+        agents = [self.sockets[colour] for colour in Colour]
+        agents = [x for x in agents if len(x.keys()) != 0]
+        for x in agents:
+            if not x["terminated"]:
+                # the agent has exited; what it started is stopped with it
+                self._signal(x, signal.SIGTERM)
+                x["terminated"] = True
+
+        deadline = time_ns() + AgentProcess.TERMINATE_TIMEOUT
+        for x in agents:
+            if not await self._wait_stopped(x, deadline):
+                self._signal(
+                    x, signal.SIGKILL if platform != "win32" else signal.SIGTERM
+                )
+                await self._wait_stopped(x, time_ns() + AgentProcess.KILL_TIMEOUT)
+
+            if x["group"] is not None:
+                leaked = x["group"].get_processes()
+            else:
+                leaked = [x["thread"].pid] if x["thread"].returncode is None else []
+            AgentProcess.leaked += leaked
+            if len(leaked) > 0:
+                print(
+                    f"{x['name']} left processes running that could not be "
+                    + f"stopped: {leaked}.",
+                    file=stderr,
+                )
+
+        if self.server is not None:
+            await self.server.wait_closed()
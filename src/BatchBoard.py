@@ -0,0 +1,262 @@
+import numpy as np
+
+from Board import Board
+from Colour import Colour
+from Tile import Tile
+
+
+class BatchBoard:
+    """Class that describes a batch of Hex boards of the same size as one
+    NumPy array, for self-play and rollouts, where playing a Board per
+    game is too slow. Moves are applied to all boards at once, one move
+    per board, and the winners of all boards are kept up to date with
+    array operations.
+
+    The tiles are an int8 array of shape (batch_size, board_size,
+    board_size), indexed [board, x, y] like the tiles of Board, with
+    EMPTY, RED and BLUE. Like BitBoard, each colour also keeps the tiles
+    it has connected to its starting edge (top for Red, left for Blue),
+    grown when a move touches them, so a move does not search the whole
+    board.
+    """
+
+    EMPTY = 0
+    RED = 1
+    BLUE = 2
+
+    COLOURS = {None: EMPTY, Colour.RED: RED, Colour.BLUE: BLUE}
+    CHARS = np.frombuffer(b"0RB", dtype=np.uint8)
+
+    # the code of each character of the string forms of a board
+    CODES = np.zeros(256, dtype=np.int8)
+    CODES[ord("R")] = RED
+    CODES[ord("B")] = BLUE
+
+    def __init__(self, batch_size, board_size=11):
+        self._board_size = board_size
+        self._tiles = np.zeros((batch_size, board_size, board_size), dtype=np.int8)
+
+        # for every displacement, the slices of the tiles that have a
+        # neighbour in that direction and of those neighbours
+        n = board_size
+        self._shifts = [
+            (
+                np.s_[:, max(-dx, 0) : n - max(dx, 0), max(-dy, 0) : n - max(dy, 0)],
+                np.s_[:, max(dx, 0) : n - max(-dx, 0), max(dy, 0) : n - max(-dy, 0)],
+            )
+            for dx, dy in zip(Tile.I_DISPLACEMENTS, Tile.J_DISPLACEMENTS)
+        ]
+        self._reset_reach()
+
+    def from_strings(strings, board_size=11, bnf=True):
+        """Loads a batch from the string representations of its boards. If
+        bnf=True, they are protocol-formatted strings. Otherwise, they are
+        human-readable-formatted boards.
+        """
+
+        if bnf:
+            chars = "".join(s.replace(",", "") for s in strings)
+        else:
+            chars = "".join("".join(s.split()) for s in strings)
+
+        b = BatchBoard(len(strings), board_size)
+        codes = BatchBoard.CODES[np.frombuffer(chars.encode(), dtype=np.uint8)]
+        b._tiles[:] = codes.reshape(b._tiles.shape)
+        b._reset_reach()
+        return b
+
+    def from_boards(boards):
+        """Loads a batch from a list of Board or BitBoard objects."""
+
+        return BatchBoard.from_strings(
+            [b.print_board() for b in boards], boards[0].get_size()
+        )
+
+    def _spread(self, frontier, mask):
+        """Flood fills the frontier of each board through the tiles of its
+        mask, six directions at a time, and returns the filled regions.
+        Only boards whose region still grows are processed on each step.
+        """
+
+        regions = np.empty_like(frontier)
+        active = np.arange(len(frontier))
+        while len(active) > 0:
+            grown = frontier.copy()
+            for tiles, neighbours in self._shifts:
+                grown[tiles] |= frontier[neighbours]
+            grown &= mask
+
+            changed = (grown != frontier).any(axis=(1, 2))
+            if changed.all():
+                frontier = grown
+                continue
+            regions[active[~changed]] = grown[~changed]
+            active = active[changed]
+            frontier, mask = grown[changed], mask[changed]
+        return regions
+
+    def _reset_reach(self):
+        """Recomputes, from scratch, the tiles each colour has connected to
+        its starting edge and the winners of all boards.
+        """
+
+        red = self._tiles == BatchBoard.RED
+        blue = self._tiles == BatchBoard.BLUE
+        start = np.zeros_like(red)
+        start[:, 0, :] = red[:, 0, :]
+        self._red_reach = self._spread(start, red)
+        start = np.zeros_like(blue)
+        start[:, :, 0] = blue[:, :, 0]
+        self._blue_reach = self._spread(start, blue)
+
+        self._winners = np.zeros(len(self._tiles), dtype=np.int8)
+        self._update_winners(np.arange(len(self._tiles)))
+
+    def _update_winners(self, boards):
+        """Sets the winners of the given boards from their reach. Red wins
+        where both colours are connected, as in BitBoard.
+        """
+
+        n = self._board_size
+        blue = self._blue_reach[boards, :, n - 1].any(axis=1)
+        red = self._red_reach[boards, n - 1, :].any(axis=1)
+        winners = np.where(blue, BatchBoard.BLUE, BatchBoard.EMPTY)
+        self._winners[boards] = np.where(red, BatchBoard.RED, winners)
+
+    def is_valid_move(self, xs, ys):
+        """Returns, for every board, whether tile xs[i], ys[i] of board i
+        is on the board and empty.
+        """
+
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        n = self._board_size
+        valid = (xs >= 0) & (xs < n) & (ys >= 0) & (ys < n)
+        boards = np.flatnonzero(valid)
+        valid[boards] = self._tiles[boards, xs[boards], ys[boards]] == BatchBoard.EMPTY
+        return valid
+
+    def move(self, xs, ys, colours):
+        """Colours tile xs[i], ys[i] of board i with colours[i], a colour
+        code or one code for all boards, then updates the winners. Boards
+        whose move is not valid, e.g. -1,-1 for no move, are left as they
+        are. Returns the mask of the boards that were changed.
+        """
+
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        colours = np.broadcast_to(np.asarray(colours, dtype=np.int8), xs.shape)
+        valid = self.is_valid_move(xs, ys)
+        boards = np.flatnonzero(valid)
+        xs, ys, colours = xs[boards], ys[boards], colours[boards]
+        self._tiles[boards, xs, ys] = colours
+
+        # the neighbours of the new tiles that have the same colour
+        n = self._board_size
+        neighbours = []
+        for dx, dy in zip(Tile.I_DISPLACEMENTS, Tile.J_DISPLACEMENTS):
+            x_n, y_n = np.clip(xs + dx, 0, n - 1), np.clip(ys + dy, 0, n - 1)
+            inside = (x_n == xs + dx) & (y_n == ys + dy)
+            same = inside & (self._tiles[boards, x_n, y_n] == colours)
+            neighbours.append((x_n, y_n, same))
+
+        grown = []
+        for code, reach, on_edge in [
+            (BatchBoard.RED, self._red_reach, xs == 0),
+            (BatchBoard.BLUE, self._blue_reach, ys == 0),
+        ]:
+            # a new tile joins the reach if it is on the starting edge or
+            # next to a tile of the reach; if it is also next to a tile out
+            # of the reach, it brings that tile's chain with it
+            touches, extends = on_edge, np.zeros(len(boards), dtype=bool)
+            for x_n, y_n, same in neighbours:
+                in_reach = reach[boards, x_n, y_n]
+                touches = touches | (same & in_reach)
+                extends |= same & ~in_reach
+            touches &= colours == code
+            extends &= touches
+
+            joined = boards[extends]
+            frontier = np.zeros((len(joined), n, n), dtype=bool)
+            frontier[np.arange(len(joined)), xs[extends], ys[extends]] = True
+            mask = (self._tiles[joined] == code) & ~reach[joined]
+            reach[joined] |= self._spread(frontier, mask)
+
+            reach[boards[touches], xs[touches], ys[touches]] = True
+            grown.append(boards[touches])
+
+        self._update_winners(np.concatenate(grown))
+        return valid
+
+    def has_ended(self):
+        """Returns, for every board, whether a red chain connects top to
+        bottom or a blue chain connects left to right, as Board.has_ended
+        does for one board.
+        """
+
+        return self._winners != BatchBoard.EMPTY
+
+    def print_boards(self, bnf=True):
+        """Returns the string representations of all boards, as
+        Board.print_board does for one board.
+        """
+
+        batch_size, n = len(self._tiles), self._board_size
+        chars = np.full((batch_size, n, n + 1), ord(","), dtype=np.uint8)
+        chars[:, :, :n] = BatchBoard.CHARS[self._tiles]
+        data = chars.reshape(batch_size, -1)[:, :-1].tobytes().decode()
+        length = n * (n + 1) - 1
+        boards = [data[i * length : (i + 1) * length] for i in range(batch_size)]
+        if bnf:
+            return boards
+        return [BatchBoard._to_human(board) for board in boards]
+
+    def print_board(self, index, bnf=True):
+        """Returns the string representation of the board at index, as
+        Board.print_board does.
+        """
+
+        lines = BatchBoard.CHARS[self._tiles[index]]
+        output = b",".join(line.tobytes() for line in lines).decode()
+        if bnf:
+            return output
+        return BatchBoard._to_human(output)
+
+    def _to_human(output):
+        """Turns the protocol form of a board into its human-readable form."""
+
+        return "".join(
+            " " * i + " ".join(line) + " \n" for i, line in enumerate(output.split(","))
+        )
+
+    def to_board(self, index):
+        """Returns a Board with the tiles of the board at index."""
+
+        return Board.from_string(self.print_board(index), board_size=self._board_size)
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def get_winners(self):
+        """Returns the winner of every board as a colour code, EMPTY if it
+        has none.
+        """
+
+        return self._winners
+
+    def get_size(self):
+        return self._board_size
+
+    def get_tiles(self):
+        return self._tiles
+
+
+if __name__ == "__main__":
+    b = BatchBoard.from_strings(
+        [
+            "0R000B00000,0R000000000,0RBB0000000,0R000000000,0R00B000000,"
+            + "0R000BB0000,0R0000B0000,0R00000B000,0R000000B00,0R0000000B0,"
+            + "0R00000000B",
+            "0" * 11 + ",0000000000R" * 10,
+        ]
+    )
+    print(b.print_boards(bnf=False)[0])
+    print(b.has_ended(), b.get_winners())
@@ -0,0 +1,80 @@
+import struct
+
+
+class BinaryMessage:
+    """Compact encoding of the protocol messages, used by Protocol once an
+    agent has asked for it in the handshake.
+
+    Every message is one fixed-size record of four big-endian fields:
+    type (1 byte), colour (1 byte), x (2 bytes) and y (2 bytes). There is
+    no board snapshot; agents keep their own board from the moves.
+
+    * START: colour is the agent's colour, x is the board size.
+    * CHANGE: x,y is the move made, or -1,-1 for a swap. colour is the
+    player to move next, or 0 if the game has ended.
+    * END: colour is the winner, or 0 if there is none.
+    * MOVE (agent to engine): x,y is the move, or -1,-1 to swap.
+
+    Colours are the characters "R" and "B" as bytes.
+    """
+
+    RECORD = struct.Struct("!BBhh")
+    SIZE = RECORD.size
+
+    # colour fields by colour char; anything else is 0
+    COLOURS = {"R": ord("R"), "B": ord("B")}
+
+    START = ord("S")
+    CHANGE = ord("C")
+    END = ord("E")
+    MOVE = ord("M")
+
+    # the message an agent sends to ask for this encoding, and the
+    # engine's acknowledgement
+    HANDSHAKE = b"BINARY\n"
+
+    @staticmethod
+    def encode(message):
+        """Returns the record for a text protocol message, e.g.
+        "CHANGE;3,4;<board>;B\\n". The board, if present, is ignored.
+        """
+
+        fields = message.split(";")
+        colour = BinaryMessage.COLOURS.get(fields[-1].strip(), 0)
+        if fields[0] == "CHANGE":
+            if fields[1] == "SWAP":
+                x, y = -1, -1
+            else:
+                x, y = fields[1].split(",")
+            return BinaryMessage.RECORD.pack(
+                BinaryMessage.CHANGE, colour, int(x), int(y)
+            )
+        elif fields[0] == "START":
+            return BinaryMessage.RECORD.pack(
+                BinaryMessage.START, colour, int(fields[1]), 0
+            )
+        else:
+            return BinaryMessage.RECORD.pack(BinaryMessage.END, colour, 0, 0)
+
+    @staticmethod
+    def decode_move(record):
+        """Returns the text form of a move record ("x,y" or "SWAP"), as
+        Game expects it. Records that are not moves return "", which is
+        an illegal move.
+        """
+
+        if len(record) != BinaryMessage.SIZE:
+            return ""
+
+        message_type, _, x, y = BinaryMessage.RECORD.unpack(record)
+        if message_type != BinaryMessage.MOVE:
+            return ""
+        if x == -1 and y == -1:
+            return "SWAP"
+        return f"{x},{y}"
+
+
+if __name__ == "__main__":
+    for message in ["START;11;R\n", "CHANGE;3,4;0000,0000;B\n", "END;R\n"]:
+        record = BinaryMessage.encode(message)
+        print(message.strip(), "->", record.hex(), f"({len(record)} bytes)")
@@ -0,0 +1,208 @@
+from Tile import Tile
+from Colour import Colour
+
+
+class BitBoard:
+    """Class that describes the Hex board as bitmasks. It offers the same
+    methods as Board, but keeps one integer bitmask per colour plus an
+    occupancy mask instead of a grid of Tile objects.
+
+    Tile x,y is stored in bit x * (board_size + 1) + y. The extra bit at
+    the end of each line is always empty, so shifting a mask sideways
+    never wraps a tile onto the next line.
+    """
+
+    def __init__(self, board_size=11):
+        super().__init__()
+
+        self._board_size = board_size
+        self._stride = board_size + 1
+
+        line = (1 << board_size) - 1
+        self._top = line
+        self._bottom = line << ((board_size - 1) * self._stride)
+        self._left = 0
+        for i in range(board_size):
+            self._left |= 1 << (i * self._stride)
+        self._right = self._left << (board_size - 1)
+
+        self._masks = {Colour.RED: 0, Colour.BLUE: 0}
+        self._occupied = 0
+        self._tiles = None  # lazily built view for get_tiles
+
+        # protocol form of the board, patched in place as tiles change;
+        # tile x,y is at the same index as its bit
+        self._bnf = bytearray(",".join(["0" * board_size] * board_size), "utf-8")
+
+        self._reset_reach()
+
+    def from_string(string_input, board_size=11, bnf=True):
+        """Loads a board from a string representation. If bnf=True, it will
+        load a protocol-formatted string. Otherwise, it will load from a
+        human-readable-formatted board.
+        """
+
+        b = BitBoard(board_size=board_size)
+
+        # set the bits directly, then flood fill once
+        if bnf:
+            lines = string_input.split(",")
+        else:
+            lines = [line.strip().replace(" ", "") for line in string_input.split("\n")]
+        for i, line in enumerate(lines):
+            for j, char in enumerate(line):
+                colour = Colour.from_char(char)
+                if colour is not None:
+                    b._masks[colour] |= 1 << (i * b._stride + j)
+                    b._bnf[i * b._stride + j] = ord(Colour.get_char(colour))
+
+        b._occupied = b._masks[Colour.RED] | b._masks[Colour.BLUE]
+        b._reset_reach()
+        return b
+
+    def has_ended(self):
+        """Checks if the game has ended, i.e. if a red chain connects top to
+        bottom or a blue chain connects left to right of the board. The
+        chains are kept up to date by set_tile_colour, so this is a
+        constant-time lookup.
+        """
+
+        return self._winner is not None
+
+    def _spread(self, frontier, mask):
+        """Flood fills frontier through the tiles of mask, six directions
+        at a time, and returns the filled region.
+        """
+
+        s = self._stride
+        while True:
+            grown = (
+                frontier
+                | frontier << 1
+                | frontier >> 1
+                | frontier << s
+                | frontier >> s
+                | frontier << (s - 1)
+                | frontier >> (s - 1)
+            ) & mask
+            if grown == frontier:
+                return frontier
+            frontier = grown
+
+    def _reset_reach(self):
+        """Recomputes, from scratch, the tiles each colour has connected to
+        its starting edge (top for Red, left for Blue) and the winner.
+        """
+
+        self._reach = {
+            Colour.RED: self._spread(
+                self._masks[Colour.RED] & self._top, self._masks[Colour.RED]
+            ),
+            Colour.BLUE: self._spread(
+                self._masks[Colour.BLUE] & self._left, self._masks[Colour.BLUE]
+            ),
+        }
+
+        self._winner = None
+        if self._reach[Colour.RED] & self._bottom:
+            self._winner = Colour.RED
+        elif self._reach[Colour.BLUE] & self._right:
+            self._winner = Colour.BLUE
+
+    def _neighbours(self, bit):
+        """Returns the mask of the six tiles around the given bit mask."""
+
+        s = self._stride
+        return (
+            bit << 1 | bit >> 1 | bit << s | bit >> s | bit << (s - 1) | bit >> (s - 1)
+        )
+
+    def print_board(self, bnf=True):
+        """Returns the string representation of a board. If bnf=True, the
+        string will be formatted according to the communication protocol.
+        """
+
+        if bnf:
+            return self._bnf.decode("utf-8")
+
+        output = ""
+        for i, line in enumerate(self._bnf.decode("utf-8").split(",")):
+            output += " " * i + " ".join(line) + " \n"
+        return output
+
+    def get_winner(self):
+        return self._winner
+
+    def get_size(self):
+        return self._board_size
+
+    def get_tiles(self):
+        """Returns the board as a grid of Tile objects. The grid is only
+        built for callers that ask for it and is rebuilt after the board
+        changes; changing its tiles does not change the board.
+        """
+
+        if self._tiles is None:
+            self._tiles = []
+            for i in range(self._board_size):
+                self._tiles.append(
+                    [
+                        Tile(i, j, self.get_tile_colour(i, j))
+                        for j in range(self._board_size)
+                    ]
+                )
+        return self._tiles
+
+    def get_tile_colour(self, x, y):
+        bit = 1 << (x * self._stride + y)
+        if not self._occupied & bit:
+            return None
+        elif self._masks[Colour.RED] & bit:
+            return Colour.RED
+        else:
+            return Colour.BLUE
+
+    def set_tile_colour(self, x, y, colour):
+        """Colours the tile at x,y and updates the chains. Colouring an
+        empty tile can only grow a chain from where it touches; recolouring
+        an occupied tile can split chains, so they are recomputed.
+        """
+
+        bit = 1 << (x * self._stride + y)
+        previous = self.get_tile_colour(x, y)
+        if previous == colour:
+            return
+        self._tiles = None
+        self._bnf[x * self._stride + y] = ord(Colour.get_char(colour))
+
+        if previous is not None:
+            self._masks[previous] &= ~bit
+        if colour is not None:
+            self._masks[colour] |= bit
+        self._occupied = self._masks[Colour.RED] | self._masks[Colour.BLUE]
+
+        if previous is not None:
+            self._reset_reach()
+            return
+
+        edge, goal = self._top, self._bottom
+        if colour == Colour.BLUE:
+            edge, goal = self._left, self._right
+
+        reach = self._reach[colour]
+        if bit & edge or self._neighbours(bit) & reach:
+            reach = self._spread(reach | bit, self._masks[colour])
+            self._reach[colour] = reach
+            if reach & goal and self._winner is None:
+                self._winner = colour
+
+
+if __name__ == "__main__":
+    b = BitBoard.from_string(
+        "0R000B00000,0R000000000,0RBB0000000,0R000000000,0R00B000000,"
+        + "0R000BB0000,0R0000B0000,0R00000B000,0R000000B00,0R0000000B0,"
+        + "0R00000000B",
+        bnf=True,
+    )
+    print(b.print_board(bnf=False))
+    print(b.has_ended(), b.get_winner())
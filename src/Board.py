@@ -1,5 +1,6 @@
 from Tile import Tile
 from Colour import Colour
+from Topology import Topology
 
 
 class Board:
@@ -9,6 +10,7 @@ class Board:
         super().__init__()
 
         self._board_size = board_size
+        self._topology = Topology.get(board_size)
 
         self._tiles = []
         for i in range(board_size):
@@ -16,8 +18,13 @@ class Board:
             for j in range(board_size):
                 new_line.append(Tile(i, j))
             self._tiles.append(new_line)
+        # the same tiles, by flat index
+        self._flat_tiles = [tile for line in self._tiles for tile in line]
 
-        self._winner = None
+        # protocol form of the board, patched in place as tiles change
+        self._bnf = bytearray(",".join(["0" * board_size] * board_size), "utf-8")
+
+        self._reset_connectivity()
 
     def from_string(string_input, board_size=11, bnf=True):
         """Loads a board from a string representation. If bnf=True, it will
@@ -27,116 +34,123 @@ class Board:
 
         b = Board(board_size=board_size)
 
+        # colour the tiles directly, then build the connectivity in one pass
         if bnf:
             lines = string_input.split(",")
             for i, line in enumerate(lines):
                 for j, char in enumerate(line):
-                    b.set_tile_colour(i, j, Colour.from_char(char))
+                    b._tiles[i][j].set_colour(Colour.from_char(char))
+                    b._set_char(i, j, Colour.from_char(char))
         else:
             lines = [line.strip() for line in string_input.split("\n")]
             for i, line in enumerate(lines):
                 chars = line.split(" ")
                 for j, char in enumerate(chars):
-                    b.set_tile_colour(i, j, Colour.from_char(char))
+                    b._tiles[i][j].set_colour(Colour.from_char(char))
+                    b._set_char(i, j, Colour.from_char(char))
 
+        b._rebuild_connectivity()
         return b
 
     def has_ended(self):
-        """Checks if the game has ended. It will attempt to find a red chain
-        from top to bottom or a blue chain from left to right of the board.
+        """Checks if the game has ended, i.e. if a red chain connects top to
+        bottom or a blue chain connects left to right of the board. The
+        connectivity is kept up to date by set_tile_colour, so this is a
+        constant-time lookup.
         """
 
-        # Red
-        # for all top tiles, check if they connect to bottom
-        for idx in range(self._board_size):
-            tile = self._tiles[0][idx]
-            if (
-                not tile.is_visited()
-                and tile.get_colour() == Colour.RED
-                and self._winner is None
-            ):
-                self.DFS_colour(0, idx, Colour.RED)
-        # Blue
-        # for all left tiles, check if they connect to right
-        for idx in range(self._board_size):
-            tile = self._tiles[idx][0]
-            if (
-                not tile.is_visited()
-                and tile.get_colour() == Colour.BLUE
-                and self._winner is None
-            ):
-                self.DFS_colour(idx, 0, Colour.BLUE)
-
-        # un-visit tiles
-        self.clear_tiles()
-
         return self._winner is not None
 
-    def clear_tiles(self):
-        """Clears the visited status from all tiles."""
+    def _find(self, idx):
+        """Returns the representative of the set containing idx, halving the
+        path on the way up.
+        """
+
+        parent = self._parent
+        while parent[idx] != idx:
+            parent[idx] = parent[parent[idx]]
+            idx = parent[idx]
+        return idx
+
+    def _union(self, idx_1, idx_2):
+        """Joins the sets containing idx_1 and idx_2, by rank."""
+
+        root_1 = self._find(idx_1)
+        root_2 = self._find(idx_2)
+        if root_1 == root_2:
+            return
 
-        for line in self._tiles:
-            for tile in line:
-                tile.clear_visit()
+        if self._rank[root_1] < self._rank[root_2]:
+            root_1, root_2 = root_2, root_1
+        self._parent[root_2] = root_1
+        if self._rank[root_1] == self._rank[root_2]:
+            self._rank[root_1] += 1
 
-    def DFS_colour(self, x, y, colour):
-        """A recursive DFS method that iterates through connected same-colour
-        tiles until it finds a bottom tile (Red) or a right tile (Blue).
+    def _connect(self, idx, colour, neighbours):
+        """Joins the tile at flat index idx with its same-colour neighbours
+        and with the virtual edge nodes it touches, then updates the
+        winner. neighbours are the neighbour lists of the topology to use.
         """
 
-        self._tiles[x][y].visit()
+        if colour is None:
+            return
+
+        tiles = self._flat_tiles
+        for idx_n in neighbours[idx]:
+            if tiles[idx_n].get_colour() == colour:
+                self._union(idx, idx_n)
 
-        # win conditions
+        topology = self._topology
         if colour == Colour.RED:
-            if x == self._board_size - 1:
+            for edge in topology.red_edges[idx]:
+                self._union(idx, edge)
+            if self._find(topology.top) == self._find(topology.bottom):
                 self._winner = colour
         elif colour == Colour.BLUE:
-            if y == self._board_size - 1:
+            for edge in topology.blue_edges[idx]:
+                self._union(idx, edge)
+            if self._find(topology.left) == self._find(topology.right):
                 self._winner = colour
-        else:
-            return
 
-        # end condition
-        if self._winner is not None:
-            return
+    def _reset_connectivity(self):
+        """Creates an empty disjoint-set forest over all tiles plus the four
+        virtual edge nodes (top, bottom, left and right) of the topology.
+        """
 
-        # visit neighbours
-        for idx in range(Tile.NEIGHBOUR_COUNT):
-            x_n = x + Tile.I_DISPLACEMENTS[idx]
-            y_n = y + Tile.J_DISPLACEMENTS[idx]
-            if (
-                x_n >= 0
-                and x_n < self._board_size
-                and y_n >= 0
-                and y_n < self._board_size
-            ):
-                neighbour = self._tiles[x_n][y_n]
-                if not neighbour.is_visited() and neighbour.get_colour() == colour:
-                    self.DFS_colour(x_n, y_n, colour)
+        node_count = self._topology.tile_count + 4
+        self._parent = list(range(node_count))
+        self._rank = [0] * node_count
+        self._winner = None
+
+    def _rebuild_connectivity(self):
+        """Rebuilds the connectivity from the current tile colours. Tiles
+        are visited row by row, so each one only has to be joined with the
+        neighbours that were visited before it.
+        """
+
+        self._reset_connectivity()
+        preceding = self._topology.preceding_neighbours
+        for idx, tile in enumerate(self._flat_tiles):
+            self._connect(idx, tile.get_colour(), preceding)
 
     def print_board(self, bnf=True):
         """Returns the string representation of a board. If bnf=True, the
         string will be formatted according to the communication protocol.
         """
 
-        output = ""
         if bnf:
-            for line in self._tiles:
-                for tile in line:
-                    output += Colour.get_char(tile.get_colour())
-                output += ","
-            output = output[:-1]
-        else:
-            leading_spaces = ""
-            for line in self._tiles:
-                output += leading_spaces
-                leading_spaces += " "
-                for tile in line:
-                    output += Colour.get_char(tile.get_colour()) + " "
-                output += "\n"
+            return self._bnf.decode("utf-8")
 
+        output = ""
+        for i, line in enumerate(self._bnf.decode("utf-8").split(",")):
+            output += " " * i + " ".join(line) + " \n"
         return output
 
+    def _set_char(self, x, y, colour):
+        """Patches the protocol form of the board at tile x,y."""
+
+        self._bnf[x * (self._board_size + 1) + y] = ord(Colour.get_char(colour))
+
     def get_winner(self):
         return self._winner
 
@@ -146,8 +160,24 @@ class Board:
     def get_tiles(self):
         return self._tiles
 
+    def get_tile_colour(self, x, y):
+        return self._tiles[x][y].get_colour()
+
     def set_tile_colour(self, x, y, colour):
-        self._tiles[x][y].set_colour(colour)
+        """Colours the tile at x,y and updates the connectivity. Colouring
+        an empty tile only joins it with its neighbours; recolouring an
+        occupied tile can split chains, so the connectivity is rebuilt.
+        """
+
+        tile = self._tiles[x][y]
+        previous = tile.get_colour()
+        tile.set_colour(colour)
+        self._set_char(x, y, colour)
+
+        if previous is None:
+            self._connect(x * self._board_size + y, colour, self._topology.neighbours)
+        elif previous != colour:
+            self._rebuild_connectivity()
 
 
 if __name__ == "__main__":
@@ -1,15 +1,17 @@
+from contextlib import nullcontext
 from sys import stderr
 from time import time_ns as time
 from os.path import realpath, sep
-from os.path import exists
 from datetime import datetime
 from pathlib import Path
 
 from Colour import Colour
 from Board import Board
+from BitBoard import BitBoard
 from Move import Move
 from Protocol import Protocol
 from EndState import EndState
+from LogWriter import LogWriter
 
 
 class Game:
@@ -31,37 +33,83 @@ class Game:
         print_protocol=False,
         kill_bots=True,
         silent_bots=True,
+        bitboard=False,
+        port=0,
+        protocol=None,
+        log_latency=False,
+        tracer=None,
+        log_writer=None,
+        pool=None,
     ):
         self._turn = 1  # current turn count
-        self._board = Board(board_size)
+        if bitboard:
+            self._board = BitBoard(board_size)
+        else:
+            self._board = Board(board_size)
         self._player = Colour.RED  # current player
         self._start_time = 0  # used to calculate time elapsed
         self._has_swapped = False  # pie rule
+        self._shared_board = None  # the board mirrored for the agents
 
         self._players = {
             Colour.RED: {"name": None, "run string": None, "turns": 0, "time": 0},
             Colour.BLUE: {"name": None, "run string": None, "turns": 0, "time": 0},
         }
+        # the time of every move, kept by player, and the time the engine
+        # waited for the agent to start, which is not part of its time
+        for colour in Colour:
+            self._players[colour]["move times"] = []
+            self._players[colour]["startup"] = 0
+        # the time the engine spends on each move between receiving it and
+        # waiting for the next one: parsing, checking, playing and sending
+        self._overheads = []
+        self._answer_time = 0
         self._players[Colour.RED]["name"] = player1["name"]
         self._players[Colour.RED]["run string"] = player1["run string"]
         self._players[Colour.BLUE]["name"] = player2["name"]
         self._players[Colour.BLUE]["run string"] = player2["run string"]
+        # how each agent is connected, TCP unless the player gives one
+        self._players[Colour.RED]["transport"] = player1.get("transport", Protocol.TCP)
+        self._players[Colour.BLUE]["transport"] = player2.get("transport", Protocol.TCP)
 
         self._kill_bots = kill_bots
         self._silent_bots = silent_bots
 
+        # each game listens on its own port; 0 lets the OS choose a free one.
+        # A protocol passed in is owned by the caller, who can reuse its
+        # agents for further games, so it is left open at the end.
+        self._owns_protocol = protocol is None
+        # A pool passed in starts the agents of the games ahead of them;
+        # its owner refills it between games.
+        if protocol is None:
+            protocol = Protocol(port, pool=pool)
+        self._protocol = protocol
+
         self._verbose = verbose
         self._print_protocol = print_protocol
-        self._log = log
+        # a log writer passed in is shared with other games, so it is only
+        # flushed at the end
+        self._log = log or log_writer is not None
+        self._log_writer = log_writer
+        self._owns_log = log_writer is None
+        self._log_latency = log_latency
+        self._tracer = tracer
+        self._result = None
         self._start_log()
 
     def run(self):
-        """Runs the match."""
+        """Runs the match and returns its result, as described in
+        get_result.
+        """
         try:
             self._play()
         except BaseException as e:
             self._end_game(None)
             print(f"Exception raised: {e}")
+        finally:
+            self._close_log()
+
+        return self._result
 
     def _play(self):
         """Main method for a match.
@@ -76,19 +124,45 @@ class Game:
         fails to connect.
         """
 
-        # connect to the agents
-        self._start_protocol(
-            self._players[Colour.RED]["run string"],
-            self._players[Colour.RED]["name"],
-            self._players[Colour.BLUE]["run string"],
-            self._players[Colour.BLUE]["name"],
-        )
+        # connect to the agents, unless they are still connected
+        # from a previous game
+        with self._span("connect"):
+            if self._protocol.is_connected():
+                self._protocol.assign(self._players[Colour.RED]["name"])
+                self._has_connected = True
+            else:
+                self._start_protocol(
+                    self._players[Colour.RED]["run string"],
+                    self._players[Colour.RED]["name"],
+                    self._players[Colour.BLUE]["run string"],
+                    self._players[Colour.BLUE]["name"],
+                )
+                self._record_startup()
         # test the connection
         if not self._has_connected:
-            self._end_game(EndState.TIMEOUT)
+            with self._span("end game"):
+                self._end_game(EndState.TIMEOUT)
             return
 
-        # start the game
+        with self._span("start"):
+            self._start_game()
+        end_state = None
+        while end_state is None:
+            # get a move from the agents
+            m, move_time = self._get_move()
+            end_state = self._play_move(m, move_time)
+
+        with self._span("end game"):
+            self._end_game(end_state)
+
+    def _start_game(self):
+        """Sends the start message to both agents and starts the
+        clock.
+        """
+
+        # the mirror of the board agents can read, if the protocol has one;
+        # it is ready before they are told the game started
+        self._shared_board = self._protocol.get_shared_board(self._board.get_size())
         self._send_message(
             verbose_message=(
                 "Started game of Hex. Board is "
@@ -100,35 +174,42 @@ class Game:
         )
 
         self._start_time = time()
-        end_state = EndState.WIN
 
-        while not self._board.has_ended():
-            # get a move from the agents
-            m, move_time = self._get_move()
+    def _play_move(self, m, move_time):
+        """Checks and performs a move received from the current agent.
+        Returns the end state if the move ended the game, None
+        otherwise.
+        """
 
-            # This message is sent after reading a move because it
-            # is a time-consuming operation. Changing the order
-            # will decrease the accuracy with which move time is
-            # recorded.
+        # This message is sent after reading a move because it
+        # is a time-consuming operation. Changing the order
+        # will decrease the accuracy with which move time is
+        # recorded. The board is only rendered if it is shown.
+        if self._verbose:
             self._send_message(verbose_message=self._board.print_board(bnf=False))
 
-            # timeout
-            if move_time == -1:
-                end_state = EndState.TIMEOUT
-                self._players[self._player]["time"] = Game.MAXIMUM_TIME
-                break
+        # timeout
+        if move_time == -1:
+            self._players[self._player]["time"] = Game.MAXIMUM_TIME
+            return EndState.TIMEOUT
 
-            # illegal move
-            if not m.is_valid_move(self):
-                end_state = EndState.BAD_MOVE
-                self._flip_turn(move_time)
-                break
+        # illegal move
+        with self._span("validate"):
+            is_valid = m.is_valid_move(self)
+        if not is_valid:
+            self._flip_turn(move_time)
+            return EndState.BAD_MOVE
 
-            # If all checks passed, proceed normally
+        # If all checks passed, proceed normally
+        with self._span("make move"):
             self._make_move(m)
-            self._flip_turn(move_time)
+        self._flip_turn(move_time)
 
-        self._end_game(end_state)
+        with self._span("has ended"):
+            has_ended = self._board.has_ended()
+        if has_ended:
+            return EndState.WIN
+        return None
 
     def _make_move(self, m):
         """Performs a valid move on the board, then prints its
@@ -140,22 +221,33 @@ class Game:
 
         if m.is_swap():
             self._swap()
+            if self._shared_board is not None:
+                self._shared_board.swap()
 
             verbose_message = "swapped colours"
             protocol_message += "SWAP;"
 
         else:
             m.move(self._board)
+            if self._shared_board is not None:
+                self._shared_board.play(m.get_x(), m.get_y(), m.colour)
 
             verbose_message = f"occupied {m.get_x()},{m.get_y()}"
             protocol_message += f"{m.get_x()},{m.get_y()};"
 
         next_player = self.get_next_player()
 
-        verbose_message = f"{self._players[self._player]['name']} {verbose_message}"
-        protocol_message += f"{self._board.print_board()};{next_player}\n"
+        # the board is only rendered for agents that use the text protocol
+        with self._span("serialize"):
+            board = ""
+            if self._protocol.wants_board():
+                board = self._board.print_board()
 
-        self._send_message(verbose_message, protocol_message)
+            verbose_message = f"{self._players[self._player]['name']} {verbose_message}"
+            protocol_message += f"{board};{next_player}\n"
+
+        with self._span("send"):
+            self._send_message(verbose_message, protocol_message)
 
     def get_next_player(self):
         """Returns END if the game is over or the opposite player
@@ -177,15 +269,15 @@ class Game:
 
         if protocol_message != "":
             if start:
-                Protocol.send_message(
+                self._protocol.send_message(
                     Colour.RED, f"{protocol_message}R\n", verbose=self._print_protocol
                 )
-                Protocol.send_message(Colour.BLUE, f"{protocol_message}B\n")
+                self._protocol.send_message(Colour.BLUE, f"{protocol_message}B\n")
             else:
-                Protocol.send_message(
+                self._protocol.send_message(
                     Colour.RED, protocol_message, verbose=self._print_protocol
                 )
-                Protocol.send_message(Colour.BLUE, protocol_message)
+                self._protocol.send_message(Colour.BLUE, protocol_message)
 
     def _get_move(self):
         """Receives a move from the currently playing agent.
@@ -200,9 +292,40 @@ class Game:
         time_left = Game.MAXIMUM_TIME - self._players[self._player]["time"]
         time_left = max(time_left, 0)
 
-        answer, move_time = Protocol.get_message(
-            self._player, time_left, self._print_protocol
-        )
+        with self._span(
+            "wait", turn=self._turn, player=self._players[self._player]["name"]
+        ):
+            answer, move_time = self._protocol.get_message(
+                self._player, time_left, self._print_protocol
+            )
+        # an answer read after the time left, e.g. one sent just before
+        # it ran out, is a timeout all the same
+        if move_time > time_left:
+            answer, move_time = ("NO MESSAGE", -1)
+        if self._has_opponent_failed():
+            return (None, -1)
+
+        with self._span("parse"):
+            return self._parse_move(answer, move_time)
+
+    def _has_opponent_failed(self):
+        """Returns True if the agent that was not playing exited or closed
+        its connection while the current agent was thinking. That agent
+        then becomes the current player, so it loses on time. No move is
+        logged for the agent that was playing.
+        """
+
+        if self._protocol.get_failed() != self._player.opposite():
+            return False
+        self._player = self._player.opposite()
+        return True
+
+    def _parse_move(self, answer, move_time):
+        """Turns the answer of the current agent into a Move and logs
+        it. Returns a tuple (move, time), as _get_move does.
+        """
+
+        self._answer_time = time()
 
         move, log_message = None, 0
         try:
@@ -251,7 +374,7 @@ class Game:
         self._has_swapped = True
         self._player = Colour.opposite(self._player)
 
-        Protocol.swap()
+        self._protocol.swap()
 
     def _flip_turn(self, move_time):
         """Increments the statistics of the current player, then
@@ -260,6 +383,8 @@ class Game:
 
         self._players[self._player]["turns"] += 1
         self._players[self._player]["time"] += move_time
+        self._players[self._player]["move times"].append(move_time)
+        self._overheads.append(time() - self._answer_time)
 
         self._turn += 1
         self._player = Colour.opposite(self._player)
@@ -270,7 +395,8 @@ class Game:
         """
 
         # print the board again
-        self._send_message(verbose_message=self._board.print_board(bnf=False))
+        if self._verbose:
+            self._send_message(verbose_message=self._board.print_board(bnf=False))
 
         # calculate total time elapsed
         total_time = time() - self._start_time
@@ -364,11 +490,30 @@ class Game:
                 + f"{self._players[colour]['time']},{means[colour]}\n"
             )
 
+        # latency distributions
+        latencies = {
+            colour: Game.get_distribution(self._players[colour]["move times"])
+            for colour in Colour
+        }
+        overhead = Game.get_distribution(self._overheads)
+        if self._log_latency:
+            for name, label, d in [
+                (self._players[Colour.RED]["name"], "Latency", latencies[Colour.RED]),
+                (self._players[Colour.BLUE]["name"], "Latency", latencies[Colour.BLUE]),
+                ("Engine", "Overhead", overhead),
+            ]:
+                log_message += (
+                    f"0,{name},{label},{d['p50']},{d['p90']},"
+                    + f"{d['p99']},{d['max']}\n"
+                )
+
         self._send_message(verbose_message, protocol_message)
         self._write_log(log_message)
 
         if self._log:
-            print(f"Saved log to {self._log_path}")
+            self._close_log()
+            if self._owns_log:
+                print(f"Saved log to {self._log_writer.get_path()}")
 
         # short-form results; easier to read than verbose option
         red_end_s = (
@@ -390,65 +535,146 @@ class Game:
         final_message = f"{EndState.get_text(status)}\n{red_end_s}\n{blue_end_s}"
         print(final_message, file=stderr)
 
+        # the same results in structured form, by starting colour
+        self._result = {
+            "end state": status,
+            "winner": None,
+            "swapped": self._has_swapped,
+            "turns": self._turn,
+            "time": total_time,
+            "board size": self._board.get_size(),
+            "engine overhead": overhead,
+        }
+        for colour in Colour:
+            starting_colour = colour
+            if self._has_swapped:
+                starting_colour = colour.opposite()
+            self._result[starting_colour] = {
+                "name": self._players[colour]["name"],
+                "run string": self._players[colour]["run string"],
+                "won": status is not None and self._player == colour,
+                "turns": self._players[colour]["turns"],
+                "time": self._players[colour]["time"],
+                "startup": self._players[colour]["startup"],
+                "latency": latencies[colour],
+            }
+        if status is not None:
+            self._result["winner"] = self._players[self._player]["name"]
+
         # close communications
-        Protocol.close(kill_children=self._kill_bots, verbose=self._print_protocol)
+        if self._owns_protocol:
+            self._protocol.close(
+                kill_children=self._kill_bots, verbose=self._print_protocol
+            )
 
     def _start_protocol(self, s1, name1, s2, name2):
         """Sets up the TCP server, then starts the agents and
         connects to them. If either connection fails, the game
         will not start.
         """
-        Protocol.start()
-
-        self._has_connected = Protocol.accept_connection(
-            s1, name1, Game.MAXIMUM_TIME, self._silent_bots, self._print_protocol
+        self._protocol.start()
+
+        self._has_connected = self._protocol.accept_connection(
+            s1,
+            name1,
+            Game.MAXIMUM_TIME,
+            self._silent_bots,
+            self._print_protocol,
+            self._players[Colour.RED]["transport"],
         )
         if not self._has_connected:
             self._players[Colour.RED]["time"] = Game.MAXIMUM_TIME
             return
 
-        self._has_connected = Protocol.accept_connection(
-            s2, name2, Game.MAXIMUM_TIME, self._silent_bots, self._print_protocol
+        self._has_connected = self._protocol.accept_connection(
+            s2,
+            name2,
+            Game.MAXIMUM_TIME,
+            self._silent_bots,
+            self._print_protocol,
+            self._players[Colour.BLUE]["transport"],
         )
         if not self._has_connected:
             self._players[Colour.BLUE]["time"] = Game.MAXIMUM_TIME
             self._player = self._player.opposite()
 
+    def _record_startup(self):
+        """Keeps how long the engine waited for each agent to start."""
+
+        for colour in Colour:
+            self._players[colour]["startup"] = self._protocol.get_startup(colour)
+
     def _start_log(self):
-        """Creates the log file and writes the start message."""
+        """Opens the log, unless one was given, and writes the start
+        message.
+        """
         if not self._log:
             return
 
-        # get the relative path to the log directory
-        log_path = realpath(__file__)
-        log_path = sep.join(log_path.split(sep)[:-2])
-        log_path += f"{sep}logs{sep}"
-
-        # create the log directory if it doesn't exist
-        Path(log_path).mkdir(parents=True, exist_ok=True)
-
-        # create a new log file
-        self._log_path = log_path + "log.csv"
-        idx = 1
-        while exists(self._log_path):
-            self._log_path = log_path + f"log{idx}.csv"
-            idx += 1
+        if self._log_writer is None:
+            self._log_writer = LogWriter.create(Game.get_log_directory())
 
         # submit the start message
-        with open(self._log_path, "w") as f:
-            f.write(f"Start log at {datetime.now()}\n")
-            f.write(
-                f"Board is {self._board.get_size()}x" + f"{self._board.get_size()}.\n"
-            )
-            f.write("No,Player,X,Y,Time\n")
+        self._log_writer.write(
+            f"Start log at {datetime.now()}\n"
+            + f"Board is {self._board.get_size()}x{self._board.get_size()}.\n"
+            + "No,Player,X,Y,Time\n"
+        )
 
     def _write_log(self, message):
-        """Writes the specified message and a newline to the log file."""
+        """Writes the specified message and a newline to the log."""
+        if not self._log:
+            return
+
+        self._log_writer.write(message + "\n")
+
+    def _close_log(self):
+        """Writes the log to disk: closes it if the game opened it, flushes
+        it otherwise. Nothing is logged afterwards.
+        """
         if not self._log:
             return
 
-        with open(self._log_path, "a") as f:
-            f.write(message + "\n")
+        if self._owns_log:
+            self._log_writer.close()
+        else:
+            self._log_writer.flush()
+        self._log = False
+
+    @staticmethod
+    def get_log_directory():
+        """Returns the log directory at the root of the repository,
+        creating it if needed.
+        """
+        log_path = realpath(__file__)
+        log_path = sep.join(log_path.split(sep)[:-2])
+        log_path += f"{sep}logs"
+
+        Path(log_path).mkdir(parents=True, exist_ok=True)
+        return log_path
+
+    def _span(self, name, **args):
+        """Returns a context manager that records a span in the trace, if
+        the game is traced.
+        """
+        if self._tracer is None:
+            return nullcontext()
+        return self._tracer.span(name, **args)
+
+    def get_result(self):
+        """Returns the result of a finished match as a dictionary with the
+        end state, the winner's name (None if the match ended abnormally),
+        whether the colours were swapped, the number of turns and the total
+        time. The two agents are under the keys Colour.RED and Colour.BLUE
+        for the colour they started as, each with their name, run string,
+        whether they won, their turns, their time, how long the engine
+        waited for them to start under "startup", which is not part of
+        their time, and the distribution of their move times under
+        "latency". "engine overhead" is the
+        distribution of the time the engine spent on each move outside the
+        agents. Distributions are described in get_distribution.
+        """
+        return self._result
 
     def get_board(self):
         return self._board
@@ -459,6 +685,27 @@ class Game:
     def get_turn(self):
         return self._turn
 
+    @staticmethod
+    def get_distribution(times):
+        """Returns the count, total, mean, 50th, 90th and 99th percentiles
+        and maximum of a list of times in nanoseconds, as a dictionary.
+        Percentiles are nearest-rank; all values are 0 for an empty list.
+        """
+
+        d = {"count": len(times), "total": sum(times)}
+        if len(times) == 0:
+            d.update({"mean": 0, "p50": 0, "p90": 0, "p99": 0, "max": 0})
+            return d
+
+        times = sorted(times)
+        d["mean"] = d["total"] // len(times)
+        for p in [50, 90, 99]:
+            # nearest rank: the smallest value with p% of values at or below it
+            rank = max(-(-p * len(times) // 100), 1)
+            d[f"p{p}"] = times[rank - 1]
+        d["max"] = times[-1]
+        return d
+
     @staticmethod
     def ns_to_s(t):
         """Method for standardised nanosecond to second conversion."""
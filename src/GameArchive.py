@@ -0,0 +1,431 @@
+"""This script converts CSV match logs into a GameArchive, a binary file
+that holds many games in a columnar form that NumPy can read without
+parsing.
+
+Possible arguments:
+* "output=path" or "o=path" writes the archive to path. Defaults to
+games.hexa.
+* Any other argument is a log file or a directory. Directories are
+searched recursively for logs, which are the .csv files written by Game
+and the .csv and .csv.gz shards written by Tournament.
+"""
+import gzip
+import json
+from datetime import datetime
+from os import walk
+from os.path import exists, getmtime, getsize, isdir, join
+from sys import argv
+from time import time_ns as time
+
+import numpy as np
+
+from EndState import EndState
+
+
+class GameArchive:
+    """Reads an archive of games. The file is memory-mapped, so opening
+    it is immediate and only the parts that are used are read.
+
+    An archive is made of:
+    * a header: the 8 bytes MAGIC, the length of the metadata as an
+    unsigned little-endian 64-bit integer, and the metadata, as JSON
+    padded to a multiple of ALIGNMENT bytes. The metadata holds the
+    version, the number of games and moves, where the tables start, the
+    names of the agents and the paths of the logs the games came from.
+    * the games table, an array of GAME_DTYPE records. It is the index of
+    the archive: the moves of game i are moves[first_move:first_move +
+    moves] of its record.
+    * the moves table, an array of fixed-width MOVE_DTYPE records for the
+    moves of all games, in order.
+
+    In the games table, red and blue are the indices in get_names() of
+    the agents that started as red and blue, red_time and blue_time
+    their total move times, and winner 0 if the agent that started as
+    red won, 1 if the other did, and -1 if no one did. end_state is the
+    index of the end state in END_STATES, 0 being a game that ended
+    abnormally or whose log is incomplete. start is the time the game
+    started, as a POSIX timestamp, and source the index of its log in
+    get_sources().
+
+    Moves are stored as in the logs: x is -1 for a swap and -2 for a
+    message that is not a move, y is then the same, and time is -1 when
+    the agent timed out. The agent that started as red plays the odd
+    moves, counting from 1, and the other one the even moves; after a
+    swap, they play the opposite colours.
+    """
+
+    MAGIC = b"HEXGAMES"
+    VERSION = 1
+    ALIGNMENT = 64
+
+    END_STATES = [None, EndState.WIN, EndState.TIMEOUT, EndState.BAD_MOVE]
+
+    GAME_DTYPE = np.dtype(
+        [
+            ("first_move", "<i8"),
+            ("moves", "<i4"),
+            ("board_size", "<i2"),
+            ("end_state", "i1"),
+            ("winner", "i1"),
+            ("swapped", "?"),
+            ("turns", "<i4"),
+            ("time", "<i8"),
+            ("red", "<i4"),
+            ("blue", "<i4"),
+            ("red_time", "<i8"),
+            ("blue_time", "<i8"),
+            ("start", "<f8"),
+            ("source", "<i4"),
+        ]
+    )
+    MOVE_DTYPE = np.dtype([("x", "<i2"), ("y", "<i2"), ("time", "<i8")])
+
+    def __init__(self, path):
+        self._path = path
+        with open(path, "rb") as f:
+            if f.read(len(GameArchive.MAGIC)) != GameArchive.MAGIC:
+                raise ValueError(f"{path} is not a game archive")
+            length = int.from_bytes(f.read(8), "little")
+            self._metadata = json.loads(f.read(length))
+
+        if self._metadata["version"] != GameArchive.VERSION:
+            raise ValueError(
+                f"{path} has version {self._metadata['version']}, "
+                + f"expected {GameArchive.VERSION}"
+            )
+
+        self._games = self._map(
+            GameArchive.GAME_DTYPE,
+            self._metadata["games offset"],
+            self._metadata["games"],
+        )
+        self._moves = self._map(
+            GameArchive.MOVE_DTYPE,
+            self._metadata["moves offset"],
+            self._metadata["moves"],
+        )
+
+    def _map(self, dtype, offset, count):
+        # an empty memmap cannot be created
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(
+            self._path, dtype=dtype, mode="r", offset=offset, shape=(count,)
+        )
+
+    def __len__(self):
+        return len(self._games)
+
+    def get_games(self):
+        """Returns the games table, as a read-only array of GAME_DTYPE
+        records.
+        """
+
+        return self._games
+
+    def get_moves(self):
+        """Returns the moves of all games, as a read-only array of
+        MOVE_DTYPE records.
+        """
+
+        return self._moves
+
+    def get_game_moves(self, game):
+        """Returns the moves of the game at the given index."""
+
+        first = self._games["first_move"][game]
+        return self._moves[first : first + self._games["moves"][game]]
+
+    def get_move_games(self):
+        """Returns the index of the game of every move."""
+
+        return np.repeat(np.arange(len(self._games)), self._games["moves"])
+
+    def get_plies(self):
+        """Returns the number of every move in its game, counting from 1."""
+
+        starts = np.repeat(self._games["first_move"], self._games["moves"])
+        return np.arange(len(self._moves)) - starts + 1
+
+    def get_names(self):
+        return self._metadata["names"]
+
+    def get_sources(self):
+        return self._metadata["sources"]
+
+    def get_path(self):
+        return self._path
+
+    @staticmethod
+    def load(path):
+        """Returns the archive at path, or the archive of the log directory
+        at path. The logs of a directory are converted to an archive,
+        games.hexa, that is kept in it and converted again when a log is
+        newer.
+        """
+
+        if not isdir(path):
+            return GameArchive(path)
+
+        archive_path = join(path, "games.hexa")
+        logs = GameArchive.find_logs([path])
+        if not exists(archive_path) or any(
+            getmtime(log) > getmtime(archive_path) for log in logs
+        ):
+            return GameArchive.convert(logs, archive_path)
+        return GameArchive(archive_path)
+
+    @staticmethod
+    def write(path, games, moves, names, sources):
+        """Writes an archive from a games and a moves table, and the lists
+        of names and sources their indices refer to.
+        """
+
+        games = np.ascontiguousarray(games, dtype=GameArchive.GAME_DTYPE)
+        moves = np.ascontiguousarray(moves, dtype=GameArchive.MOVE_DTYPE)
+
+        # the offsets depend on the length of the header, which depends
+        # on the offsets, so it is built until their sizes settle
+        metadata = {
+            "version": GameArchive.VERSION,
+            "games": len(games),
+            "moves": len(moves),
+            "games offset": 0,
+            "moves offset": 0,
+            "names": names,
+            "sources": sources,
+        }
+        while True:
+            header = json.dumps(metadata).encode()
+            header_size = GameArchive._align(len(GameArchive.MAGIC) + 8 + len(header))
+            games_offset = header_size
+            moves_offset = GameArchive._align(games_offset + games.nbytes)
+            if (games_offset, moves_offset) == (
+                metadata["games offset"],
+                metadata["moves offset"],
+            ):
+                break
+            metadata["games offset"] = games_offset
+            metadata["moves offset"] = moves_offset
+
+        header = header.ljust(header_size - len(GameArchive.MAGIC) - 8)
+        with open(path, "wb") as f:
+            f.write(GameArchive.MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            f.write(games.tobytes())
+            f.write(b"\0" * (moves_offset - games_offset - games.nbytes))
+            f.write(moves.tobytes())
+
+    @staticmethod
+    def _align(offset):
+        return -(-offset // GameArchive.ALIGNMENT) * GameArchive.ALIGNMENT
+
+    @staticmethod
+    def find_logs(paths):
+        """Returns the logs among paths and in the directories of paths,
+        sorted by path within each directory.
+        """
+
+        logs = []
+        for path in paths:
+            if not isdir(path):
+                logs.append(path)
+                continue
+            for directory, directories, files in walk(path):
+                directories.sort()
+                for name in sorted(files):
+                    if name.endswith(".csv") or name.endswith(".csv.gz"):
+                        logs.append(join(directory, name))
+        return logs
+
+    @staticmethod
+    def convert(paths, output):
+        """Writes the games of the logs in paths, and in the directories of
+        paths, to an archive at output. Returns the archive.
+        """
+
+        converter = _Converter()
+        for source, path in enumerate(GameArchive.find_logs(paths)):
+            converter.sources.append(path)
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(path, "rt") as f:
+                converter.read(f, source)
+
+        GameArchive.write(
+            output,
+            np.array(converter.games, dtype=GameArchive.GAME_DTYPE),
+            np.array(converter.moves, dtype=GameArchive.MOVE_DTYPE),
+            converter.names,
+            converter.sources,
+        )
+        return GameArchive(output)
+
+
+class _Converter:
+    """Parses CSV logs into the rows of the games and moves tables. A log
+    holds one game, or several in a row for the shards of Tournament.
+    """
+
+    END_STATES = {
+        EndState.get_text(state): code
+        for code, state in enumerate(GameArchive.END_STATES)
+        if state is not None
+    }
+
+    def __init__(self):
+        self.games = []
+        self.moves = []
+        self.names = []
+        self.sources = []
+        self._name_indices = {}
+        self._game = None
+
+    def read(self, lines, source):
+        for line in lines:
+            line = line.rstrip("\n")
+            if line.startswith("Start log at "):
+                self._finish_game()
+                self._start_game(line[len("Start log at ") :], source)
+            elif self._game is None or line in ["", "No,Player,X,Y,Time"]:
+                continue
+            elif line.startswith("Board is "):
+                self._game["board_size"] = int(line[len("Board is ") : line.index("x")])
+            else:
+                self._read_row(line.split(","))
+        self._finish_game()
+
+    def _start_game(self, start, source):
+        self._game = {
+            "first_move": len(self.moves),
+            "board_size": 0,
+            "end_state": 0,
+            "winner": None,
+            "turns": 0,
+            "time": 0,
+            "start": datetime.fromisoformat(start).timestamp(),
+            "source": source,
+            "movers": [],
+            "players": [],
+            "swapped": None,
+        }
+
+    def _read_row(self, row):
+        game = self._game
+        if row[0] != "0":
+            # move: turn, name, x, y, time, where y is SWAP for a swap and
+            # the message for a bad message
+            x = int(row[2])
+            y = x if x < 0 else int(row[3])
+            self.moves.append((x, y, int(row[-1])))
+            game["movers"].append(row[1])
+        elif row[2] == "End":
+            game["end_state"] = _Converter.END_STATES.get(row[3], 0)
+            if game["end_state"] != 0:
+                game["winner"] = row[1]
+            if len(row) > 4:
+                game["swapped"] = row[4] == "True"
+        elif row[1] == "Total":
+            game["turns"], game["time"] = int(row[2]), int(row[3])
+        elif len(row) == 5:
+            # name, turns, time and mean of the red, then the blue agent
+            game["players"].append((row[1], int(row[3])))
+        # latency rows are not archived
+
+    def _finish_game(self):
+        game = self._game
+        if game is None:
+            return
+        self._game = None
+
+        moves = len(self.moves) - game["first_move"]
+        swapped = game["swapped"]
+        if swapped is None:
+            # logs without the End row: only a swap on the second move is
+            # legal, so a swap anywhere else did not swap the agents
+            swapped = moves > 1 and self.moves[game["first_move"] + 1][0] == -1
+        players = game["players"]
+        if len(players) == 2:
+            if swapped:
+                players = players[::-1]
+            (red, red_time), (blue, blue_time) = players
+        else:
+            # incomplete log: the agents are only known from their moves
+            movers = game["movers"] + [None, None]
+            red, blue = movers[0], movers[1]
+            red_time, blue_time = 0, 0
+
+        winner = -1
+        if game["winner"] is not None:
+            if red != blue:
+                winner = 0 if game["winner"] == red else 1
+            else:
+                # same names: the winner made the last move only if it won
+                last_mover = (moves - 1) % 2
+                if game["end_state"] == 1:
+                    winner = last_mover
+                else:
+                    winner = 1 - last_mover
+
+        self.games.append(
+            (
+                game["first_move"],
+                moves,
+                game["board_size"],
+                game["end_state"],
+                winner,
+                swapped,
+                game["turns"],
+                game["time"],
+                self._get_name_index(red),
+                self._get_name_index(blue),
+                red_time,
+                blue_time,
+                game["start"],
+                game["source"],
+            )
+        )
+
+    def _get_name_index(self, name):
+        if name is None:
+            return -1
+        if name not in self._name_indices:
+            self._name_indices[name] = len(self.names)
+            self.names.append(name)
+        return self._name_indices[name]
+
+
+def main():
+    output = "games.hexa"
+    paths = []
+
+    for argument in argv[1:]:
+        if "output=" in argument or "o=" in argument:
+            output = argument.split("=", 1)[1]
+        else:
+            paths.append(argument)
+
+    if len(paths) == 0:
+        print("ERROR: No logs given. Aborted.")
+        return
+
+    start = time()
+    archive = GameArchive.convert(paths, output)
+    games = archive.get_games()
+    print(
+        f"Converted {len(archive.get_sources())} logs in "
+        + f"{(time() - start) / 10 ** 9:.2f}s: {len(archive)} games and "
+        + f"{len(archive.get_moves())} moves in {getsize(output)} bytes."
+    )
+
+    if len(archive) > 0:
+        ended = games[games["end_state"] > 0]
+        print(
+            f"Mean length {games['moves'].mean():.1f} moves, "
+            + f"red won {np.mean(ended['winner'] == 0):.1%} "
+            + f"of {len(ended)} finished games."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import importlib.util
+import sys
+from os.path import abspath, dirname
+from time import time_ns
+
+from Colour import Colour
+
+
+class LocalProtocol:
+    """Class that replaces Protocol for games between Python agents that run
+    inside the engine process. There are no sockets or subprocesses: the
+    engine calls the agents directly, with the same messages, so Game
+    keeps its move validation, swap rule and time accounting.
+
+    An in-process agent is an object with a receive(message) method. It
+    is given each protocol message (e.g. "START;11;R\\n" or
+    "CHANGE;5,5;<board>;B\\n") and returns its move ("x,y\\n" or "SWAP\\n")
+    when the message makes it its turn, None otherwise. The time spent in
+    that call is the agent's move time. An agent cannot be interrupted, so
+    one that runs out of time loses on timeout once it returns.
+
+    The run string of an in-process agent is "path/to/file.py:ClassName".
+    The class is instantiated without arguments, once per protocol, and
+    is reused for further games, so it must reset itself on START.
+    Agent objects can also be given instead of run strings.
+
+    In-process agents are trusted code running in the engine; submissions
+    that are not trusted should play through Protocol.
+    """
+
+    # loaded agent classes by run string
+    _classes = {}
+
+    def __init__(self):
+        self.sockets = {Colour.RED: {}, Colour.BLUE: {}}
+
+    def start(self):
+        pass
+
+    def accept_connection(
+        self,
+        run_s,
+        name,
+        timeout_ns=30 * 10 ** 9,
+        silent=True,
+        verbose=False,
+        transport=None,
+    ):
+        """Creates the agent described by run_s. Returns True if it could
+        be created, False otherwise. Local agents need no transport, so
+        transport is ignored.
+        """
+
+        start = time_ns()
+
+        # determine the colour of the new agent
+        if len(self.sockets[Colour.RED].keys()) == 0:
+            colour = Colour.RED
+        elif len(self.sockets[Colour.BLUE].keys()) == 0:
+            colour = Colour.BLUE
+        else:
+            raise ValueError("Too many agents specified.")
+
+        try:
+            if isinstance(run_s, str):
+                agent = LocalProtocol.load_class(run_s)()
+            else:
+                agent = run_s
+            if verbose:
+                print(f"Created {name} in process")
+        except Exception as e:
+            agent = None
+            if verbose:
+                print(f"{name} could not be created. Exception raised: {e}")
+
+        self.sockets[colour]["name"] = name
+        self.sockets[colour]["agent"] = agent
+        self.sockets[colour]["reply"] = None
+        self.sockets[colour]["startup"] = time_ns() - start
+
+        return agent is not None
+
+    @staticmethod
+    def load_class(run_s):
+        """Returns the class named by a "path/to/file.py:ClassName" run
+        string. The directory of the file is added to the import path, so
+        the agent can import the modules next to it.
+        """
+
+        if run_s not in LocalProtocol._classes:
+            path, class_name = run_s.rsplit(":", 1)
+            path = abspath(path)
+            if dirname(path) not in sys.path:
+                sys.path.insert(0, dirname(path))
+
+            module_name = f"local_agent_{len(LocalProtocol._classes)}"
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+
+            LocalProtocol._classes[run_s] = getattr(module, class_name)
+
+        return LocalProtocol._classes[run_s]
+
+    def get_message(self, colour, timeout_ns=30 * 10 ** 9, verbose=False):
+        """Returns the move the given colour agent made in response to the
+        last message, and the time it took. A missing move, or one that
+        took longer than timeout_ns, counts as a timeout.
+        """
+
+        reply = self.sockets[colour]["reply"]
+        self.sockets[colour]["reply"] = None
+
+        if reply is None or reply[1] > timeout_ns:
+            if verbose:
+                print(f"{self.sockets[colour]['name']} timed out. Nothing received.")
+            return ("NO MESSAGE", -1)
+
+        message, move_time = reply
+        if verbose:
+            print(
+                f"Received {message.strip()} from "
+                + f"{self.sockets[colour]['name']} in "
+                + f"~{int(move_time/10**4)/10**5}s."
+            )
+
+        return reply
+
+    def get_startup(self, colour):
+        """Returns how long, in ns, creating the given colour agent took."""
+
+        return self.sockets[colour].get("startup", 0)
+
+    def get_failed(self):
+        """Returns None: local agents run in the engine's process, so they
+        cannot exit or disconnect.
+        """
+
+        return None
+
+    def send_message(self, colour, message, verbose=False):
+        """Hands the specified message to the specified colour agent and
+        keeps its reply, if any, for get_message.
+        """
+
+        x = self.sockets[colour]
+        if x.get("agent") is None:
+            return
+
+        try:
+            move_time = time_ns()
+            reply = x["agent"].receive(message)
+            move_time = time_ns() - move_time
+            if verbose:
+                print("Sent", message, end="")
+        except Exception as e:
+            # a crashed agent is treated like one that disconnected
+            x["agent"] = None
+            if verbose:
+                print(f"{x['name']} failed on {message.strip()}: {e}")
+            return
+
+        if reply is not None:
+            x["reply"] = (reply, move_time)
+
+    def get_shared_board(self, board_size):
+        """Returns None: the board is not shared."""
+
+        return None
+
+    def wants_board(self):
+        """Returns True: agents always get the board with every move."""
+
+        return True
+
+    def is_connected(self):
+        """Returns True if both agents exist and can play another game."""
+
+        for colour in Colour:
+            if self.sockets[colour].get("agent") is None:
+                return False
+        return True
+
+    def assign(self, red_name):
+        """Makes the agent with the given name play Red in the next game,
+        swapping the agents if needed.
+        """
+
+        if self.sockets[Colour.RED]["name"] != red_name:
+            self.swap()
+
+    def swap(self):
+        """Switches the colours of the two agents."""
+
+        self.sockets[Colour.RED], self.sockets[Colour.BLUE] = (
+            self.sockets[Colour.BLUE],
+            self.sockets[Colour.RED],
+        )
+
+    def close(self, kill_children=True, verbose=False):
+        """Drops the agents."""
+
+        for colour in Colour:
+            self.sockets[colour] = {}
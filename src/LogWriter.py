@@ -0,0 +1,52 @@
+from datetime import datetime
+from os import getpid
+from os.path import join
+from uuid import uuid4
+
+
+class LogWriter:
+    """Buffered, append-only writer for the log of one match.
+
+    The file stays open for the whole match and is written in large
+    blocks, so logging a move does not touch the disk. It is flushed
+    when it is closed, which Game does at the end of the match, also
+    when it ends on an exception.
+    """
+
+    BUFFER_SIZE = 64 * 1024
+
+    def __init__(self, path):
+        # exclusive creation: an existing log is never overwritten
+        self._path = path
+        self._file = open(path, "x", buffering=LogWriter.BUFFER_SIZE)
+
+    @staticmethod
+    def create(directory, prefix="log", suffix=".csv"):
+        """Returns a LogWriter for a new file in directory. The name is made
+        of the time, the process id and a random part, e.g.
+        log-20240131-120000-4242-1a2b3c4d.csv, so no directory listing or
+        probing is needed to find a free one.
+        """
+
+        while True:
+            name = (
+                f"{prefix}-{datetime.now():%Y%m%d-%H%M%S}-{getpid()}-"
+                + f"{uuid4().hex[:8]}{suffix}"
+            )
+            try:
+                return LogWriter(join(directory, name))
+            except FileExistsError:
+                pass
+
+    def write(self, message):
+        self._file.write(message)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def get_path(self):
+        return self._path
@@ -0,0 +1,108 @@
+import socket
+from time import time_ns
+
+
+class MessageReader:
+    """Reads newline-framed protocol messages from an agent's socket.
+
+    Data is received in large chunks and kept in a buffer, so a message
+    split across several TCP segments is put back together, and several
+    messages received at once are returned one at a time. A message is
+    normally read with a single recv call.
+
+    A message longer than max_size bytes is cut off: its first max_size
+    bytes are returned as one message. max_size=None means no limit.
+
+    Reads can be given a deadline, a time_ns value. The socket timeout is
+    then set to what is left of it before every recv, so a message that
+    arrives in many pieces cannot take longer than the deadline allows.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, sock, max_size=None):
+        self._sock = sock
+        self._max_size = max_size
+        self._buffer = bytearray()
+        self._closed = False
+
+    def read_message(self, deadline=None):
+        """Returns the next message, without its newline, as bytes. Returns
+        b"" if the connection was closed before a full message arrived.
+        Socket errors, including timeouts, are raised to the caller; no
+        data is lost when they happen. If deadline is given, socket.timeout
+        is raised once it has passed, and the socket is left with its
+        timeout set.
+        """
+
+        start = 0
+        while True:
+            idx = self._buffer.find(b"\n", start)
+            if idx != -1 and (self._max_size is None or idx <= self._max_size):
+                message = bytes(self._buffer[:idx])
+                del self._buffer[: idx + 1]
+                return message
+
+            if self._max_size is not None and len(self._buffer) > self._max_size:
+                message = bytes(self._buffer[: self._max_size])
+                del self._buffer[: self._max_size]
+                return message
+
+            start = len(self._buffer)
+            data = self._recv(deadline)
+            if not data:
+                self._closed = True
+                return b""
+            self._buffer += data
+
+    def read_record(self, size, deadline=None):
+        """Returns the next size bytes, for fixed-size binary messages.
+        Returns b"" if the connection was closed before all of them
+        arrived. Errors and deadline are handled as in read_message.
+        """
+
+        while len(self._buffer) < size:
+            data = self._recv(deadline)
+            if not data:
+                self._closed = True
+                return b""
+            self._buffer += data
+
+        record = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return record
+
+    def _recv(self, deadline):
+        """Receives the next chunk of data, waiting no later than deadline
+        if it is given.
+        """
+
+        if deadline is not None:
+            timeout = deadline - time_ns()
+            if timeout <= 0:
+                raise socket.timeout("timed out")
+            self._sock.settimeout(timeout / 10 ** 9)
+        return self._sock.recv(MessageReader.CHUNK_SIZE)
+
+    def has_message(self):
+        """Returns True if a message can be returned without receiving more
+        data.
+        """
+
+        if self._max_size is not None and len(self._buffer) > self._max_size:
+            return True
+        return b"\n" in self._buffer
+
+    def has_record(self, size):
+        """Returns True if a record of size bytes can be returned without
+        receiving more data.
+        """
+
+        return len(self._buffer) >= size
+
+    def is_closed(self):
+        """Returns True if the connection was found closed by a read, which
+        tells it apart from an empty message.
+        """
+
+        return self._closed
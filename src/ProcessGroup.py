@@ -0,0 +1,189 @@
+import os
+import signal
+
+
+class ProcessGroup:
+    """Class that keeps track of the processes of an agent that leads its
+    own process group: the members of the group, and the processes they
+    started that left it, e.g. by starting a session of their own.
+
+    Processes are listed through /proc when they are signalled and when
+    they are looked for, so processes that leave the group are only found
+    on Linux. They are remembered by pid and start time, so a pid given to
+    another process after they exit is not taken for theirs, and they are
+    forgotten once they have exited. is_running needs no listing in the
+    usual case: the remembered processes are checked one by one and the
+    group with a null signal.
+
+    AgentProcess and AsyncProtocol stop their agents through it.
+    """
+
+    def __init__(self, leader):
+        self.pgid = leader
+        # the start time of each process of the agent found so far, by pid
+        self._processes = {}
+        stat = ProcessGroup._read_stat(leader)
+        if stat is not None:
+            self._processes[leader] = stat[3]
+
+    def signal(self, sig):
+        """Sends sig to the group and to the processes its members started
+        that left it.
+        """
+
+        # the processes are listed before they are signalled, as the
+        # children of a process are no longer its children once it exits
+        processes = ProcessGroup._list_processes()
+        if processes is not None:
+            self._remember(processes)
+        try:
+            os.killpg(self.pgid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+        for pid, start_time in list(self._processes.items()):
+            self._signal_process(pid, start_time, sig)
+
+    def _signal_process(self, pid, start_time, sig):
+        """Sends sig to the process pid if it started at start_time, i.e.
+        if it is not another process that was given the pid after it
+        exited, and if it left the group, which killpg signals already.
+        Where pidfds exist, the process checked is the one signalled.
+        """
+
+        fd = None
+        if hasattr(os, "pidfd_open"):
+            try:
+                fd = os.pidfd_open(pid)
+            except ProcessLookupError:
+                return
+            except OSError:
+                pass
+        try:
+            stat = ProcessGroup._read_stat(pid)
+            if stat is None or stat[3] != start_time or stat[1] == self.pgid:
+                return
+            if fd is not None:
+                signal.pidfd_send_signal(fd, sig)
+            else:
+                os.kill(pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def is_running(self):
+        """Returns True if a process of the agent is still running. The
+        processes found when it was signalled are checked one by one,
+        forgetting those that have exited, and the rest of the group with a
+        null signal. Only if the group answers with none of them running,
+        e.g. as it only has zombies left, are all processes listed again.
+        """
+
+        running = False
+        for pid, start_time in list(self._processes.items()):
+            stat = ProcessGroup._read_stat(pid)
+            if stat is None or stat[3] != start_time:
+                del self._processes[pid]
+            elif stat[2] != "Z":
+                running = True
+        if running:
+            return True
+
+        try:
+            os.killpg(self.pgid, 0)
+        except (ProcessLookupError, PermissionError):
+            return False
+        processes = ProcessGroup._list_processes()
+        if processes is None:
+            return True
+        return len(self._remember(processes)) > 0
+
+    def get_processes(self):
+        """Returns the pids of the processes of the agent that are alive.
+        Zombies are left out: they are not running.
+        """
+
+        processes = ProcessGroup._list_processes()
+        if processes is None:
+            # without /proc, only the group can be checked
+            try:
+                os.killpg(self.pgid, 0)
+                return [self.pgid]
+            except (ProcessLookupError, PermissionError):
+                return []
+
+        return sorted(self._remember(processes))
+
+    def _remember(self, processes):
+        """Adds the processes of the agent in processes, as listed by
+        _list_processes, to those it knows. Returns the pids of those that
+        are running, i.e. not zombies.
+        """
+
+        running = []
+        for pid in self._find(processes):
+            if processes[pid][2] != "Z":
+                self._processes[pid] = processes[pid][3]
+                running.append(pid)
+        return running
+
+    def _find(self, processes):
+        """Returns the pids of the processes of the agent in processes,
+        zombies included. Known processes that have exited are forgotten.
+        """
+
+        # the known processes that are still the same processes
+        self._processes = {
+            pid: start_time
+            for pid, start_time in self._processes.items()
+            if pid in processes and processes[pid][3] == start_time
+        }
+
+        # the group, the known processes, and the processes started by any
+        # of them
+        found = {pid for pid, (_, pgid, _, _) in processes.items() if pgid == self.pgid}
+        found |= self._processes.keys()
+        stack = list(found)
+        while len(stack) > 0:
+            parent = stack.pop()
+            for pid, (ppid, _, _, _) in processes.items():
+                if ppid == parent and pid not in found:
+                    found.add(pid)
+                    stack.append(pid)
+        return found
+
+    @staticmethod
+    def _list_processes():
+        """Returns the parent pid, group id, state and start time of every
+        process by pid, from /proc, or None where /proc is not available.
+        """
+
+        try:
+            pids = [int(p) for p in os.listdir("/proc") if p.isdigit()]
+        except OSError:
+            return None
+
+        processes = {}
+        for pid in pids:
+            stat = ProcessGroup._read_stat(pid)
+            if stat is not None:
+                processes[pid] = stat
+        return processes
+
+    @staticmethod
+    def _read_stat(pid):
+        """Returns the parent pid, group id, state and start time of the
+        process pid, from /proc, or None if it has exited or there is no
+        /proc.
+        """
+
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                stat = f.read()
+        except OSError:
+            return None
+        # the name is in parentheses and can contain spaces; the start time
+        # is the 22nd field
+        fields = stat[stat.rfind(")") + 2 :].split()
+        return (int(fields[1]), int(fields[2]), fields[0], int(fields[19]))
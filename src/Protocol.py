@@ -1,131 +1,554 @@
+import os
+import secrets
+import select
 import socket
 import subprocess
-from sys import platform, stdout
+import tempfile
+from os.path import dirname, join
+from sys import platform, stderr, stdout
 from time import time_ns
+from AgentProcess import AgentProcess
+from BinaryMessage import BinaryMessage
 from Colour import Colour
+from MessageReader import MessageReader
+from SharedBoard import SharedBoard
 import shlex
 
 
 class Protocol:
-    """Static class that handles protocol communication between engine and
-    agents. Uses a TCP socket.
+    """Class that handles protocol communication between the engine and
+    the agents of one game. Uses a TCP socket by default.
+
+    Each instance listens on its own port, chosen by the OS unless one is
+    given, so several games can run on one host at once. The port is
+    passed to the agents in the HEX_PORT environment variable. Agents
+    that do not read it connect to LEGACY_PORT, so they can only play if
+    the engine is given that port.
+
+    Messages are newline-framed. A message from an agent longer than
+    max_message_size bytes is cut off at that size, which makes it an
+    illegal move.
+
+    If persistent=True, agents are started with HEX_PERSISTENT=1. Agents
+    that support it keep their connection open after END, answer it with
+    READY and reset themselves when the next START arrives, so one agent
+    process can play many games in a row. Agents are only reused once
+    they have sent READY, so an agent that exits after END is restarted
+    even if it has not exited yet when the next game starts.
+
+    If binary=True, agents are started with HEX_BINARY=1. An agent that
+    supports it sends "BINARY\\n" right after connecting; the engine
+    answers "BINARY\\n" and from then on both sides exchange fixed-size
+    records without board snapshots (see BinaryMessage). Other agents
+    keep the text protocol, at the cost of waiting HANDSHAKE_TIMEOUT for
+    their request when they connect.
+
+    If shared_board=True, the engine mirrors the board of each game in a
+    shared-memory segment (see SharedBoard), whose name is passed to the
+    agents in HEX_SHARED_BOARD, and CHANGE messages no longer carry the
+    board. Agents then read the board from the segment or keep their own.
+
+    While it waits for an agent, the engine also watches the processes of
+    both agents and the connection of the other one, so an agent that
+    exits, never connects or closes its connection is noticed at once
+    instead of after its time runs out. On Linux, a process is watched
+    through a pidfd in the same select call as the sockets. Elsewhere,
+    processes are polled every POLL_INTERVAL.
+
+    Each agent can be connected over its own transport, given to
+    accept_connection and passed to the agent in HEX_TRANSPORT:
+    * TCP connects over loopback TCP, with Nagle's algorithm disabled.
+    * UNIX connects over a Unix domain socket, whose path is passed in
+    HEX_SOCKET.
+    * STDIO gives the agent one end of a socket pair as its stdin and
+    stdout, so it reads messages from stdin and writes its moves to
+    stdout, and needs no socket or port of its own. Its other output
+    has to go to stderr. As it is connected before it has even started,
+    the agent sends READY once it is ready to play, and the engine waits
+    for it as it waits for the other transports to connect.
+    UNIX and STDIO are not available on Windows. agents/connector.py
+    connects an agent over the transport it was given.
+
+    Agents are started as AgentProcess, each in its own process group, so
+    close stops the processes an agent started along with it and reaps
+    the agent. If an AgentPool is given, agents are taken from it,
+    already started and usually connected, instead of being started when
+    the game needs them.
     """
 
     HOST = "127.0.0.1"
-    PORT = 1234
-    s = None
-    sockets = {Colour.RED: {}, Colour.BLUE: {}}
-
-    @staticmethod
-    def start():
+    LEGACY_PORT = 1234
+    PORT_VARIABLE = "HEX_PORT"
+    PERSISTENT_VARIABLE = "HEX_PERSISTENT"
+    BINARY_VARIABLE = "HEX_BINARY"
+    TRANSPORT_VARIABLE = "HEX_TRANSPORT"
+    SOCKET_VARIABLE = "HEX_SOCKET"
+    SHARED_BOARD_VARIABLE = "HEX_SHARED_BOARD"
+
+    TCP = "tcp"
+    UNIX = "unix"
+    STDIO = "stdio"
+    TRANSPORTS = [TCP, UNIX, STDIO]
+    # what a STDIO agent sends once it has started, and a persistent agent
+    # once a game has ended
+    READY = b"READY\n"
+
+    MAX_MESSAGE_SIZE = 1024
+    # how long a new agent has to ask for the binary encoding
+    HANDSHAKE_TIMEOUT = 10 ** 9
+    # how long a persistent agent has to answer END with READY
+    READY_TIMEOUT = 10 ** 9
+    # how often agent processes are polled where their exit cannot be
+    # waited on with select
+    POLL_INTERVAL = 10 ** 7
+
+    def __init__(
+        self,
+        port=0,
+        persistent=False,
+        max_message_size=MAX_MESSAGE_SIZE,
+        binary=False,
+        pool=None,
+        shared_board=False,
+    ):
+        self.port = port
+        self.persistent = persistent
+        self.binary = binary
+        # the name of the shared board is fixed, as agents are told it when
+        # they start, but the segment is made for each board size
+        self.shared_board_name = None
+        if shared_board:
+            self.shared_board_name = f"hex_{os.getpid()}_{secrets.token_hex(4)}"
+        self._shared_board = None
+        self.pool = pool
+        self.max_message_size = max_message_size
+        self.s = None
+        self.sockets = {Colour.RED: {}, Colour.BLUE: {}}
+        # the listening socket of each transport used so far, and the
+        # environment variables that tell agents where it is
+        self._listeners = {}
+        # the colour of the agent found dead by the last get_message
+        self._failed = None
+
+    def start(self):
         """Sets up a TCP server. The socket reuse address option is
         enabled because Linux does not close sockets immediately on
         application exit. This would cause issues with successive
         matches.
         """
 
-        Protocol.s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        Protocol.s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        Protocol.s.bind((Protocol.HOST, Protocol.PORT))
-        Protocol.s.listen()
+        self._listeners[Protocol.TCP] = Protocol.listen(Protocol.TCP, self.port)
+        self.s = self._listeners[Protocol.TCP][0]
+
+        # the port actually bound if the OS was left to choose
+        self.port = self.s.getsockname()[1]
 
     @staticmethod
-    def accept_connection(
-        run_s, name, timeout_ns=30 * 10 ** 9, silent=True, verbose=False
-    ):
-        """Starts a subprocess with the specified string then waits for the
-        new process to connect to the socket. Returns True if the connection
-        was made, False otherwise.
+    def listen(transport, port=0):
+        """Returns a new listening socket for agents of the given
+        transport, TCP or UNIX, and the environment variables that tell an
+        agent where to connect. A Unix domain socket is created in a new
+        temporary directory, which close_listener removes.
         """
 
+        if transport == Protocol.UNIX:
+            path = join(tempfile.mkdtemp(prefix="hex-"), "engine.sock")
+            s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            s.bind(path)
+            s.listen()
+            variables = {
+                Protocol.TRANSPORT_VARIABLE: transport,
+                Protocol.SOCKET_VARIABLE: path,
+            }
+            return (s, variables)
+        elif transport != Protocol.TCP:
+            raise ValueError(f"Unknown transport {transport}.")
+
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind((Protocol.HOST, port))
+        s.listen()
+        return (s, {Protocol.PORT_VARIABLE: str(s.getsockname()[1])})
+
+    @staticmethod
+    def close_listener(s):
+        """Closes a listening socket made by listen, removing the file and
+        directory of a Unix domain socket.
+        """
+
+        path = s.getsockname() if s.family != socket.AF_INET else None
+        s.close()
+        if path:
+            os.remove(path)
+            os.rmdir(dirname(path))
+
+    @staticmethod
+    def spawn(run_s, variables, silent, transport):
+        """Starts an agent with the given environment variables added.
+        Returns the process and, for STDIO, the engine's end of its
+        connection, or None for the transports the agent connects over.
+        """
+
+        if platform == "win32" and transport != Protocol.TCP:
+            raise ValueError(f"The {transport} transport needs a Unix system.")
+
         # separate run_s into a list of arguments to be used in a linux shell
         if platform != "win32":
             run_s = shlex.split(run_s)
 
-        # determine the colour of the new agent
-        if len(Protocol.sockets[Colour.RED].keys()) == 0:
-            colour = Colour.RED
-        elif len(Protocol.sockets[Colour.BLUE].keys()) == 0:
-            colour = Colour.BLUE
-        else:
-            raise ValueError("Too many agents specified.")
-
         # whether to throw out all output of the agent
         # used to ease the screen clutter during the tournament
         output = stdout
         if silent:
             output = subprocess.DEVNULL
 
-        # start the agent
-        t = subprocess.Popen(run_s, stdout=output, stderr=output, shell=False)
+        env = dict(os.environ)
+        env.update(variables)
+        if transport != Protocol.STDIO:
+            t = AgentProcess(run_s, stdout=output, stderr=output, shell=False, env=env)
+            return (t, None)
 
-        # wait for a connection
+        env[Protocol.TRANSPORT_VARIABLE] = transport
+        conn, agent_end = socket.socketpair()
         try:
-            Protocol.s.settimeout(timeout_ns / 10 ** 9)
-            conn, addr = Protocol.s.accept()
-            Protocol.s.settimeout(socket.getdefaulttimeout())
-            if verbose:
-                print(f"Connected {name} at {addr}")
-        except socket.timeout:
-            conn, addr = None, None
-            if verbose:
+            t = AgentProcess(
+                run_s, stdin=agent_end, stdout=agent_end, stderr=output, env=env
+            )
+        finally:
+            agent_end.close()
+        return (t, conn)
+
+    def accept_connection(
+        self,
+        run_s,
+        name,
+        timeout_ns=30 * 10 ** 9,
+        silent=True,
+        verbose=False,
+        transport=TCP,
+    ):
+        """Starts a subprocess with the specified string then waits for the
+        new process to connect over the given transport. Returns True if
+        the connection was made, False otherwise. With a pool, an agent
+        already started by the pool is taken instead.
+        """
+
+        start = time_ns()
+
+        # determine the colour of the new agent
+        if len(self.sockets[Colour.RED].keys()) == 0:
+            colour = Colour.RED
+        elif len(self.sockets[Colour.BLUE].keys()) == 0:
+            colour = Colour.BLUE
+        else:
+            raise ValueError("Too many agents specified.")
+
+        # the protocol modes the agent is told about
+        variables = {}
+        if self.persistent:
+            variables[Protocol.PERSISTENT_VARIABLE] = "1"
+        if self.binary:
+            variables[Protocol.BINARY_VARIABLE] = "1"
+        if self.shared_board_name is not None:
+            variables[Protocol.SHARED_BOARD_VARIABLE] = self.shared_board_name
+
+        if self.pool is not None:
+            # the agent connects to a socket of its own
+            t, listener, conn = self.pool.take(run_s, variables, silent, transport)
+        else:
+            # start the agent, telling it where to connect
+            listener = None
+            if transport != Protocol.STDIO:
+                if transport not in self._listeners:
+                    self._listeners[transport] = Protocol.listen(transport)
+                listener, where = self._listeners[transport]
+                variables.update(where)
+            t, conn = Protocol.spawn(run_s, variables, silent, transport)
+        self.sockets[colour]["name"] = name
+        self.sockets[colour]["thread"] = t
+        self.sockets[colour]["exit"] = Protocol._open_exit_fd(t)
+
+        # wait for a connection, or for the agent to exit without one
+        addr = transport
+        if conn is None:
+            readable, _ = self._wait([listener], [colour], start + timeout_ns)
+            if len(readable) > 0:
+                conn, addr = listener.accept()
+            if self.pool is not None:
+                Protocol.close_listener(listener)
+        reader = MessageReader(conn, self.max_message_size)
+        if (
+            conn is not None
+            and transport == Protocol.STDIO
+            and not self._wait_ready(colour, conn, reader, start + timeout_ns)
+        ):
+            conn.close()
+            conn = None
+        if conn is not None and transport == Protocol.TCP:
+            # moves are small messages that are answered, so they are sent
+            # at once instead of being held back to be coalesced
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        if verbose:
+            if conn is not None:
+                print(f"Connected {name} at {addr or transport}")
+            else:
                 print(f"{name} never connected.")
 
         # set up associated arguments
-        Protocol.sockets[colour]["name"] = name
-        Protocol.sockets[colour]["thread"] = t
-        Protocol.sockets[colour]["conn"] = conn
-        Protocol.sockets[colour]["addr"] = addr
+        self.sockets[colour]["conn"] = conn
+        self.sockets[colour]["reader"] = reader
+        self.sockets[colour]["addr"] = addr
+        self.sockets[colour]["binary"] = False
+        if self.binary and conn is not None:
+            self._handshake(colour, verbose)
+        self.sockets[colour]["startup"] = time_ns() - start
 
         return conn is not None
 
+    def _wait_ready(self, colour, conn, reader, deadline):
+        """Waits until deadline for the STDIO agent of the given colour to
+        send READY on conn, read with reader. Returns True if it did, False
+        if it sent something else, exited or took too long.
+        """
+
+        readable, _ = self._wait([conn], [colour], deadline)
+        if len(readable) == 0:
+            return False
+        try:
+            ready = reader.read_record(len(Protocol.READY), deadline)
+            conn.settimeout(socket.getdefaulttimeout())
+        except OSError:
+            return False
+        return ready == Protocol.READY
+
+    def _handshake(self, colour, verbose=False):
+        """Switches the connection of the given colour agent to the binary
+        encoding if the agent asks for it as soon as it connects. Agents
+        that send nothing within HANDSHAKE_TIMEOUT keep the text protocol.
+        """
+
+        x = self.sockets[colour]
+        timeout = Protocol.HANDSHAKE_TIMEOUT / 10 ** 9
+        ready, _, _ = select.select([x["conn"]], [], [], timeout)
+        if len(ready) == 0:
+            return
+
+        try:
+            request = x["reader"].read_message(time_ns() + Protocol.HANDSHAKE_TIMEOUT)
+            x["conn"].settimeout(socket.getdefaulttimeout())
+        except Exception:
+            return
+
+        if request + b"\n" == BinaryMessage.HANDSHAKE:
+            x["conn"].sendall(BinaryMessage.HANDSHAKE)
+            x["binary"] = True
+            if verbose:
+                print(f"{x['name']} uses the binary protocol")
+
     @staticmethod
-    def get_message(colour, timeout_ns=30 * 10 ** 9, verbose=False):
+    def _open_exit_fd(process):
+        """Returns a file descriptor that becomes readable when the given
+        process exits, or None where the OS does not provide one.
+        """
+
+        try:
+            return os.pidfd_open(process.pid)
+        except (AttributeError, OSError):
+            return None
+
+    def _wait(self, conns, colours, deadline):
+        """Waits until one of the given sockets is readable or the process
+        of one of the given colour agents has exited, or until deadline, a
+        time_ns. Returns the readable sockets and the colours of the
+        agents that have exited, both empty if the deadline passed.
+        """
+
+        exits = {}
+        polled = []
+        for colour in colours:
+            if self.sockets[colour]["exit"] is None:
+                polled.append(colour)
+            else:
+                exits[self.sockets[colour]["exit"]] = colour
+
+        while True:
+            exited = [c for c in polled if self.sockets[c]["thread"].poll() is not None]
+            timeout = max(deadline - time_ns(), 0)
+            if len(exited) > 0:
+                # still return what the agent sent before it exited
+                timeout = 0
+            elif len(polled) > 0:
+                timeout = min(timeout, Protocol.POLL_INTERVAL)
+
+            ready, _, _ = select.select(
+                conns + list(exits.keys()), [], [], timeout / 10 ** 9
+            )
+            readable = [conn for conn in conns if conn in ready]
+            exited += [colour for fd, colour in exits.items() if fd in ready]
+            if len(readable) > 0 or len(exited) > 0 or time_ns() >= deadline:
+                return (readable, exited)
+
+    @staticmethod
+    def _is_closed(conn):
+        """Returns True if a readable socket was closed by its peer, without
+        taking any data from it.
+        """
+
+        try:
+            return len(conn.recv(1, socket.MSG_PEEK)) == 0
+        except OSError:
+            return True
+
+    def _wait_for_message(self, colour, deadline):
+        """Waits until the given colour agent has sent data, or until
+        deadline. Returns the colour of an agent that exited or closed its
+        connection in the meantime, or None.
+
+        Data the other agent sends early is left for its next turn.
+        """
+
+        x = self.sockets[colour]
+        other = colour.opposite()
+        if x["binary"]:
+            if x["reader"].has_record(BinaryMessage.SIZE):
+                return None
+        elif x["reader"].has_message():
+            return None
+
+        conns = [x["conn"], self.sockets[other]["conn"]]
+        while True:
+            readable, exited = self._wait(conns, [colour, other], deadline)
+            if x["conn"] in readable:
+                return None
+            if len(exited) > 0:
+                return exited[0]
+            if len(readable) == 0:
+                # timed out
+                return None
+
+            if Protocol._is_closed(self.sockets[other]["conn"]):
+                return other
+            conns = [x["conn"]]
+
+    def get_startup(self, colour):
+        """Returns how long, in ns, the engine waited for the given colour
+        agent to start and connect, which is not part of its time.
+        """
+
+        return self.sockets[colour].get("startup", 0)
+
+    def get_failed(self):
+        """Returns the colour of the agent the last get_message found to
+        have exited or closed its connection, or None. This can be the
+        agent that was not asked for a message.
+        """
+
+        return self._failed
+
+    def wants_board(self):
+        """Returns True if an agent uses the text protocol, which sends
+        the board with every move, unless the board is shared.
+        """
+
+        if self.shared_board_name is not None:
+            return False
+        for colour in Colour:
+            if not self.sockets[colour].get("binary", False):
+                return True
+        return False
+
+    def get_shared_board(self, board_size):
+        """Returns the SharedBoard for a game of the given board size,
+        empty, or None if the board is not shared. The segment is made
+        again when the board size changes.
+        """
+
+        if self.shared_board_name is None:
+            return None
+        if self._shared_board is not None:
+            if self._shared_board.board_size == board_size:
+                self._shared_board.reset()
+                return self._shared_board
+            self._shared_board.close()
+        self._shared_board = SharedBoard(self.shared_board_name, board_size)
+        return self._shared_board
+
+    def get_message(self, colour, timeout_ns=30 * 10 ** 9, verbose=False):
         """Waits for a message from the given colour agent for the specified
         length of time. Returns the text and the associated wait time.
+
+        If either agent exits or closes its connection first, it returns
+        ("NO MESSAGE", -1) at once, as for a timeout, and get_failed tells
+        which agent it was.
         """
 
+        move_time = time_ns()
+        self._failed = self._wait_for_message(colour, move_time + timeout_ns)
+        if self._failed is not None:
+            if verbose:
+                print(f"{self.sockets[self._failed]['name']} disconnected early.")
+            return ("NO MESSAGE", -1)
+
         try:
-            Protocol.sockets[colour]["conn"].settimeout(timeout_ns / 10 ** 9)
-            move_time = time_ns()
-            data = Protocol.sockets[colour]["conn"].recv(1024)
+            deadline = move_time + timeout_ns
+            reader = self.sockets[colour]["reader"]
+            if self.sockets[colour]["binary"]:
+                record = reader.read_record(BinaryMessage.SIZE, deadline)
+                data = bytes(BinaryMessage.decode_move(record), "utf-8")
+            else:
+                data = reader.read_message(deadline)
             move_time = time_ns() - move_time
-            Protocol.sockets[colour]["conn"].settimeout(socket.getdefaulttimeout())
 
         except socket.timeout:
             if verbose:
                 print(
-                    f"{Protocol.sockets[colour]['name']} timed out. "
+                    f"{self.sockets[colour]['name']} timed out. "
                     + "Nothing received."
                 )
             return ("NO MESSAGE", -1)
         except ConnectionResetError:
+            self._failed = colour
             if verbose:
-                print(f"{Protocol.sockets[colour]['name']} disconnected early.")
+                print(f"{self.sockets[colour]['name']} disconnected early.")
             return ("NO MESSAGE", -1)
         except Exception:
             if verbose:
                 print(
-                    f"{Protocol.sockets[colour]['name']} socket "
+                    f"{self.sockets[colour]['name']} socket "
                     + "ended unexpectedly."
                 )
             return ("NO MESSAGE", -1)
+        finally:
+            self.sockets[colour]["conn"].settimeout(socket.getdefaulttimeout())
+
+        if len(data) == 0 and self.sockets[colour]["reader"].is_closed():
+            self._failed = colour
+            if verbose:
+                print(f"{self.sockets[colour]['name']} disconnected early.")
+            return ("NO MESSAGE", -1)
 
         if verbose:
             print(
                 f"Received {data.decode('utf-8').strip()} from "
-                + f"{Protocol.sockets[colour]['name']} in "
+                + f"{self.sockets[colour]['name']} in "
                 + f"~{int(move_time/10**4)/10**5}s."
             )
 
         return (data.decode("utf-8"), move_time)
 
-    @staticmethod
-    def send_message(colour, message, verbose=False):
+    def send_message(self, colour, message, verbose=False):
         """Sends the specified message to the specified colour agent."""
 
         try:
-            Protocol.sockets[colour]["conn"].sendall(bytes(message, "utf-8"))
+            if self.sockets[colour]["binary"]:
+                data = BinaryMessage.encode(message)
+            else:
+                data = bytes(message, "utf-8")
+            self.sockets[colour]["conn"].sendall(data)
+            if self.persistent and message.startswith("END"):
+                # the agent is only reused once it has answered READY
+                self.sockets[colour]["ready"] = None
             if verbose:
                 print("Sent", message, end="")
 
@@ -133,34 +556,81 @@ class Protocol:
             if verbose:
                 print(
                     f"Failed to send {message.strip()} to "
-                    + f"{Protocol.sockets[colour]['name']}."
+                    + f"{self.sockets[colour]['name']}."
                 )
 
-    @staticmethod
-    def swap():
+    def is_connected(self):
+        """Returns True if both agents are connected and still running,
+        and have answered the END of the last game with READY, i.e. if
+        they can be reused for another game. Waits up to READY_TIMEOUT for
+        that answer.
+        """
+
+        for colour in Colour:
+            x = self.sockets[colour]
+            if (
+                len(x.keys()) == 0
+                or x["conn"] is None
+                or x["thread"].poll() is not None
+            ):
+                return False
+            if x.get("ready", True) is None:
+                x["ready"] = self._read_ready(colour)
+            if not x.get("ready", True):
+                return False
+        return True
+
+    def _read_ready(self, colour):
+        """Waits for the given colour agent to send READY after END.
+        Returns False if it sent something else, exited, closed its
+        connection or took longer than READY_TIMEOUT.
+        """
+
+        x = self.sockets[colour]
+        deadline = time_ns() + Protocol.READY_TIMEOUT
+        if not x["reader"].has_record(len(Protocol.READY)):
+            readable, _ = self._wait([x["conn"]], [colour], deadline)
+            if len(readable) == 0:
+                return False
+        try:
+            ready = x["reader"].read_record(len(Protocol.READY), deadline)
+            x["conn"].settimeout(socket.getdefaulttimeout())
+        except OSError:
+            return False
+        return ready == Protocol.READY
+
+    def assign(self, red_name):
+        """Makes the agent with the given name play Red in the next game,
+        swapping the agents if needed.
+        """
+
+        if self.sockets[Colour.RED]["name"] != red_name:
+            self.swap()
+
+    def swap(self):
         """Switches the colours of the two agents."""
 
-        Protocol.sockets[Colour.RED], Protocol.sockets[Colour.BLUE] = (
-            Protocol.sockets[Colour.BLUE],
-            Protocol.sockets[Colour.RED],
+        self.sockets[Colour.RED], self.sockets[Colour.BLUE] = (
+            self.sockets[Colour.BLUE],
+            self.sockets[Colour.RED],
         )
 
-    @staticmethod
-    def close(kill_children=True, verbose=False):
-        """Closes the connection. If kill_children=True, it will also forcibly
-        terminate the agents. Otherwise, it will block the thread until they
-        have terminated on their own.
+    def close(self, kill_children=True, verbose=False):
+        """Closes the connection. If kill_children=True, it will also
+        terminate the agents, and kill those that do not exit within
+        AgentProcess.TERMINATE_TIMEOUT. Otherwise, it will block the thread
+        until they have terminated on their own. Either way, the agents are
+        reaped and the processes they started are stopped with them.
         """
 
-        # close sockets and agents
-        for colour in Colour:
-            x = Protocol.sockets[colour]
-            if len(x.keys()) == 0:
-                continue
+        agents = [self.sockets[c] for c in Colour if len(self.sockets[c].keys()) > 0]
 
+        # ask every agent to exit before waiting for any, so they share one
+        # deadline, then kill and reap them and what they started
+        for x in agents:
             try:
                 if kill_children:
-                    x["thread"].kill()
+                    x["thread"].terminate()
                 else:
                     x["thread"].wait()
             except Exception as e:
@@ -170,6 +640,24 @@ class Protocol:
                         + f"thread. Exception raised: {e}"
                     )
 
+        deadline = time_ns() + AgentProcess.TERMINATE_TIMEOUT
+        for x in agents:
+            if kill_children:
+                leaked = x["thread"].wait_stopped(deadline)
+            else:
+                # the agent has exited; what it started is stopped with it
+                leaked = x["thread"].stop(deadline)
+            if len(leaked) > 0:
+                print(
+                    f"{x['name']} left processes running that could not be "
+                    + f"stopped: {leaked}.",
+                    file=stderr,
+                )
+
+            if x.get("exit") is not None:
+                os.close(x["exit"])
+                x["exit"] = None
+
             try:
                 x["conn"].close()
                 if verbose:
@@ -178,25 +666,30 @@ class Protocol:
                 if verbose:
                     print(f"{x['name']} connection was already closed.")
 
-        # close server
-        try:
-            Protocol.s.close()
-        except AttributeError:
-            if verbose:
-                print("Socket was not open.")
+        # close servers
+        if len(self._listeners) == 0 and verbose:
+            print("Socket was not open.")
+        for listener, _ in self._listeners.values():
+            Protocol.close_listener(listener)
+        self._listeners = {}
+
+        if self._shared_board is not None:
+            self._shared_board.close()
+            self._shared_board = None
 
 
 if __name__ == "__main__":
     commands = ["echo Hello 1", "echo Hello 2", "python agents/NaiveAgent.py"]
 
-    Protocol.start()
+    p = Protocol()
+    p.start()
 
-    Protocol.accept_connection(commands[2], verbose=True)
-    Protocol.accept_connection(commands[2], verbose=True)
-    Protocol.send_message(Colour.RED, "START;2;R", verbose=True)
-    Protocol.get_message(Colour.RED, verbose=True)
-    Protocol.send_message(Colour.BLUE, "START;2;B", verbose=True)
-    Protocol.send_message(Colour.RED, "END", verbose=True)
-    Protocol.send_message(Colour.BLUE, "END", verbose=True)
+    p.accept_connection(commands[2], "Alice", verbose=True)
+    p.accept_connection(commands[2], "Bob", verbose=True)
+    p.send_message(Colour.RED, "START;2;R", verbose=True)
+    p.get_message(Colour.RED, verbose=True)
+    p.send_message(Colour.BLUE, "START;2;B", verbose=True)
+    p.send_message(Colour.RED, "END", verbose=True)
+    p.send_message(Colour.BLUE, "END", verbose=True)
 
-    Protocol.close()
+    p.close()
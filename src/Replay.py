@@ -0,0 +1,296 @@
+"""This script replays the games of a log directory or a GameArchive
+through the rules of the engine, without starting agents, and prints
+the games whose logs do not follow them.
+
+Possible arguments:
+* The first argument that is not one of the following is the log
+directory or the archive. Defaults to the logs directory at the root of
+the repository.
+* "processes=n" or "p=n" replays on n processes. Defaults to the number
+of cores of the machine.
+* "-bitboard" or "-bb" replays on BitBoard instead of Board.
+* "game=n" prints the board of the game at index n instead, after the
+move given by "ply=n", or at the end if it is not given.
+"""
+from multiprocessing import Pool
+from os import cpu_count
+from os.path import exists
+from sys import argv
+from time import time_ns as time
+
+import numpy as np
+
+from BitBoard import BitBoard
+from Board import Board
+from Colour import Colour
+from EndState import EndState
+from Game import Game
+from GameArchive import GameArchive
+from Move import Move
+
+
+class _Position:
+    """The state of a replayed game, with the part of Game that
+    Move.is_valid_move reads.
+    """
+
+    def __init__(self, board):
+        self.board = board
+        self.colour = Colour.RED
+        self.turn = 1
+
+    def get_board(self):
+        return self.board
+
+    def get_player(self):
+        return self.colour
+
+    def get_turn(self):
+        return self.turn
+
+
+class Replay:
+    """Replays the games of a GameArchive move by move on a Board, with
+    the rules Game applies: the moves are checked with
+    Move.is_valid_move and the game ends on a win, an illegal move or a
+    timeout.
+
+    Colours follow Game: red moves first, then the colours alternate,
+    except right after a swap, where the agent that started as red moves
+    again as blue. A swap does not change the tiles.
+    """
+
+    # games per task of verify_all
+    CHUNK_SIZE = 256
+
+    def __init__(self, archive, bitboard=False):
+        self._archive = archive
+        self._board_class = BitBoard if bitboard else Board
+        self._games = archive.get_games()
+        self._moves = archive.get_moves()
+
+    def _play(self, game, ply=None):
+        """Replays the first ply moves of a game, or all of them. Returns
+        the position, the number of moves played, the end state the
+        moves lead to and its winner, by starting colour, and the errors
+        found.
+        """
+
+        record = self._games[game]
+        moves = self._archive.get_game_moves(game)
+        if ply is None:
+            ply = len(moves)
+        xs = moves["x"][:ply].tolist()
+        ys = moves["y"][:ply].tolist()
+        times = moves["time"][:ply].tolist()
+
+        position = _Position(self._board_class(int(record["board_size"])))
+        board = position.board
+        end_state, winner, errors = None, -1, []
+        played = 0
+        for x, y, move_time in zip(xs, ys, times):
+            if end_state is not None:
+                errors.append(f"move {played + 1} is after the end of the game")
+                break
+            played += 1
+            position.turn = played
+            # the agent that started as red makes the odd moves
+            mover = (played - 1) % 2
+
+            if move_time == -1:
+                end_state, winner = EndState.TIMEOUT, 1 - mover
+                continue
+
+            move = Move(position.colour, x, y)
+            if x == -2 or not move.is_valid_move(position):
+                end_state, winner = EndState.BAD_MOVE, 1 - mover
+                continue
+
+            if move.is_swap():
+                # the agents exchange colours, so blue moves again
+                position.colour = Colour.BLUE
+                continue
+
+            move.move(board)
+            if board.has_ended():
+                end_state, winner = EndState.WIN, mover
+            position.colour = position.colour.opposite()
+
+        return (position, played, end_state, winner, errors)
+
+    def get_board(self, game, ply=None):
+        """Returns the board of a game after its first ply moves, or at the
+        end if ply is None.
+        """
+
+        return self._play(game, ply)[0].get_board()
+
+    def get_states(self, game):
+        """Returns the boards of a game before its first move and after
+        each move, as an array of shape (moves + 1, board_size,
+        board_size) with 0 for empty tiles, 1 for red and 2 for blue.
+        Moves that were not played on the board, such as a swap, repeat
+        the previous board.
+        """
+
+        record = self._games[game]
+        size = int(record["board_size"])
+        moves = self._archive.get_game_moves(game)
+
+        # the tile each move occupied and its colour, from a replay
+        position = self._play(game)[0]
+        board = position.get_board()
+        xs, ys = moves["x"].astype(np.int64), moves["y"].astype(np.int64)
+        on_board = (xs >= 0) & (xs < size) & (ys >= 0) & (ys < size)
+        tiles = np.where(on_board, xs * size + ys, 0)
+
+        colours = np.zeros(size * size, dtype=np.int8)
+        placed_at = np.full(size * size, len(moves) + 1)
+        for ply in np.flatnonzero(on_board)[::-1]:
+            x, y = int(xs[ply]), int(ys[ply])
+            colour = board.get_tile_colour(x, y)
+            if colour is None:
+                continue
+            # the earliest move on a tile is the one that occupied it
+            placed_at[tiles[ply]] = ply + 1
+            colours[tiles[ply]] = 1 if colour == Colour.RED else 2
+
+        plies = np.arange(len(moves) + 1)[:, None]
+        states = np.where(placed_at[None, :] <= plies, colours[None, :], 0)
+        return states.astype(np.int8).reshape(len(moves) + 1, size, size)
+
+    def verify(self, game):
+        """Replays a game and returns the ways its log differs from the
+        rules, as a list of messages, empty if it follows them.
+        """
+
+        record = self._games[game]
+        position, played, end_state, winner, errors = self._play(game)
+        recorded = GameArchive.END_STATES[record["end_state"]]
+        # games that ended abnormally or before the first move have no
+        # end to check
+        if recorded is None or played == 0:
+            return errors
+
+        if end_state is None and recorded == EndState.TIMEOUT:
+            # the agent that made the last move exited or disconnected while
+            # the other one was thinking, so no timeout was logged
+            end_state, winner = EndState.TIMEOUT, played % 2
+
+        if end_state is None:
+            errors.append(
+                f"recorded {EndState.get_text(recorded)}, but the game had not "
+                + "ended"
+            )
+        elif end_state != recorded:
+            errors.append(
+                f"recorded {EndState.get_text(recorded)}, but the moves end in "
+                + EndState.get_text(end_state)
+            )
+        elif winner != record["winner"]:
+            names = self._archive.get_names()
+            agents = [record["red"], record["blue"]]
+            errors.append(
+                f"recorded {names[agents[record['winner']]]} as the winner, "
+                + f"but {names[agents[winner]]} won"
+            )
+        return errors
+
+    def verify_games(self, games):
+        """Verifies the games at the given indices. Returns the errors of
+        the games that have some, as a dictionary by index.
+        """
+
+        invalid = {}
+        for game in games:
+            errors = self.verify(game)
+            if errors:
+                invalid[game] = errors
+        return invalid
+
+    def verify_all(self, processes=None):
+        """Verifies all games on a pool of processes, CHUNK_SIZE games at
+        a time. Returns the same dictionary as verify_games.
+        """
+
+        chunks = [
+            range(start, min(start + Replay.CHUNK_SIZE, len(self._games)))
+            for start in range(0, len(self._games), Replay.CHUNK_SIZE)
+        ]
+        if processes == 1 or len(chunks) <= 1:
+            return self.verify_games(range(len(self._games)))
+
+        invalid = {}
+        # workers map the archive again instead of receiving its tables
+        with Pool(
+            processes,
+            initializer=_start_worker,
+            initargs=(self._archive.get_path(), self._board_class == BitBoard),
+        ) as pool:
+            for result in pool.imap_unordered(_verify_chunk, chunks):
+                invalid.update(result)
+        return dict(sorted(invalid.items()))
+
+
+# the Replay of a worker process of verify_all
+_replay = None
+
+
+def _start_worker(path, bitboard):
+    global _replay
+    _replay = Replay(GameArchive(path), bitboard)
+
+
+def _verify_chunk(games):
+    return _replay.verify_games(games)
+
+
+def main():
+    path = Game.get_log_directory()
+    processes = cpu_count()
+    bitboard = "-bitboard" in argv or "-bb" in argv
+    game, ply = None, None
+
+    try:
+        for argument in argv[1:]:
+            if "processes=" in argument or "p=" in argument:
+                processes = int(argument.split("=")[1])
+            elif "game=" in argument:
+                game = int(argument.split("=")[1])
+            elif "ply=" in argument:
+                ply = int(argument.split("=")[1])
+            elif not argument.startswith("-"):
+                path = argument
+    except Exception:
+        print("ERROR: Arguments not valid. Aborted.")
+        return
+
+    if not exists(path):
+        print(f"ERROR: No games in {path}. Aborted.")
+        return
+
+    archive = GameArchive.load(path)
+    replay = Replay(archive, bitboard)
+    if game is not None:
+        print(replay.get_board(game, ply).print_board(bnf=False))
+        return
+
+    start = time()
+    invalid = replay.verify_all(processes)
+    total_time = time() - start
+    moves = len(archive.get_moves())
+    print(
+        f"Replayed {len(archive)} games and {moves} moves in "
+        + f"{Game.ns_to_s(total_time)}s "
+        + f"({moves * 10 ** 9 / max(total_time, 1):.0f} moves/s). "
+        + f"{len(invalid)} games do not follow the rules."
+    )
+    sources = archive.get_games()["source"]
+    for game, errors in invalid.items():
+        print(f"{game} ({archive.get_sources()[sources[game]]})")
+        for error in errors:
+            print(f"    {error}")
+
+
+if __name__ == "__main__":
+    main()
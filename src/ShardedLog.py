@@ -0,0 +1,63 @@
+import gzip
+import shutil
+from os import getpid, remove
+from os.path import join
+
+from LogWriter import LogWriter
+
+
+class ShardedLog:
+    """Append-only log shared by all matches a process plays in a
+    tournament. It has the same methods as LogWriter.
+
+    Each process writes to its own shards in the tournament's log
+    directory, named <pid>-<n>.csv, so processes never share a file.
+    When a shard has grown past max_bytes, it is compressed to
+    <pid>-<n>.csv.gz at the next flush and the next shard is started.
+    Game flushes the log after every match, so matches are never split
+    across shards and every finished match is on disk.
+    """
+
+    MAX_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, directory, max_bytes=MAX_BYTES, compress=True):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._compress = compress
+        self._shard = 0
+        self._file = None
+        self._open()
+
+    def _open(self):
+        self._path = join(self._directory, f"{getpid()}-{self._shard}.csv")
+        self._file = open(self._path, "x", buffering=LogWriter.BUFFER_SIZE)
+
+    def write(self, message):
+        self._file.write(message)
+
+    def flush(self):
+        """Writes the buffered lines, then starts a new shard if the
+        current one is full.
+        """
+
+        self._file.flush()
+        if self._file.tell() >= self._max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        if self._compress:
+            with open(self._path, "rb") as f_in:
+                with gzip.open(f"{self._path}.gz", "wb") as f_out:
+                    shutil.copyfileobj(f_in, f_out)
+            remove(self._path)
+
+        self._shard += 1
+        self._open()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def get_path(self):
+        return self._path
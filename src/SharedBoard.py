@@ -0,0 +1,89 @@
+import struct
+from multiprocessing.shared_memory import SharedMemory
+
+from Colour import Colour
+
+
+class SharedBoard:
+    """Class that mirrors the board of a game in a named shared-memory
+    segment, so agents can read it from memory instead of having it sent
+    and parsed with every move. The engine still plays and validates
+    moves on its own Board; this is a copy for the agents only.
+
+    The segment starts with a header of native-endian fields: sequence
+    (8 bytes), moves (8 bytes), the board size (4 bytes) and 4 bytes of
+    padding. One byte per tile follows, in row-major order, i.e. tile x,y
+    is at x * board_size + y: EMPTY, RED or BLUE. moves counts the moves
+    played in the game, swaps included, which leave the tiles as they
+    are.
+
+    sequence makes the header a sequence lock. It is odd while the engine
+    writes and grows by two with every write, so a reader reads it, then
+    the tiles, then it again, and retries if it was odd or has changed.
+    The engine only writes after a move and before sending CHANGE, so the
+    board does not change while the agent to play is thinking. Python has
+    no memory barriers: the lock relies on stores becoming visible in the
+    order they are made, as on x86-64.
+
+    agents/shared_board.py reads it on the agent side.
+    """
+
+    HEADER = struct.Struct("=QQI4x")
+
+    EMPTY = 0
+    RED = 1
+    BLUE = 2
+    TILES = {Colour.RED: RED, Colour.BLUE: BLUE}
+
+    def __init__(self, name, board_size):
+        self.name = name
+        self.board_size = board_size
+        size = SharedBoard.HEADER.size + board_size * board_size
+        self._memory = SharedMemory(name, create=True, size=size)
+        SharedBoard.HEADER.pack_into(self._memory.buf, 0, 0, 0, board_size)
+
+        # views of the sequence and moves, and of the tiles, which are
+        # cheaper to write than packing the header
+        self._header = self._memory.buf[:16].cast("Q")
+        self._tiles = self._memory.buf[SharedBoard.HEADER.size :]
+
+    def reset(self):
+        """Empties the board and its move count, for a new game."""
+
+        self._header[0] += 1
+        self._tiles[:] = bytes(len(self._tiles))
+        self._header[1] = 0
+        self._header[0] += 1
+
+    def play(self, x, y, colour):
+        """Fills the tile x,y with the given colour."""
+
+        self._header[0] += 1
+        self._tiles[x * self.board_size + y] = SharedBoard.TILES[colour]
+        self._header[1] += 1
+        self._header[0] += 1
+
+    def swap(self):
+        """Counts a swap."""
+
+        self._header[0] += 1
+        self._header[1] += 1
+        self._header[0] += 1
+
+    def close(self):
+        """Unmaps the segment and removes it. Agents that still map it keep
+        their mapping.
+        """
+
+        self._header.release()
+        self._tiles.release()
+        self._memory.close()
+        self._memory.unlink()
+
+
+if __name__ == "__main__":
+    b = SharedBoard("hex_example", 3)
+    b.play(1, 2, Colour.RED)
+    b.swap()
+    print(SharedBoard.HEADER.unpack_from(b._memory.buf), bytes(b._tiles))
+    b.close()
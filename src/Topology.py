@@ -0,0 +1,101 @@
+from Tile import Tile
+
+
+class Topology:
+    """The geometry of a Hex board of one size: the neighbours and bridges
+    of every tile and the virtual edge nodes it touches, as tuples of flat
+    tile indices, x * board_size + y.
+
+    It does not depend on the tiles' colours, so it is computed once per
+    board size and process, by get(), and shared by all boards of that
+    size. Lookups need no bounds checks: tiles only list the neighbours
+    and bridges that are on the board.
+    """
+
+    # indices of the displacements that precede a tile in row-major order,
+    # i.e. top left, top right and left
+    PRECEDING_NEIGHBOURS = (0, 1, 5)
+
+    # displacements of the tiles two steps away that two neighbours of a
+    # tile both touch, i.e. the other ends of its bridges
+    BRIDGE_DISPLACEMENTS = [(-2, 1), (-1, 2), (1, 1), (2, -1), (1, -2), (-1, -1)]
+
+    _topologies = {}
+
+    def __init__(self, board_size):
+        self.board_size = board_size
+        self.tile_count = board_size * board_size
+
+        # virtual edge nodes, after the tiles
+        self.top = self.tile_count
+        self.bottom = self.tile_count + 1
+        self.left = self.tile_count + 2
+        self.right = self.tile_count + 3
+
+        self.coordinates = tuple(
+            (x, y) for x in range(board_size) for y in range(board_size)
+        )
+        displacements = list(zip(Tile.I_DISPLACEMENTS, Tile.J_DISPLACEMENTS))
+        self.neighbours = tuple(
+            self._get_tiles(x, y, displacements) for x, y in self.coordinates
+        )
+        self.preceding_neighbours = tuple(
+            self._get_tiles(
+                x, y, [displacements[i] for i in Topology.PRECEDING_NEIGHBOURS]
+            )
+            for x, y in self.coordinates
+        )
+        self.bridges = tuple(
+            self._get_tiles(x, y, Topology.BRIDGE_DISPLACEMENTS)
+            for x, y in self.coordinates
+        )
+
+        # the edge nodes each colour joins a tile to: Red connects top to
+        # bottom and Blue left to right
+        self.red_edges = tuple(
+            ((self.top,) if x == 0 else ())
+            + ((self.bottom,) if x == board_size - 1 else ())
+            for x, y in self.coordinates
+        )
+        self.blue_edges = tuple(
+            ((self.left,) if y == 0 else ())
+            + ((self.right,) if y == board_size - 1 else ())
+            for x, y in self.coordinates
+        )
+
+        # the tiles along each edge
+        self.edge_tiles = {
+            self.top: tuple(range(board_size)),
+            self.bottom: tuple(range(self.tile_count - board_size, self.tile_count)),
+            self.left: tuple(range(0, self.tile_count, board_size)),
+            self.right: tuple(range(board_size - 1, self.tile_count, board_size)),
+        }
+
+    def _get_tiles(self, x, y, displacements):
+        """Returns the indices of the tiles at the given displacements from
+        x,y that are on the board.
+        """
+
+        n = self.board_size
+        return tuple(
+            (x + dx) * n + y + dy
+            for dx, dy in displacements
+            if 0 <= x + dx < n and 0 <= y + dy < n
+        )
+
+    @staticmethod
+    def get(board_size):
+        """Returns the topology of the given board size, computing it on
+        the first call.
+        """
+
+        topology = Topology._topologies.get(board_size)
+        if topology is None:
+            topology = Topology(board_size)
+            Topology._topologies[board_size] = topology
+        return topology
+
+
+if __name__ == "__main__":
+    t = Topology.get(3)
+    print(t.neighbours[4], t.bridges[4], t.red_edges[0], t.edge_tiles[t.right])
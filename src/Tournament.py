@@ -0,0 +1,400 @@
+"""This script runs a tournament of Hex between several agents.
+
+Matches are played concurrently on a pool of processes, one match per
+process at a time, so the number of games per hour grows with the
+number of cores. Results are collected from each Game directly and
+printed as standings, and can be saved as JSON.
+
+Possible arguments:
+* "agent=name;command" or "a=name;command" specifies one agent
+with the given name, that can be run by the given command. At least
+two agents are needed and their names must be unique.
+"a=name;command;transport" also chooses the transport of the agent, as
+with Hex.py.
+* "schedule=round_robin" plays every pair of agents. This is the
+default.
+* "schedule=gauntlet" plays the first agent against every other one.
+* "games=n" or "g=n" plays n games per pairing. Colours alternate
+between games, as with the "-switch" argument of Hex.py.
+* "board_size=n" or "b=n" plays on a square board of size nxn.
+* "processes=n" or "p=n" plays at most n matches at once. Defaults to
+the number of cores of the machine.
+* "results=path" saves the results of all matches to a JSON file.
+* "-persistent" reuses the same two agent processes for a run of games
+instead of starting new ones for every game. The games of each pairing
+are split into one contiguous chunk per process, at most one per game,
+so they are still played concurrently, and every chunk keeps its own
+two agents. The agents must support the persistent protocol mode (see Protocol); agents that exit
+after a game, or do not answer its end, are restarted, as are both
+agents after a game lost by timeout or illegal move.
+* "-warm" starts the agents of the next game of a chunk between games,
+from an AgentPool, so their startup overlaps the next game instead of
+delaying it. Games are split into chunks as with "-persistent". It is
+only used if the machine has more cores than the chunks played at
+once, as the agents would otherwise start on the cores of the agents
+that think. Agent startup is reported apart
+from agent time.
+* "-log" logs all games to a new directory under logs, in one log per
+process that is split into shards, older shards being compressed.
+"""
+import json
+from datetime import datetime
+from multiprocessing import Pool
+from os import cpu_count, getpid, mkdir
+from os.path import join
+from sys import argv
+from time import time_ns as time
+from uuid import uuid4
+
+from AgentPool import AgentPool
+from Colour import Colour
+from EndState import EndState
+from Game import Game
+from Protocol import Protocol
+from ShardedLog import ShardedLog
+
+
+class Tournament:
+    """This class describes a tournament of Hex between several agents."""
+
+    ROUND_ROBIN = "round_robin"
+    GAUNTLET = "gauntlet"
+
+    def __init__(
+        self,
+        agents,
+        schedule=ROUND_ROBIN,
+        games=2,
+        board_size=11,
+        processes=None,
+        persistent=False,
+        log=False,
+        warm=False,
+    ):
+        self._agents = agents
+        self._schedule = schedule
+        self._games = games
+        self._board_size = board_size
+        self._processes = processes or cpu_count() or 1
+        self._persistent = persistent
+        self._warm = warm
+        self._log = log
+        self._log_directory = None
+
+        self._results = []
+        self._time = 0
+
+    def get_matches(self):
+        """Returns the list of matches to play, each as a pair of agents
+        (Red, Blue). Every pairing is played self._games times, and the
+        agents swap colours on every other game.
+        """
+
+        matches = []
+        for a, b in self.get_pairings():
+            for idx in range(self._games):
+                if idx % 2 == 0:
+                    matches.append((a, b))
+                else:
+                    matches.append((b, a))
+        return matches
+
+    def get_pairings(self):
+        """Returns the list of pairs of agents that play each other."""
+
+        if self._schedule == Tournament.ROUND_ROBIN:
+            pairings = [
+                (a, b)
+                for i, a in enumerate(self._agents)
+                for b in self._agents[i + 1 :]
+            ]
+        elif self._schedule == Tournament.GAUNTLET:
+            pairings = [(self._agents[0], b) for b in self._agents[1:]]
+        else:
+            raise ValueError(f"Unknown schedule {self._schedule}.")
+
+        return pairings
+
+    def get_chunks(self, keep_agents=False):
+        """Returns the tasks the games are played in, each as a tuple (a,
+        b, start, stop): games start to stop - 1 of the pairing of a and b,
+        played in order by one worker. If keep_agents=True, the games of
+        every pairing are split into min(processes, games) contiguous
+        chunks, whose games can share their agents; otherwise every game
+        is a task of its own.
+        """
+
+        count = self._games
+        if keep_agents:
+            count = min(self._processes, self._games)
+        return [
+            (a, b, idx * self._games // count, (idx + 1) * self._games // count)
+            for a, b in self.get_pairings()
+            for idx in range(count)
+        ]
+
+    def has_idle_cores(self):
+        """Returns True if the machine has more cores than the chunks of
+        warm games played at once, so agents started ahead of their game
+        have a core no game is using.
+        """
+
+        concurrent = min(self._processes, len(self.get_chunks(keep_agents=True)))
+        return (cpu_count() or 1) > concurrent
+
+    def run(self, verbose=True):
+        """Plays all matches on the process pool and returns their
+        results in the order they finished.
+        """
+
+        if self._log:
+            self._log_directory = join(
+                Game.get_log_directory(),
+                f"tournament-{datetime.now():%Y%m%d-%H%M%S}-{getpid()}-"
+                + uuid4().hex[:8],
+            )
+            mkdir(self._log_directory)
+
+        warm = self._warm and self.has_idle_cores()
+        if self._warm and not warm and verbose:
+            print("No core is left to start agents ahead of their games.")
+
+        # persistent and warm agents play a chunk of the games of a
+        # pairing in one worker, with the same agents or pool
+        tasks = [
+            (self._board_size, a, b, start, stop, self._log_directory)
+            + (self._persistent, warm)
+            for a, b, start, stop in self.get_chunks(self._persistent or warm)
+        ]
+        total = len(self.get_matches())
+
+        start_time = time()
+        with Pool(self._processes) as pool:
+            for results in pool.imap_unordered(play_pairing, tasks):
+                for result in results:
+                    self._results.append(result)
+                    if verbose:
+                        print(
+                            f"[{len(self._results)}/{total}] "
+                            + f"{result[Colour.RED]['name']} vs "
+                            + f"{result[Colour.BLUE]['name']}: "
+                            + f"{result['winner']} won "
+                            + f"({EndState.get_text(result['end state'])})"
+                        )
+        self._time = time() - start_time
+
+        return self._results
+
+    def get_standings(self):
+        """Returns a list of (name, played, won, time, startup) tuples
+        sorted by the number of wins. time is the total time the agent
+        took to move and startup the total time the engine waited for it
+        to start, in nanoseconds.
+        """
+
+        standings = {
+            agent["name"]: {"played": 0, "won": 0, "time": 0, "startup": 0}
+            for agent in self._agents
+        }
+        for result in self._results:
+            for colour in Colour:
+                player = standings[result[colour]["name"]]
+                player["played"] += 1
+                player["won"] += result[colour]["won"]
+                player["time"] += result[colour]["time"]
+                player["startup"] += result[colour]["startup"]
+
+        return sorted(
+            [
+                (name, s["played"], s["won"], s["time"], s["startup"])
+                for name, s in standings.items()
+            ],
+            key=lambda x: x[2],
+            reverse=True,
+        )
+
+    def get_log_directory(self):
+        """Returns the directory of the logs, or None if games are not
+        logged.
+        """
+        return self._log_directory
+
+    def get_games_per_hour(self):
+        if self._time == 0:
+            return 0
+        return len(self._results) * 3600 * 10 ** 9 / self._time
+
+    def save_results(self, path):
+        """Writes the results of all matches to a JSON file."""
+
+        results = []
+        for result in self._results:
+            results.append(
+                {
+                    "end state": EndState.get_text(result["end state"]),
+                    "winner": result["winner"],
+                    "swapped": result["swapped"],
+                    "turns": result["turns"],
+                    "time": result["time"],
+                    "board size": result["board size"],
+                    "engine overhead": result["engine overhead"],
+                    "red": result[Colour.RED],
+                    "blue": result[Colour.BLUE],
+                }
+            )
+
+        with open(path, "w") as f:
+            json.dump(results, f, indent=1)
+
+
+# the log of each worker process, by log directory
+_logs = {}
+
+
+def get_log(log_directory):
+    """Returns the log this process writes to in the given directory,
+    opening it on first use. It stays open for the following games.
+    """
+
+    if log_directory not in _logs:
+        _logs[log_directory] = ShardedLog(log_directory)
+    return _logs[log_directory]
+
+
+def play_pairing(pairing):
+    """Plays games start to stop - 1 between two agents in a worker
+    process and returns their results. The agents alternate colours by
+    the index of the game in the pairing, a being Red in even games. If
+    persistent=True, the agents are started in persistent mode and reused
+    for as long as they stay connected. If warm=True, they are taken from
+    an AgentPool, which starts the agents of the next game between games.
+    """
+
+    board_size, a, b, start, stop, log_directory, persistent, warm = pairing
+    log_writer = None
+    if log_directory is not None:
+        log_writer = get_log(log_directory)
+
+    pool = AgentPool() if warm else None
+    protocol = None
+    results = []
+    for idx in range(start, stop):
+        red, blue = (a, b) if idx % 2 == 0 else (b, a)
+        # agents are only reused after a game that ended normally, and once
+        # they have said they are ready for another
+        if (
+            protocol is None
+            or not persistent
+            or results[-1]["end state"] != EndState.WIN
+            or protocol.get_failed() is not None
+            or not protocol.is_connected()
+        ):
+            if protocol is not None:
+                protocol.close()
+            protocol = Protocol(persistent=persistent, pool=pool)
+
+        g = Game(
+            board_size=board_size,
+            player1=red,
+            player2=blue,
+            verbose=False,
+            log=False,
+            print_protocol=False,
+            kill_bots=True,
+            silent_bots=True,
+            protocol=protocol,
+            log_writer=log_writer,
+        )
+        results.append(g.run())
+        if pool is not None and idx + 1 < stop:
+            pool.refill()
+
+    protocol.close()
+    if pool is not None:
+        pool.close()
+    return results
+
+
+def main():
+    agents = []
+    schedule = Tournament.ROUND_ROBIN
+    games = 2
+    board_size = 11
+    processes = None
+    results_path = None
+    persistent = False
+    warm = False
+    log = False
+
+    try:
+        for argument in argv[1:]:
+            if "agent=" in argument or "a=" in argument:
+                fields = argument.split(";")
+                agent = {"name": fields[0].split("=")[1], "run string": fields[1]}
+                if len(fields) > 2:
+                    if fields[2] not in Protocol.TRANSPORTS:
+                        raise ValueError(f"Unknown transport {fields[2]}")
+                    agent["transport"] = fields[2]
+                agents.append(agent)
+            elif "schedule=" in argument:
+                schedule = argument.split("=")[1]
+            elif "games=" in argument or "g=" in argument:
+                games = int(argument.split("=")[1])
+            elif "board_size=" in argument or "b=" in argument:
+                board_size = int(argument.split("=")[1])
+            elif "processes=" in argument or "p=" in argument:
+                processes = int(argument.split("=")[1])
+            elif "results=" in argument:
+                results_path = argument.split("=")[1]
+            elif argument == "-persistent":
+                persistent = True
+            elif argument == "-warm":
+                warm = True
+            elif argument == "-log":
+                log = True
+    except Exception as e:
+        print("ERROR: Arguments not valid. Aborted.")
+        return
+
+    if len(agents) < 2:
+        print("ERROR: At least two agents must be specified. Aborted.")
+        return
+    names = [agent["name"] for agent in agents]
+    if len(names) != len(set(names)):
+        print("ERROR: Agent names must be unique. Aborted.")
+        return
+    if schedule not in [Tournament.ROUND_ROBIN, Tournament.GAUNTLET]:
+        print(f"ERROR: Unknown schedule {schedule}. Aborted.")
+        return
+
+    t = Tournament(
+        agents,
+        schedule=schedule,
+        games=games,
+        board_size=board_size,
+        processes=processes,
+        persistent=persistent,
+        log=log,
+        warm=warm,
+    )
+    t.run()
+
+    print(
+        f"Played {len(t.get_matches())} games at "
+        + f"{int(t.get_games_per_hour())} games per hour."
+    )
+    for name, played, won, total_time, startup in t.get_standings():
+        print(
+            f"{name}: won {won}/{played} in {Game.ns_to_s(total_time)}s, "
+            + f"started in {Game.ns_to_s(startup)}s"
+        )
+
+    if t.get_log_directory() is not None:
+        print(f"Saved logs to {t.get_log_directory()}")
+    if results_path is not None:
+        t.save_results(results_path)
+        print(f"Saved results to {results_path}")
+
+
+if __name__ == "__main__":
+    main()
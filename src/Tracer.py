@@ -0,0 +1,106 @@
+import json
+from contextlib import contextmanager
+from os import getpid, remove
+from os.path import exists
+from time import time_ns
+
+
+class Tracer:
+    """Records the timeline of a match as trace events, which can be
+    opened in chrome://tracing or https://ui.perfetto.dev.
+
+    The engine records spans with span(). Agents add their own spans
+    through a side file: its path is given to them in the HEX_TRACE
+    environment variable, and they append one trace event per line to
+    it, as JSON, with ts and dur in microseconds of wall-clock time
+    (time.time_ns() / 1000) and their own pid. Lines are short enough
+    to be appended atomically, so both agents can share the file. save()
+    merges them with the engine's events.
+
+    A Tracer without a path only keeps the engine's spans in memory, for
+    get_durations.
+    """
+
+    FILE_VARIABLE = "HEX_TRACE"
+
+    def __init__(self, path=None):
+        self._path = path
+        self._agent_path = None if path is None else f"{path}.agents"
+        self._pid = getpid()
+        self._events = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": self._pid,
+                "args": {"name": "Engine"},
+            }
+        ]
+
+        # events of a previous trace with the same path
+        if self._agent_path is not None and exists(self._agent_path):
+            remove(self._agent_path)
+
+    def get_agent_path(self):
+        """Returns the path of the file the agents write their spans to."""
+
+        return self._agent_path
+
+    @contextmanager
+    def span(self, name, category="engine", **args):
+        """Records the time spent in a with block as a span with the
+        given name. Keyword arguments are shown with the span.
+        """
+
+        start = time_ns()
+        try:
+            yield
+        finally:
+            self.add(name, start, time_ns(), category, args)
+
+    def add(self, name, start, end, category="engine", args=None):
+        """Records a span between two time_ns() timestamps."""
+
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start / 10 ** 3,
+            "dur": (end - start) / 10 ** 3,
+            "pid": self._pid,
+            "tid": 0,
+        }
+        if args:
+            event["args"] = args
+        self._events.append(event)
+
+    def get_durations(self):
+        """Returns the total duration in ns and the number of the engine's
+        spans, as a dictionary of (total, count) tuples by span name.
+        """
+
+        durations = {}
+        for event in self._events:
+            if event["ph"] != "X":
+                continue
+            total, count = durations.get(event["name"], (0, 0))
+            durations[event["name"]] = (total + event["dur"] * 10 ** 3, count + 1)
+        return durations
+
+    def save(self):
+        """Writes the engine's and the agents' events to the trace file
+        and removes the side file. Lines of the side file that are not
+        valid JSON, e.g. from an agent killed while writing, are skipped.
+        """
+
+        events = list(self._events)
+        if exists(self._agent_path):
+            with open(self._agent_path) as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        pass
+            remove(self._agent_path)
+
+        with open(self._path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
@@ -4,9 +4,30 @@ This is effectively what starts the game. This script may work when run
 directly, with the same specification as Hex.py, but it is not recommended.
 """
 from sys import argv, platform
+from os import environ
 from os.path import realpath, sep
 
 from Game import Game
+from LocalProtocol import LocalProtocol
+from Protocol import Protocol
+from Tracer import Tracer
+
+
+def get_player(argument):
+    """Returns the player described by an agent argument,
+    "a=name;command" or "a=name;command;transport". Raises an exception
+    if the argument is not valid.
+    """
+
+    fields = argument.split(";")
+    if len(fields) not in (2, 3):
+        raise Exception("Agent argument not valid.")
+    player = {"name": fields[0].split("=")[1], "run string": fields[1]}
+    if len(fields) == 3:
+        if fields[2] not in Protocol.TRANSPORTS:
+            raise Exception(f"Unknown transport {fields[2]}.")
+        player["transport"] = fields[2]
+    return player
 
 
 def main():
@@ -17,8 +38,17 @@ def main():
     silent_bots = "-sb" in argv or "-silent_bots" in argv
     java_ref_agent = "-j" in argv or "-java" in argv
     double = "-d" in argv or "-double" in argv
+    bitboard = "-bb" in argv or "-bitboard" in argv
+    local = "-local" in argv
+    binary = "-binary" in argv
+    shared_board = "-shm" in argv
+    log_latency = "-latency" in argv
+    trace_path = None
+    if "-trace" in argv:
+        trace_path = "trace.json"
 
     board_size = 11
+    port = 0
     agents = []
 
     for argument in argv:
@@ -32,6 +62,14 @@ def main():
             except Exception as e:
                 print("ERROR: Board size argument is not in valid", "format. Aborted.")
                 return
+        if "trace=" in argument:
+            trace_path = argument.split("=")[1]
+        if "port=" in argument:
+            try:
+                port = int(argument.split("=")[1])
+            except Exception as e:
+                print("ERROR: Port argument is not in valid format. Aborted.")
+                return
 
     if len(agents) > 2:
         print("ERROR: Too many agents specified. Aborted.")
@@ -40,15 +78,15 @@ def main():
         if len(agents) == 1 and double:
             print("NOTICE: Double agent enabled. Your agent will play both sides.")
             try:
-                agent1 = {
-                    "name": agents[0].split(";")[0].split("=")[1],
-                    "run string": agents[0].split(";")[1],
-                }
+                agent1 = get_player(agents[0])
             except Exception as e:
                 print("ERROR: Agent arguments not valid. Aborted")
                 return
 
-            agents.append(f"a={agent1['name']}1;{agent1['run string']}")
+            agent2 = f"a={agent1['name']}1;{agent1['run string']}"
+            if "transport" in agent1:
+                agent2 += f";{agent1['transport']}"
+            agents.append(agent2)
 
         else:
             print(
@@ -56,7 +94,12 @@ def main():
                 "Missing players will be replaced with the default agent.",
             )
 
-            if not java_ref_agent:
+            if local:
+                agent_path = sep.join(realpath(__file__).split(sep)[:-2])
+                agent_path += f"{sep}agents{sep}DefaultAgents{sep}NaiveAgent.py"
+                agent_cmd = f"{agent_path}:LocalNaiveAgent"
+
+            elif not java_ref_agent:
                 cmd_ending = "3"
                 if platform == "win32":
                     cmd_ending = ""
@@ -71,26 +114,37 @@ def main():
                 agent_dir = sep.join(realpath(__file__).split(sep)[:-2])
                 agent_dir += f"{sep}agents{sep}DefaultAgents"
                 agent_cmd = f"java -classpath {agent_dir} NaiveAgent"
+                # the bundled class was built before HEX_PORT and always
+                # connects to the legacy port, so the engine listens there
+                if port == 0:
+                    port = Protocol.LEGACY_PORT
 
             for idx in range(2 - len(agents)):
                 agent_string = f"agent=DefaultAgent{idx+1};{agent_cmd}"
                 agents.append(agent_string)
 
     try:
-        player1 = {
-            "name": agents[0].split(";")[0].split("=")[1],
-            "run string": agents[0].split(";")[1],
-        }
-        player2 = {
-            "name": agents[1].split(";")[0].split("=")[1],
-            "run string": agents[1].split(";")[1],
-        }
+        player1 = get_player(agents[0])
+        player2 = get_player(agents[1])
     except Exception as e:
         print("ERROR: Agent arguments not valid. Aborted")
         return
     if "-switch" in argv or "-s" in argv:
         player1, player2 = player2, player1
 
+    # agents started by the engine inherit the path of the trace side file
+    tracer = None
+    if trace_path is not None:
+        tracer = Tracer(trace_path)
+        environ[Tracer.FILE_VARIABLE] = tracer.get_agent_path()
+
+    # in-process agents are called directly instead of over sockets
+    protocol = None
+    if local:
+        protocol = LocalProtocol()
+    elif binary or shared_board:
+        protocol = Protocol(port, binary=binary, shared_board=shared_board)
+
     g = Game(
         board_size=board_size,
         player1=player1,
@@ -100,9 +154,21 @@ def main():
         print_protocol=print_protocol,
         kill_bots=kill_bots,
         silent_bots=silent_bots,
+        bitboard=bitboard,
+        port=port,
+        protocol=protocol,
+        log_latency=log_latency,
+        tracer=tracer,
     )
     g.run()
 
+    if protocol is not None:
+        protocol.close()
+
+    if tracer is not None:
+        tracer.save()
+        print(f"Saved trace to {trace_path}")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,5 @@
+from os.path import realpath, sep
+from sys import path
+
+ROOT = sep.join(realpath(__file__).split(sep)[:-2])
+path.insert(0, f"{ROOT}{sep}src")
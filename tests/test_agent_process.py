@@ -0,0 +1,40 @@
+import os
+from time import sleep
+
+import pytest
+
+from AgentProcess import AgentProcess
+
+pytestmark = pytest.mark.skipif(
+    not os.path.isdir("/proc"), reason="processes are found through /proc"
+)
+
+
+def start(script):
+    p = AgentProcess(["sh", "-c", script])
+    # let the shell start what it runs
+    sleep(0.2)
+    return p
+
+
+def test_stop_ends_processes_that_left_the_group():
+    p = start("setsid sleep 30 & sleep 30")
+    assert len(p.get_processes()) == 3
+    assert p.stop() == []
+    assert p.returncode is not None
+
+
+def test_wait_stopped_sends_no_second_sigterm(tmp_path):
+    count = tmp_path / "count"
+    p = start(f"trap 'echo >> {count}' TERM; while true; do sleep 0.01; done")
+    p.terminate()
+    assert p.wait_stopped() == []
+    # the shell ignores SIGTERM, so it is killed once the deadline passes
+    assert count.read_text().count("\n") == 1
+
+
+def test_reused_pids_are_not_signalled():
+    p = start("sleep 30")
+    # a process the agent never started, remembered with a wrong start time
+    p._group._processes[os.getpid()] = -1
+    assert p.stop() == []
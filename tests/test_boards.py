@@ -0,0 +1,91 @@
+import random
+
+import numpy as np
+import pytest
+
+from BatchBoard import BatchBoard
+from BitBoard import BitBoard
+from Board import Board
+from Colour import Colour
+from Tile import Tile
+
+
+def reference_winner(tiles, n):
+    """Returns the winner of a grid of colours by searching from the
+    starting edge of each colour, or None.
+    """
+
+    for colour, starts in [
+        (Colour.RED, [(0, y) for y in range(n)]),
+        (Colour.BLUE, [(x, 0) for x in range(n)]),
+    ]:
+        stack = [(x, y) for x, y in starts if tiles[x][y] == colour]
+        seen = set(stack)
+        while stack:
+            x, y = stack.pop()
+            if (colour == Colour.RED and x == n - 1) or (
+                colour == Colour.BLUE and y == n - 1
+            ):
+                return colour
+            for dx, dy in zip(Tile.I_DISPLACEMENTS, Tile.J_DISPLACEMENTS):
+                x_n, y_n = x + dx, y + dy
+                if (
+                    0 <= x_n < n
+                    and 0 <= y_n < n
+                    and (x_n, y_n) not in seen
+                    and tiles[x_n][y_n] == colour
+                ):
+                    seen.add((x_n, y_n))
+                    stack.append((x_n, y_n))
+    return None
+
+
+@pytest.mark.parametrize("board_size", [1, 2, 3, 5, 11])
+def test_boards_agree(board_size):
+    """Board, BitBoard and a batch of boards agree on the winner after
+    every move of random games, which go on after the game is won.
+    """
+
+    rng = random.Random(board_size)
+    n = board_size
+    games = 20
+    orders = []
+    for _ in range(games):
+        order = [(x, y) for x in range(n) for y in range(n)]
+        rng.shuffle(order)
+        orders.append(order)
+    colours = [[rng.choice(list(Colour)) for _ in range(n * n)] for _ in range(games)]
+
+    boards = [Board(n) for _ in range(games)]
+    bit_boards = [BitBoard(n) for _ in range(games)]
+    batch = BatchBoard(games, n)
+    grids = [[[None] * n for _ in range(n)] for _ in range(games)]
+    for move in range(n * n):
+        xs = np.array([order[move][0] for order in orders])
+        ys = np.array([order[move][1] for order in orders])
+        codes = [BatchBoard.COLOURS[c[move]] for c in colours]
+        assert batch.move(xs, ys, codes).all()
+        ended = batch.has_ended()
+        winners = batch.get_winners()
+
+        for i in range(games):
+            x, y = orders[i][move]
+            colour = colours[i][move]
+            boards[i].set_tile_colour(x, y, colour)
+            bit_boards[i].set_tile_colour(x, y, colour)
+            grids[i][x][y] = colour
+
+            winner = reference_winner(grids[i], n)
+            assert boards[i].has_ended() == (winner is not None)
+            assert bit_boards[i].has_ended() == (winner is not None)
+            assert bool(ended[i]) == (winner is not None)
+            assert boards[i].get_winner() == winner
+            assert bit_boards[i].get_winner() == winner
+            assert winners[i] == BatchBoard.COLOURS[winner]
+
+    assert BatchBoard.from_boards(boards).print_boards() == batch.print_boards()
+    for i in range(games):
+        assert bit_boards[i].print_board() == boards[i].print_board()
+        assert BitBoard.from_string(boards[i].print_board(), n).has_ended() == (
+            boards[i].has_ended()
+        )
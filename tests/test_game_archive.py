@@ -0,0 +1,144 @@
+import random
+from os.path import sep
+
+from conftest import ROOT
+from EndState import EndState
+from Game import Game
+from GameArchive import GameArchive
+from LocalProtocol import LocalProtocol
+from LogWriter import LogWriter
+from Replay import Replay
+
+HEADER = "Start log at 2024-01-31 12:00:00.000000\nBoard is 3x3.\nNo,Player,X,Y,Time\n"
+
+
+def convert(tmp_path, log):
+    """Converts the text of one log and returns the archive."""
+
+    (tmp_path / "log.csv").write_text(log)
+    return GameArchive.convert([str(tmp_path / "log.csv")], str(tmp_path / "a.hexa"))
+
+
+def get_game(archive):
+    """Returns the only game of an archive as a dictionary, with the names
+    of its agents.
+    """
+
+    assert len(archive) == 1
+    game = archive.get_games()[0]
+    names = archive.get_names()
+    record = {field: game[field].item() for field in GameArchive.GAME_DTYPE.names}
+    record["red"], record["blue"] = names[game["red"]], names[game["blue"]]
+    return record
+
+
+def test_swapped_game(tmp_path):
+    archive = convert(
+        tmp_path,
+        HEADER
+        + "1,Alice,0,0,10\n"
+        + "2,Bob,-1,SWAP,10\n"
+        + "3,Alice,0,1,10\n"
+        + "4,Bob,1,0,10\n"
+        + "5,Alice,0,2,10\n"
+        + "6,Bob,2,0,10\n"
+        + "0,Bob,End,Win,True\n"
+        + "0,Total,6,1000,166\n"
+        + "0,Bob,3,30,10\n"
+        + "0,Alice,3,30,10\n",
+    )
+
+    game = get_game(archive)
+    assert game["swapped"]
+    assert (game["red"], game["blue"]) == ("Alice", "Bob")
+    assert GameArchive.END_STATES[game["end_state"]] == EndState.WIN
+    assert game["winner"] == 1
+    assert Replay(archive).verify(0) == []
+
+
+def test_illegal_swap_does_not_swap(tmp_path):
+    archive = convert(
+        tmp_path,
+        HEADER
+        + "1,Alice,-1,SWAP,100\n"
+        + "0,Bob,End,Illegal move,False\n"
+        + "0,Total,1,1000,1000\n"
+        + "0,Alice,1,100,100\n"
+        + "0,Bob,0,0,0\n",
+    )
+
+    game = get_game(archive)
+    assert not game["swapped"]
+    assert (game["red"], game["blue"]) == ("Alice", "Bob")
+    assert GameArchive.END_STATES[game["end_state"]] == EndState.BAD_MOVE
+    assert game["winner"] == 1
+    assert Replay(archive).verify(0) == []
+
+
+def test_timeout(tmp_path):
+    archive = convert(
+        tmp_path,
+        HEADER
+        + "1,Alice,1,1,10\n"
+        + "2,Bob,0,0,10\n"
+        + "3,Alice,-2,NO MESSAGE,-1\n"
+        + "0,Bob,End,Timeout,False\n"
+        + "0,Total,2,1000,500\n"
+        + "0,Alice,2,300000000000,10\n"
+        + "0,Bob,1,10,10\n",
+    )
+
+    game = get_game(archive)
+    assert not game["swapped"]
+    assert GameArchive.END_STATES[game["end_state"]] == EndState.TIMEOUT
+    assert game["winner"] == 1
+    assert archive.get_moves()["time"].tolist() == [10, 10, -1]
+    assert Replay(archive).verify(0) == []
+
+
+def test_incomplete_log_swaps_on_second_move_only(tmp_path):
+    archive = convert(
+        tmp_path,
+        HEADER
+        + "1,Alice,1,1,10\n"
+        + "2,Bob,-1,SWAP,10\n"
+        + "3,Alice,0,0,10\n"
+        + HEADER
+        + "1,Alice,-1,SWAP,10\n",
+    )
+
+    assert archive.get_games()["swapped"].tolist() == [True, False]
+    assert archive.get_games()["end_state"].tolist() == [0, 0]
+
+
+def test_played_games(tmp_path):
+    """Games played by Game round-trip through their logs."""
+
+    random.seed(1)
+    run_s = f"{ROOT}{sep}agents{sep}DefaultAgents{sep}NaiveAgent.py:LocalNaiveAgent"
+    log_writer = LogWriter(str(tmp_path / "games.csv"))
+    results = []
+    for _ in range(40):
+        g = Game(
+            board_size=4,
+            player1={"name": "Alice", "run string": run_s},
+            player2={"name": "Bob", "run string": run_s},
+            protocol=LocalProtocol(),
+            log_writer=log_writer,
+        )
+        results.append(g.run())
+    log_writer.close()
+
+    archive = GameArchive.convert(
+        [str(tmp_path / "games.csv")], str(tmp_path / "games.hexa")
+    )
+    games = archive.get_games()
+    names = archive.get_names()
+    assert len(games) == len(results)
+    assert any(result["swapped"] for result in results)
+    for game, result in zip(games, results):
+        assert bool(game["swapped"]) == result["swapped"]
+        assert GameArchive.END_STATES[game["end_state"]] == result["end state"]
+        assert names[game[["red", "blue"][game["winner"]]]] == result["winner"]
+        assert game["moves"] == result["turns"]
+    assert Replay(archive).verify_games(range(len(games))) == {}
@@ -0,0 +1,67 @@
+import socket
+import threading
+import time
+from time import time_ns
+
+import pytest
+
+from MessageReader import MessageReader
+
+
+def trickle(sock, data, interval):
+    """Sends data one byte at a time, every interval seconds."""
+
+    for i in range(len(data)):
+        try:
+            sock.sendall(data[i : i + 1])
+        except OSError:
+            return
+        time.sleep(interval)
+
+
+@pytest.fixture
+def pair():
+    a, b = socket.socketpair()
+    yield a, b
+    a.close()
+    b.close()
+
+
+def test_fragmented_message(pair):
+    a, b = pair
+    sender = threading.Thread(target=trickle, args=(b, b"5,6\nSWAP\n", 0.001))
+    sender.start()
+    reader = MessageReader(a)
+    deadline = time_ns() + 10 ** 9
+    assert reader.read_message(deadline) == b"5,6"
+    assert reader.read_message(deadline) == b"SWAP"
+    sender.join()
+
+
+def test_deadline_covers_all_fragments(pair):
+    """A message that keeps arriving a byte at a time, each well within
+    the time left, still times out when the deadline passes.
+    """
+
+    a, b = pair
+    sender = threading.Thread(target=trickle, args=(b, b"1" * 40 + b"\n", 0.02))
+    sender.start()
+    reader = MessageReader(a)
+    start = time_ns()
+    with pytest.raises(socket.timeout):
+        reader.read_message(start + 2 * 10 ** 8)
+    assert time_ns() - start < 4 * 10 ** 8
+    sender.join()
+
+    # nothing is lost by the timeout
+    assert reader.read_message(time_ns() + 10 ** 9) == b"1" * 40
+
+
+def test_record_deadline(pair):
+    a, b = pair
+    reader = MessageReader(a)
+    b.sendall(b"abc")
+    with pytest.raises(socket.timeout):
+        reader.read_record(4, time_ns() + 10 ** 7)
+    b.sendall(b"d")
+    assert reader.read_record(4, time_ns() + 10 ** 9) == b"abcd"
@@ -0,0 +1,32 @@
+from os.path import sep
+from sys import path
+
+import pytest
+
+from conftest import ROOT
+from Topology import Topology
+
+path.insert(0, f"{ROOT}{sep}agents")
+import topology
+
+
+@pytest.mark.parametrize("board_size", [1, 2, 3, 5, 11])
+def test_agent_topology_matches_engine(board_size):
+    engine = Topology.get(board_size)
+    agent = topology.Topology.get(board_size)
+    for name in [
+        "tile_count",
+        "top",
+        "bottom",
+        "left",
+        "right",
+        "coordinates",
+        "neighbours",
+        "preceding_neighbours",
+        "bridges",
+        "red_edges",
+        "blue_edges",
+        "edge_tiles",
+    ]:
+        assert getattr(agent, name) == getattr(engine, name), name
+    assert agent.positions[: agent.tile_count] == engine.coordinates
@@ -0,0 +1,30 @@
+from Tournament import Tournament
+
+# agents are only paired, so their names stand for them
+AGENTS = ["A", "B", "C"]
+
+
+def test_games_are_tasks_of_their_own():
+    t = Tournament(AGENTS[:2], games=3, processes=4)
+    assert t.get_chunks() == [("A", "B", 0, 1), ("A", "B", 1, 2), ("A", "B", 2, 3)]
+
+
+def test_kept_agents_split_pairings_into_chunks():
+    t = Tournament(AGENTS, games=8, processes=3)
+    chunks = t.get_chunks(keep_agents=True)
+    assert len(chunks) == 9
+    for pairing in t.get_pairings():
+        ranges = [(start, stop) for x, y, start, stop in chunks if (x, y) == pairing]
+        assert ranges == [(0, 2), (2, 5), (5, 8)]
+
+
+def test_chunks_are_at_most_one_per_game():
+    t = Tournament(AGENTS[:2], games=2, processes=8)
+    assert len(t.get_chunks(keep_agents=True)) == 2
+
+
+def test_idle_cores_count_chunks(monkeypatch):
+    monkeypatch.setattr("Tournament.cpu_count", lambda: 4)
+    assert Tournament(AGENTS[:2], games=8, processes=2).has_idle_cores()
+    assert not Tournament(AGENTS[:2], games=8, processes=4).has_idle_cores()
+    assert Tournament(AGENTS[:2], games=2, processes=4).has_idle_cores()